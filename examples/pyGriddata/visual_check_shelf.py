@@ -25,12 +25,11 @@ bv_dict = tmm.get_basis_vectors(basis_dir)
 # show the location of the default nodes
 domain.get_Triangulation()
 # convert basis vectors to an array
-bv_array = np.zeros((domain.node_num, len(bv_dict)+1))
+bv_array = np.zeros((domain.node_num, bv_dict.shape[1]+1))
 default_nodes = tmm.get_default_nodes(domain, bv_dict)
 bv_array[default_nodes, -1] = 1.0
-for i, b_vect in enumerate(bv_dict):
-    ind = np.array(b_vect.keys())-1
-    bv_array[ind, i] = 1
+b_vect = bv_dict.tocoo()
+bv_array[b_vect.row, b_vect.col] = 1
 plotA.basis_functions(domain, bv_array)
 
 # plot bathymetry contours (in a separate plot, but with contours where the
@@ -2,9 +2,8 @@
 # import necessary modulees
 import polyadcirc.run_framework.subdomain as subdom
 import polyadcirc.run_framework.fulldomain as fulldom
-import polyadcirc.run_framework.random_manningsn as rmn
+import polyadcirc.pyADCIRC.output as output
 import polyadcirc.pyADCIRC.volume as vol
-import numpy as np
 import scipy.io as sio
 
 adcirc_dir = '/h1/lgraham/workspace'
@@ -27,20 +26,15 @@ subdomain.update_sub2full_map()
 # Get list of elements in the subdomain in terms of fulldomain element numbers
 elements = subdomain.sub2full_element.values()
 
-# Get fort.63 data
-fort63, time_obs = rmn.get_ts_sr(fulldomain.path, 'fort.63')
-total_obs = fort63.shape[1]
-
-# Calculate volumes
+# Calculate volumes one fort.63 record at a time
 fulldomain.array_bathymetry()
-volume = np.empty((total_obs,))
-for i in xrange(total_obs):
-    volume[i] = vol.sub_volume(fulldomain, fort63[:, i], elements)[0]
+volume, time_obs = output.map_ts_sr(fulldomain.path, 'fort.63',
+        lambda t, eta: vol.sub_volume(fulldomain, eta, elements)[0])
 
 # Save to a MATLAB FILEi
 # CHANGE THIS SO THAT IT JUST SAVES TO A TEXT FILE
+# fort.63 is not loaded or saved, read it with output.get_ts_sr if needed
 mdict = {}
-mdict['fort63'] = fort63
 mdict['time_obs'] = time_obs
 mdict['volume'] = volume
 sio.savemat('volume_data', mdict, do_compression=True)
@@ -13,6 +13,12 @@ This subpackage contains
     manipulation and reading of :program:`ADCIRC` ``fort.##`` files for use by
     the 
     :mod:`~polyadcirc.run_framework` and :mod:`~polyadcirc.pyGriddata` modules;
+*   the module :mod:`~polyadcirc.pyADCIRC.adjacency` builds node to element
+    and node to node maps of a mesh;
+*   the module :mod:`~polyadcirc.pyADCIRC.cache_management` handles binary
+    sidecar files (caches and indices) of :program:`ADCIRC` ``fort.##`` files;
+*   the module :mod:`~polyadcirc.pyADCIRC.index_management` builds byte offset
+    indices of ``fort.14``, ``fort.13``, and timeseries files;
 *   the module :mod:`~polyadcirc.pyADCIRC.prep_management` is used to generate
     input files to :program:`ADCPREP`.
 *   :mod:`~polyadcirc.pyADCIRC.plotADCIRC` a set of functions for plotting
@@ -24,4 +30,5 @@ This subpackage contains
 __all__ = ["fort15_management", "fort14_management", "fort13_management",
            "convert_fort14_to_fort13", "flag_fort14", "basic",
            "prep_management", "fort1920_management", "volume", "plotADCIRC",
-           "post_management"]
+           "post_management", "cache_management",
+           "adjacency", "index_management"]
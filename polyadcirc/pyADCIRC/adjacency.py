@@ -0,0 +1,78 @@
+# Copyright (C) 2013 Lindley Graham
+
+"""
+This module contains methods to build the adjacency structures (node to
+element and node to node) of a triangular mesh from its connectivity array.
+All structures are stored in compressed sparse row (CSR) format and are built
+with a number of operations proportional to the number of elements.
+
+Nodes and elements are refered to by their position (zero based index) in the
+arrays of a :class:`~polyadcirc.pyADCIRC.basic.mesh`, use
+:meth:`~polyadcirc.run_framework.domain.domain.node_index` to convert node
+numbers to positions.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+def node_to_element(triangles, node_num):
+    """
+    Builds the node to element map. The elements containing the node in
+    position ``i`` are ``indices[indptr[i]:indptr[i+1]]`` in increasing
+    order.
+
+    :param triangles: :class:`numpy.ndarray` of shape (element_num, 3) of the
+        positions of the vertices of each element
+    :param int node_num: number of nodes
+    :rtype: :class:`scipy.sparse.csr_matrix`
+    :returns: (node_num, element_num) boolean incidence matrix
+
+    """
+    triangles = np.asarray(triangles)
+    element_num, vertices = triangles.shape
+    rows = triangles.ravel()
+    cols = np.repeat(np.arange(element_num), vertices)
+    data = np.ones(rows.shape, dtype=bool)
+    return sp.csr_matrix((data, (rows, cols)), shape=(node_num, element_num))
+
+def node_to_node(triangles, node_num):
+    """
+    Builds the node to node (neighbor) map from the edges of each element.
+    The neighbors of the node in position ``i`` are
+    ``indices[indptr[i]:indptr[i+1]]`` in increasing order.
+
+    :param triangles: :class:`numpy.ndarray` of shape (element_num, 3) of the
+        positions of the vertices of each element
+    :param int node_num: number of nodes
+    :rtype: :class:`scipy.sparse.csr_matrix`
+    :returns: (node_num, node_num) boolean symmetric adjacency matrix
+
+    """
+    triangles = np.asarray(triangles)
+    # each edge in both directions
+    rows = triangles[:, [0, 0, 1, 1, 2, 2]].ravel()
+    cols = triangles[:, [1, 2, 0, 2, 0, 1]].ravel()
+    data = np.ones(rows.shape, dtype=bool)
+    adj = sp.csr_matrix((data, (rows, cols)), shape=(node_num, node_num))
+    # shared edges are summed into a single entry by the conversion
+    adj.sort_indices()
+    return adj
+
+def csr_arrays(adj):
+    """
+    :param adj: :class:`scipy.sparse.csr_matrix`
+    :rtype: tuple
+    :returns: (indptr, indices) of ``adj``
+
+    """
+    return adj.indptr, adj.indices
+
+def row(adj, i):
+    """
+    :param adj: :class:`scipy.sparse.csr_matrix`
+    :param int i: row
+    :rtype: :class:`numpy.ndarray`
+    :returns: column indices of the nonzero entries in row ``i`` of ``adj``
+
+    """
+    return adj.indices[adj.indptr[i]:adj.indptr[i+1]]
@@ -10,6 +10,8 @@ This module contains a set of simple classes for use by
 * :py:mod:`polyadcirc.pyGriddata.gridObject`
 """
 
+import numpy as np
+
 class comm_for_no_mpi4py(object):
     """
     A set of stand ins for when mpi4py is not installed
@@ -120,6 +122,101 @@ class node(location):
         self.bathymetry = bathymetry #: float, bathymetry at x, y
         super(node, self).__init__(x, y)
 
+class mesh(pickleable):
+    """
+    Stores the data in a ``fort.14`` file as contiguous arrays
+    """
+    def __init__(self, node_ids, x, y, bathymetry, element_ids,
+                 connectivity, grid_name=''):
+        """
+        Initalization
+        """
+        #: string, first line of the ``fort.14`` file
+        self.grid_name = grid_name
+        #: :class:`numpy.ndarray` of int, node numbers
+        self.node_ids = node_ids
+        #: :class:`numpy.ndarray` of float, x - coordinates
+        self.x = x
+        #: :class:`numpy.ndarray` of float, y - coordinates
+        self.y = y
+        #: :class:`numpy.ndarray` of float, bathymetry at x, y
+        self.bathymetry = bathymetry
+        #: :class:`numpy.ndarray` of int, element numbers
+        self.element_ids = element_ids
+        #: :class:`numpy.ndarray` of int32 of shape (element_num, 3), node
+        #: numbers of the vertices of each element
+        self.connectivity = connectivity
+        #: list of :class:`numpy.ndarray`, nodes in each open boundary
+        self.open_boundaries = []
+        #: list of :class:`numpy.ndarray`, nodes in each land boundary
+        self.land_boundaries = []
+        #: list of int, ``IBTYPE`` of each land boundary
+        self.land_ibtypes = []
+        #: list of :class:`numpy.ndarray`, additional columns (barrier
+        #: heights, coefficients, etc.) for each land boundary
+        self.land_attributes = []
+        super(mesh, self).__init__()
+
+    @property
+    def node_num(self):
+        """
+        :rtype: int
+        :returns: number of nodes
+        """
+        return self.x.shape[0]
+
+    @property
+    def element_num(self):
+        """
+        :rtype: int
+        :returns: number of elements
+        """
+        return self.connectivity.shape[0]
+
+class nodal_attr(pickleable):
+    """
+    Stores a single nodal attribute from a ``fort.13`` file as arrays
+    """
+    def __init__(self, name, units, default, nodes, values):
+        """
+        Initalization
+        """
+        #: string, name of the nodal attribute
+        self.name = name
+        #: string, units of the nodal attribute
+        self.units = units
+        #: :class:`numpy.ndarray` of float, default value(s)
+        self.default = default
+        #: :class:`numpy.ndarray` of int, node numbers of non-default nodes
+        self.nodes = nodes
+        #: :class:`numpy.ndarray` of float of shape (len(nodes),
+        #: values_per_node), values at the non-default nodes
+        self.values = values
+        super(nodal_attr, self).__init__()
+
+    @property
+    def values_per_node(self):
+        """
+        :rtype: int
+        :returns: number of values per node
+        """
+        return self.default.shape[0]
+
+    def dense(self, node_num):
+        """
+        :param int node_num: number of nodes in the mesh
+        :rtype: :class:`numpy.ndarray`
+        :returns: array of shape (node_num,) or (node_num, values_per_node) of
+            the value(s) at every node
+
+        """
+        values = np.empty((node_num, self.values_per_node))
+        values[:] = self.default
+        values[self.nodes-1] = self.values
+        if self.values_per_node == 1:
+            values = values[:, 0]
+        return values
+
 class time(pickleable):
     """
     Stores time data specific to ADCIRC model runs from the users and fort.15
@@ -0,0 +1,130 @@
+# Copyright (C) 2013 Lindley Graham
+
+"""
+This module, :mod:`~polyadcirc.pyADCIRC.cache_management`, handles the
+reading/writing of binary sidecar files (caches and indices) that are stored
+next to the ASCII :program:`ADCIRC` files they were created from. A sidecar
+file is only used if the size, modification time, and a sampled hash of the
+contents of the source file match those recorded when the sidecar was
+written.
+"""
+
+import os, hashlib
+import numpy as np
+
+#: number of bytes hashed at each sample location
+sample_size = 2**16
+#: number of evenly spaced sample locations hashed
+sample_num = 16
+
+def sidecar_name(file_name, ext='.npz'):
+    """
+    Hidden file next to ``file_name``. The leading ``.`` keeps the sidecar
+    from matching globs like ``fort.1*``.
+
+    :param string file_name: path to the source file
+    :param string ext: file extension of the sidecar file
+    :rtype: string
+    :returns: path to the sidecar file
+
+    """
+    path, name = os.path.split(file_name)
+    return os.path.join(path, '.'+name+ext)
+
+def signature(file_name):
+    """
+    Size, modification time, and hash of :data:`sample_num` evenly spaced
+    blocks of ``file_name`` (including the first and last block). Hashing a
+    sample of the file keeps this fast for multi-gigabyte files.
+
+    :param string file_name: path to the source file
+    :rtype: dict
+    :returns: ``{'_size': int, '_mtime': float, '_digest': string}``
+
+    """
+    stat = os.stat(file_name)
+    size = stat.st_size
+    digest = hashlib.sha1()
+    with open(file_name, 'rb') as fid:
+        if size <= sample_size*sample_num:
+            digest.update(fid.read())
+        else:
+            for offset in np.linspace(0, size-sample_size, sample_num):
+                fid.seek(int(offset))
+                digest.update(fid.read(sample_size))
+    return {'_size':size, '_mtime':stat.st_mtime,
+            '_digest':digest.hexdigest()}
+
+def _matches(sidecar, sig):
+    """
+    :param sidecar: :class:`numpy.lib.npyio.NpzFile`
+    :param dict sig: signature of the source file
+    :rtype: bool
+    :returns: True if the signature stored in ``sidecar`` matches ``sig``
+
+    """
+    for k, v in sig.iteritems():
+        if k not in sidecar.files or not np.array_equal(sidecar[k], v):
+            return False
+    return True
+
+def load(file_name, ext='.npz', sig=None):
+    """
+    Load the arrays stored in the sidecar of ``file_name``.
+
+    :param string file_name: path to the source file
+    :param string ext: file extension of the sidecar file
+    :type sig: dict or None
+    :param sig: signature of the source, if None then
+        ``signature(file_name)``
+    :rtype: dict or None
+    :returns: dict of :class:`numpy.ndarray` or None if the sidecar does not
+        exist or is out of date
+
+    """
+    cache_file = sidecar_name(file_name, ext)
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        if sig is None:
+            sig = signature(file_name)
+        with np.load(cache_file) as sidecar:
+            if not _matches(sidecar, sig):
+                return None
+            return dict([(k, sidecar[k]) for k in sidecar.files if k not in
+                         sig])
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+
+def save(file_name, arrays, ext='.npz', sig=None):
+    """
+    Save ``arrays`` to the sidecar of ``file_name`` along with the signature
+    of ``file_name``. The sidecar is written to a temporary file and then
+    renamed so that concurrent readers never see a partial file. Failures
+    (e.g. a read-only directory) are ignored.
+
+    :param string file_name: path to the source file
+    :param dict arrays: dict of :class:`numpy.ndarray` to save
+    :param string ext: file extension of the sidecar file
+    :type sig: dict or None
+    :param sig: signature of the source, if None then
+        ``signature(file_name)``
+    :rtype: bool
+    :returns: True if the sidecar was written
+
+    """
+    cache_file = sidecar_name(file_name, ext)
+    tmp_file = cache_file+'.'+str(os.getpid())+'.tmp'
+    mdict = dict(arrays)
+    try:
+        if sig is None:
+            sig = signature(file_name)
+        mdict.update(sig)
+        with open(tmp_file, 'wb') as fid:
+            np.savez(fid, **mdict)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError):
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return False
+    return True
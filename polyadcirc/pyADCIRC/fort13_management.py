@@ -5,8 +5,11 @@ This module :mod:`~polyadcirc.pyADCIRC.fort13_management` handles the
 reading/writing of ``fort.13`` formatted files.
 """
 
-import os
+import os, collections
 import numpy as np
+import polyadcirc.pyADCIRC.basic as basic
+import polyadcirc.pyADCIRC.fort14_management as f14
+import polyadcirc.pyADCIRC.index_management as index_management
 
 def write_manningsn(fid, node, value):
     """
@@ -37,6 +40,77 @@ def read_manningsn(fid):
     """
     return np.fromstring(fid.readline(), sep=' ')
 
+def _read_values(fid, attr):
+    """
+    Reads in the number of non-default nodes and the non-default values of a
+    nodal attribute
+
+    :type fid: :class:`file`
+    :param fid: the file object to be read from positioned after the name of
+        the nodal attribute
+    :param attr: :class:`~polyadcirc.pyADCIRC.basic.nodal_attr` to store the
+        values in
+
+    """
+    num = int(next(fid).split()[0])
+    block = f14.read_block(fid, num, 1+attr.values_per_node)
+    attr.nodes = block[:, 0].astype(int)
+    attr.values = block[:, 1:]
+
+def read_nodal_attrs(path=None, file_name='fort.13', names=None):
+    """
+    Load in all of the nodal attributes from a ``*.13`` file in a single pass.
+    The non-default values of each attribute are parsed in bulk. If only some
+    of the attributes are requested the file is indexed and only the
+    requested blocks are read.
+
+    :type path: string or None
+    :param path: the directory containing the ``fort.13`` to be read in
+    :type file_name: string
+    :param file_name: the name of the ``fort.13`` formatted file
+    :type names: list or None
+    :param names: names of the attributes to read, if None read all
+        attributes
+
+    :rtype: tuple
+    :return: (number of nodes, :class:`~collections.OrderedDict` where
+        ``key`` -- attribute name, ``value`` --
+        :class:`~polyadcirc.pyADCIRC.basic.nodal_attr`)
+
+    """
+    if path is None:
+        path = os.getcwd()
+    full_file_name = os.path.join(path, file_name)
+
+    attrs = collections.OrderedDict()
+    
+    with open(full_file_name, 'r') as f:
+        next(f)
+        node_num = int(next(f).split()[0])
+        attr_num = int(next(f).split()[0])
+        # read in the default nodal attributes
+        for i in xrange(attr_num):
+            name = next(f).strip()
+            units = next(f).strip()
+            values_per_node = int(next(f).split()[0])
+            default = np.fromstring(next(f).partition('!')[0], sep=' ')
+            attrs[name] = basic.nodal_attr(name, units,
+                                           default[:values_per_node], None,
+                                           None)
+        # read in the non-default nodal values
+        if names is None:
+            for i in xrange(attr_num):
+                _read_values(f, attrs[next(f).strip()])
+        else:
+            index = index_management.get_index(full_file_name, 'fort13')
+            for name in attrs.keys():
+                if name in names:
+                    index_management.seek_attribute(f, index, name)
+                    _read_values(f, attrs[name])
+                else:
+                    del attrs[name]
+    return node_num, attrs
+
 def read_nodal_attr(data, path=None, file_name='fort.13', nums=None):
     """
     Load in nodal attributes from a ``*.13`` file (only does Manning's n for
@@ -54,47 +128,23 @@ def read_nodal_attr(data, path=None, file_name='fort.13', nums=None):
     :return: dictionary of Manning's *n* values
 
     """
-    # Determine how many non-default nodes exist
-    # Read in nodal values (Manning's n) from fort.13
-    if path is None:
-        path = os.getcwd()
-    full_file_name = os.path.join(path, file_name)
-
-    
-    flag = 0
-    attribute_name_present = 0
-
-    manningsn_values = dict()
-    
-    with open(full_file_name, 'r') as f:
-        while flag == 0:
-            # read in the default nodal attribute
-            if attribute_name_present == 0:
-                line = f.readline()
-                if line.find('mannings_n_at_sea_floor') >= 0:
-                    attribute_name_present = 1
-                    f.readline()
-                    data.manningsn_default = float(f.readline().strip())
-                    # set default nodal value
-                    # THIS PART MIGHT NEED TO BE ALTERED
-                    #for node in data.node.values():
-                    #    node.manningsn = data.manningsn_default
-            # read in the number of non-default valued nodes
-            if attribute_name_present == 1:
-                line = f.readline()
-                if line.find('mannings_n_at_sea_floor') >= 0:
-                    attribute_name_present = 2
-                    data.manningsn_num = int(f.readline().strip())
-            # read in the non-default nodal values
-            if attribute_name_present == 2:
-                for i in xrange(data.manningsn_num):
-                    a = read_manningsn(f)
-                    if (nums is None) or (int(a[0]) in nums):
-                        if data.node.has_key(int(a[0])):
-                            data.node[int(a[0])].manningsn = a[1]
-                        manningsn_values[int(a[0])] = a[1]
-                flag = 1
-    return manningsn_values
+    attr = read_nodal_attrs(path, file_name,
+                            ['mannings_n_at_sea_floor'])[1].values()[0]
+    data.manningsn_default = attr.default[0]
+    data.manningsn_num = len(attr.nodes)
+    nodes, values = attr.nodes, attr.values[:, 0]
+    if nums is not None:
+        select = np.in1d(nodes, nums)
+        nodes, values = nodes[select], values[select]
+    # set the values at the nodes present in data
+    index = data.node_index(nodes)
+    present = index >= 0
+    if np.any(present):
+        if data.manningsn is None:
+            data.manningsn = np.empty((data.node_num,))
+            data.manningsn.fill(np.nan)
+        data.manningsn[index[present]] = values[present]
+    return dict(zip(nodes.tolist(), values))
 
 def read_default(data, path=None, file_name='fort.13'):
     """
@@ -164,41 +214,113 @@ def read_nodal_attr_dict(path=None, file_name='fort.13'):
     :return: dictionary of Manning's *n* 
 
     """
-    # Determine how many non-default nodes exist
-    # Read in nodal values (Manning's n) from fort.13
-    if path is None:
-        path = os.getcwd()
-    full_file_name = os.path.join(path, file_name)
-    
-    flag = 0
-    attribute_name_present = 0
+    attr = read_nodal_attrs(path, file_name,
+                            ['mannings_n_at_sea_floor'])[1].values()[0]
+    return dict(zip(attr.nodes.tolist(), attr.values[:, 0]))
 
-    manningsn_values = dict()
-    
-    with open(full_file_name, 'r') as f:
-        while flag == 0:
-            # read in the default nodal attribute
-            if attribute_name_present == 0:
-                line = f.readline()
-                if line.find('mannings_n_at_sea_floor') >= 0:
-                    attribute_name_present = 1
-            # read in the number of non-default valued nodes
-            if attribute_name_present == 1:
-                line = f.readline()
-                if line.find('mannings_n_at_sea_floor') >= 0:
-                    attribute_name_present = 2
-                    manningsn_num = int(f.readline().strip())
-            # read in the non-default nodal values
-            if attribute_name_present == 2:
-                for i in xrange(manningsn_num):
-                    a = read_manningsn(f)
-                    manningsn_values[int(a[0])] = a[1]
-                flag = 1
-    return manningsn_values
+#: format of a line in the non-default block of a ``fort.13`` file
+mann_format = '%-8d %17.15g\n'
+
+class fort13_template(object):
+    """
+    A ``fort.13`` file split into the parts before, between, and after the
+    default value and the non-default block of a nodal attribute (by default
+    Manning's *n*). The template file is read once and new ``fort.13`` files
+    are written by only formatting the new default value and non-default
+    block.
+    """
+    def __init__(self, file_name, attr_name='mannings_n_at_sea_floor',
+                 use_cache=True):
+        """
+        Initialization
+
+        :param string file_name: path to the template ``fort.13`` file
+        :param string attr_name: name of the nodal attribute to replace
+        :param bool use_cache: flag whether or not to load/save the index of
+            the template
+
+        """
+        index = index_management.get_index(file_name, 'fort13', use_cache)
+        with open(file_name, 'r') as fid:
+            # skip the units and number of values per node
+            index_management.seek_attribute(fid, index, attr_name, True)
+            fid.readline()
+            fid.readline()
+            default_start = fid.tell()
+            #: string, original default value line
+            self.default_line = fid.readline()
+            default_stop = fid.tell()
+            index_management.seek_attribute(fid, index, attr_name)
+            block_start = fid.tell()
+            num = int(fid.readline().split()[0])
+            block_stop = index_management.skip_lines(fid, num)
+            fid.seek(0)
+            #: string, everything before the default value line
+            self.head = fid.read(default_start)
+            fid.seek(default_stop)
+            #: string, everything between the default value line and the
+            #: number of non-default nodes
+            self.middle = fid.read(block_start-default_stop)
+            fid.seek(block_stop)
+            #: string, everything after the non-default block
+            self.tail = fid.read()
+
+    def render(self, data, default=None):
+        """
+        :type data: :class:`numpy.ndarray` or :class:`dict`
+        :param data: containing the nodal attribute information
+        :type default: None or float
+        :param default: default value, if None then use the template value
+        :rtype: generator
+        :returns: strings of the ``fort.13`` file
+
+        """
+        if isinstance(data, np.ndarray):
+            nodes = np.arange(1, len(data)+1)
+            values = data
+        else:
+            nodes = np.array(sorted(data.iterkeys()), dtype=int)
+            values = np.array([data[k] for k in nodes.tolist()])
+        yield self.head
+        if default:
+            # write out the default nodal value
+            yield '{:f}\n'.format(default)
+        else:
+            yield self.default_line
+        yield self.middle
+        yield '{:d}\n'.format(len(nodes))
+        for block in f14.format_block(mann_format, nodes, values):
+            yield block
+        yield self.tail
+
+    def write(self, data, path=None, default=None, file_name='fort.13'):
+        """
+        Write out ``fort.13`` to path with the attributes contained in Data.
+
+        :type data: :class:`numpy.ndarray` or :class:`dict`
+        :param data: containing the nodal attribute information
+        :type path: string or None
+        :param path: the directory to which the fort.13 file will be written
+        :type default: None or float
+        :param default: default value
+        :type file_name: string
+        :param file_name: the name of the ``fort.13`` formatted file
+
+        """
+        if path is None:
+            path = os.getcwd()
+        tmp_name = os.path.join(path, 'temp.13')
+        with open(tmp_name, 'w', 2**20) as fid_write:
+            fid_write.writelines(self.render(data, default))
+        # rename files
+        os.rename(tmp_name, os.path.join(path, file_name))
 
 def update_mann(data, path=None, default=None, file_name='fort.13'):
     """
     Write out ``fort.13`` to path with the attributes contained in Data.  
+
+    To write many ``fort.13`` files from the same template use
+    :class:`fort13_template`.
     
     :type data: :class:`numpy.ndarray` or :class:`dict`
     :param data: containing the nodal attribute information
@@ -213,55 +335,8 @@ def update_mann(data, path=None, default=None, file_name='fort.13'):
     if path is None:
         path = os.getcwd()
     
-    tmp_name = os.path.join(path, 'temp.13')
-    file_name = os.path.join(path, file_name)
-
     # this currently uses the present fort.13 file as a template for formatting
     # purposes
-
-    flag = 0
-    attribute_name_present = 0
-    
-    with open(file_name, 'r') as fid_read, open(tmp_name, 'w') as fid_write:
-        while flag == 0:
-            # read in and write out default nodal value(s)
-            if attribute_name_present == 0:
-                line = fid_read.readline()
-                fid_write.write(line)
-                if line.find('mannings_n_at_sea_floor') >= 0:
-                    attribute_name_present = 1
-                    fid_write.write(fid_read.readline())
-                    fid_write.write(fid_read.readline())
-                    if default:
-                        fid_read.readline()
-                        # write out the default nodal value
-                        fid_write.write('{:f}\n'.format(default))
-                    else:
-                        fid_write.write(fid_read.readline())
-            # read in and write out the number of non-default valued nodes
-            if attribute_name_present == 1:
-                line = fid_read.readline()
-                fid_write.write(line)
-                if line.find('mannings_n_at_sea_floor') >= 0:
-                    attribute_name_present = 2
-                    org_non_default = int(fid_read.readline().strip())
-                    fid_write.write('{:d}\n'.format(len(data)))
-            # read in and write out the non-default nodal values
-            if attribute_name_present == 2:
-                for i in xrange(org_non_default):
-                    fid_read.readline()
-                if isinstance(data, np.ndarray) or isinstance(data, np.array):
-                    for k, v in enumerate(data):
-                        write_manningsn(fid_write, k+1, v)
-                else:
-                    for k, v in sorted(data.iteritems()):
-                        write_manningsn(fid_write, k, v)
-                flag = 1
-        # write out remainder of fid_read to fid_write
-        for line in fid_read:
-            fid_write.write(line)
-    # rename files
-    os.rename(tmp_name, file_name)
-
-
-
+    template = fort13_template(os.path.join(path, file_name),
+                               use_cache=False)
+    template.write(data, path, default, file_name)
@@ -5,10 +5,12 @@ This module, :mod:`~polyadcirc.pyADCIRC.fort14_management` handles the
 reading/writing of ``fort.14`` formatted files.
 """
 
-import glob, os
+import glob, os, collections
+from itertools import islice
 import numpy as np
 import polyadcirc.pyADCIRC.flag_fort14 as flag_fort14
 import polyadcirc.pyADCIRC.basic as basic
+import polyadcirc.pyADCIRC.cache_management as cache
 
 def clean(grid_object, folder_name=None):
     """
@@ -71,10 +73,223 @@ def is_flagged(grid):
     """
     return bool(glob.glob(grid.file_name))
 
-def read_spatial_grid(data, path=None, make_domain_map=False):
+#: number of lines parsed by each call to :meth:`numpy.fromstring`
+chunk_lines = 2**16
+
+def parse_lines(lines, num_cols, dtype=float):
+    """
+    Parses a list of lines of whitespace delimited numbers with a single call
+    to :meth:`numpy.fromstring`. If the lines contain comments or extra columns
+    each line is parsed individually and only the first ``num_cols`` values are
+    kept.
+
+    :param list lines: lines to parse
+    :param int num_cols: number of values per line
+    :param dtype: data type of the values
+    :rtype: :class:`numpy.ndarray`
+    :returns: array of shape (len(lines), num_cols)
+
+    """
+    values = np.fromstring(''.join(lines), dtype=dtype, sep=' ')
+    if values.size != len(lines)*num_cols:
+        values = [np.fromstring(line.partition('!')[0], dtype=dtype,
+                                sep=' ')[:num_cols] for line in lines]
+        values = np.concatenate(values)
+    return values.reshape((len(lines), num_cols))
+
+def read_block(fid, num_lines, num_cols, dtype=float):
+    """
+    Reads the next ``num_lines`` lines of ``fid`` into an array. The lines
+    are read and parsed :data:`chunk_lines` at a time.
+
+    :param fid: :class:`file` object
+    :param int num_lines: number of lines to read
+    :param int num_cols: number of values per line
+    :param dtype: data type of the values
+    :rtype: :class:`numpy.ndarray`
+    :returns: array of shape (num_lines, num_cols)
+
+    """
+    block = np.empty((num_lines, num_cols), dtype=dtype)
+    for start in xrange(0, num_lines, chunk_lines):
+        stop = min(start+chunk_lines, num_lines)
+        lines = list(islice(fid, stop-start))
+        if len(lines) != stop-start:
+            raise IOError('unexpected end of file in '+fid.name)
+        block[start:stop] = parse_lines(lines, num_cols, dtype)
+    return block
+
+def _read_boundaries(fid, grid):
+    """
+    Reads the open and land boundary sections of a ``fort.14`` file into
+    ``grid``. Files without boundary information are allowed.
+
+    :param fid: :class:`file` object positioned after the element block
+    :param grid: :class:`~polyadcirc.pyADCIRC.basic.mesh`
+    :returns: reference to grid
+
+    """
+    # open boundaries
+    line = next(fid, '').partition('!')[0]
+    if not line.strip():
+        return grid
+    nope = int(line.split()[0])
+    next(fid) # NETA
+    for i in xrange(nope): # pylint: disable=W0612
+        nvdll = int(next(fid).partition('!')[0].split()[0])
+        grid.open_boundaries.append(read_block(fid, nvdll, 1, int)[:, 0])
+    # land boundaries
+    line = next(fid, '').partition('!')[0]
+    if not line.strip():
+        return grid
+    nbou = int(line.split()[0])
+    next(fid) # NVEL
+    for i in xrange(nbou):
+        a = next(fid).partition('!')[0].split()
+        nvell = int(a[0])
+        lines = list(islice(fid, nvell))
+        if len(lines) != nvell:
+            raise IOError('unexpected end of file in '+fid.name)
+        if nvell > 0:
+            num_cols = len(lines[0].partition('!')[0].split())
+            values = parse_lines(lines, num_cols)
+        else:
+            values = np.empty((0, 1))
+        grid.land_ibtypes.append(int(a[1]) if len(a) > 1 else 0)
+        grid.land_boundaries.append(values[:, 0].astype(int))
+        grid.land_attributes.append(values[:, 1:])
+    return grid
+
+def _pack(arrays):
+    """
+    :param list arrays: list of 1D or 2D :class:`numpy.ndarray`
+    :rtype: tuple
+    :returns: (concatenated flattened values, rows in each array, columns in
+        each array)
+
+    """
+    if not arrays:
+        return np.empty((0,)), np.empty((0,), dtype=int), np.empty((0,),
+                                                                   dtype=int)
+    values = np.concatenate([np.ravel(a) for a in arrays])
+    rows = np.array([a.shape[0] for a in arrays], dtype=int)
+    cols = np.array([1 if a.ndim == 1 else a.shape[1] for a in arrays],
+                    dtype=int)
+    return values, rows, cols
+
+def _unpack(values, rows, cols, dtype, flat=True):
+    """
+    Inverse of :meth:`_pack`
+
+    :rtype: list
+    :returns: list of :class:`numpy.ndarray`
+
+    """
+    arrays = []
+    stop = 0
+    for r, c in zip(rows, cols):
+        start, stop = stop, stop+r*c
+        a = values[start:stop].astype(dtype)
+        arrays.append(a if flat else a.reshape((r, c)))
+    return arrays
+
+def _mesh_to_arrays(grid):
+    """
+    :param grid: :class:`~polyadcirc.pyADCIRC.basic.mesh`
+    :rtype: dict
+    :returns: dict of :class:`numpy.ndarray` containing all of the data in
+        ``grid``
+
+    """
+    arrays = {'grid_name':np.array(grid.grid_name), 'node_ids':grid.node_ids,
+              'x':grid.x, 'y':grid.y, 'bathymetry':grid.bathymetry,
+              'element_ids':grid.element_ids,
+              'connectivity':grid.connectivity,
+              'land_ibtypes':np.array(grid.land_ibtypes, dtype=int)}
+    for name in ['open_boundaries', 'land_boundaries', 'land_attributes']:
+        values, rows, cols = _pack(getattr(grid, name))
+        arrays[name] = values
+        arrays[name+'_rows'] = rows
+        arrays[name+'_cols'] = cols
+    return arrays
+
+def _arrays_to_mesh(arrays):
+    """
+    Inverse of :meth:`_mesh_to_arrays`
+
+    :param dict arrays: dict of :class:`numpy.ndarray`
+    :rtype: :class:`~polyadcirc.pyADCIRC.basic.mesh`
+    :returns: array-backed mesh
+
+    """
+    grid = basic.mesh(arrays['node_ids'], arrays['x'], arrays['y'],
+                      arrays['bathymetry'], arrays['element_ids'],
+                      arrays['connectivity'], str(arrays['grid_name']))
+    for name, dtype in [('open_boundaries', int), ('land_boundaries', int)]:
+        setattr(grid, name, _unpack(arrays[name], arrays[name+'_rows'],
+                                    arrays[name+'_cols'], dtype))
+    grid.land_attributes = _unpack(arrays['land_attributes'],
+                                   arrays['land_attributes_rows'],
+                                   arrays['land_attributes_cols'], float,
+                                   False)
+    grid.land_ibtypes = arrays['land_ibtypes'].tolist()
+    return grid
+
+def read_mesh(path=None, file_name='fort.14', use_cache=True):
+    """
+    Reads in a ``fort.14`` file in ``path`` in a single pass. The node and
+    element blocks are read in large blocks and parsed in bulk into contiguous
+    arrays. 
+
+    If ``use_cache`` the mesh is loaded from a binary cache (``.fort.14.npz``)
+    next to the ``fort.14`` file if the size, modification time, and hash of
+    the ``fort.14`` file match those recorded in the cache. Otherwise the
+    ``fort.14`` file is parsed and the cache is (re)written.
+
+    :type path: string or None
+    :param path: path to the``fort.14`` fortmatted file
+    :param string file_name: file name
+    :param bool use_cache: flag whether or not to use the binary cache
+    :rtype: :class:`~polyadcirc.pyADCIRC.basic.mesh`
+    :returns: array-backed mesh
+
+    """
+    if path is None:
+        path = os.getcwd()
+
+    file_name = os.path.join(path, file_name)
+
+    if use_cache:
+        arrays = cache.load(file_name)
+        if arrays is not None:
+            return _arrays_to_mesh(arrays)
+
+    with open(file_name, 'r') as fid:
+        grid_name = next(fid).strip()
+        a = np.fromstring(next(fid).partition('!')[0], dtype=int, sep=' ')
+        element_num, node_num = a[0], a[1]
+        # node number, x, y, bathymetry
+        nodes = read_block(fid, node_num, 4)
+        # element number, number of vertices, vertices
+        elements = read_block(fid, element_num, 5, int)
+        grid = basic.mesh(nodes[:, 0].astype(int), nodes[:, 1].copy(),
+                          nodes[:, 2].copy(), nodes[:, 3].copy(),
+                          elements[:, 0].copy(),
+                          elements[:, 2:].astype(np.int32), grid_name)
+        del nodes, elements
+        _read_boundaries(fid, grid)
+
+    if use_cache:
+        cache.save(file_name, _mesh_to_arrays(grid))
+    return grid
+
+def read_spatial_grid(data, path=None, make_domain_map=False,
+                      use_cache=True):
     """ 
     Reads in a ``fort.14`` file in ``path`` and updates data
 
+    See :meth:`read_mesh`
+
     :type data: :class:`polyadcirc.run_framework.domain`
     :param data: python object to save the ``fort.14`` data to
     :type path: string or None
@@ -82,33 +297,12 @@ def read_spatial_grid(data, path=None, make_domain_map=False):
     :type make_domain_map: bool
     :param make_domain_map: flag for whether or not to make a node to element
                             map
+    :param bool use_cache: flag whether or not to use the binary cache
     :returns: reference to data
 
     """
-    if path is None:
-        path = os.getcwd()
-
-    file_name = os.path.join(path, 'fort.14')
-
-    with open(file_name, 'r') as f:
-        f.readline()
-        # Read in total number of nodes (OUT of fort.14 instead of fort.16 as
-        # in serial case)
-        a = np.fromstring(f.readline(), dtype=int, sep=' ')
-        data.node_num = a[1]
-        data.element_num = a[0]
-        data.make_domain_map = make_domain_map
-        
-        # Now read in the nodal coordinates
-        for i in xrange(data.node_num): # pylint: disable=W0612
-            a = np.fromstring(f.readline(), sep=' ')
-            data.node[int(a[0])] = basic.node(a[1], a[2], a[3])
-        
-        # Node read in the element to node map
-        for i in xrange(data.element_num):
-            a = np.fromstring(f.readline(), dtype=int,
-                              sep=' ')
-            data.element[a[0]] = a[2:]
+    data.set_mesh(read_mesh(path, use_cache=use_cache))
+    data.make_domain_map = make_domain_map
 
     # This needs only to be done once then, make_domain_map flag will be set to
     # true, this also only needs to be done if we're dealing with subdomains
@@ -145,6 +339,63 @@ def read_spatial_grid_header(data, path=None):
         
     return data
 
+#: format of a line in the node block of a ``fort.14`` file
+node_format = '%-7d %9.8E %9.8E %7.2f\n'
+
+def format_block(line_format, *columns):
+    """
+    Formats lines of values in chunks of :data:`chunk_lines` lines with a
+    single ``%`` operation per chunk.
+
+    :param string line_format: ``%`` format of a single line
+    :param columns: :class:`numpy.ndarray` of the values in each column
+    :rtype: generator
+    :returns: strings of formatted lines
+
+    """
+    num_lines = len(columns[0])
+    for start in xrange(0, num_lines, chunk_lines):
+        stop = min(start+chunk_lines, num_lines)
+        values = np.empty((stop-start, len(columns)), dtype=object)
+        for i, column in enumerate(columns):
+            values[:, i] = column[start:stop].tolist()
+        yield (line_format*(stop-start)) % tuple(values.ravel().tolist())
+
+def _read_template(file_name, node_num):
+    """
+    Reads the parts of a ``fort.14`` file before and after the node block.
+
+    :param string file_name: path to the ``fort.14`` file
+    :param int node_num: number of nodes
+    :rtype: tuple
+    :returns: (header, tail)
+
+    """
+    with open(file_name, 'r') as fid:
+        header = fid.readline()+fid.readline()
+        # skip the node block
+        collections.deque(islice(iter(fid.readline, ''), node_num), 0)
+        tail = fid.read()
+    return header, tail
+
+def _write(file_name, header, node_block, tail):
+    """
+    Writes a ``fort.14`` file to a temporary file and then moves it to
+    ``file_name``.
+
+    :param string file_name: path to the ``fort.14`` file
+    :param string header: first two lines of the file
+    :param list node_block: list of strings of formatted node lines
+    :param string tail: element and boundary blocks
+
+    """
+    tmp = os.path.join(os.path.dirname(file_name), 'temp.14')
+    with open(tmp, 'w', 2**20) as fw:
+        fw.write(header)
+        fw.writelines(node_block)
+        fw.write(tail)
+    os.rename(tmp, file_name)
+
 def update(data, bathymetry=None, path=None, file_name='fort.14'):
     """
     Write out bathymetry in data to ``fort.14`` formated file, by updating
@@ -161,30 +412,45 @@ def update(data, bathymetry=None, path=None, file_name='fort.14'):
     """
     if path is None:
         path = os.getcwd()
+    update_many(data, [path], bathymetry, file_name=file_name)
 
-    file_name = os.path.join(path, file_name)
-    tmp = os.path.join(path, 'temp.14')
+def update_many(data, paths, bathymetry=None, template=None,
+                file_name='fort.14'):
+    """
+    Write out several bathymetries to ``fort.14`` formated files
+    path/file_name for path in ``paths``. The template is only read once and
+    each distinct bathymetry is only formatted once.
 
-    # this currrently uses the present fort.14 as a template for formatting
-    # purposes
+    :type data: :class:`polyadcirc.run_framework.domain`
+    :param data: python object with the nodes of the mesh
+    :param list paths: paths to the ``fort.14`` formatted files to write
+    :type bathymetry: :class:`numpy.ndarray` or None
+    :param bathymetry: if None then use the bathymetry in ``data``, if a 1D
+        array write the same bathymetry to all files, if a 2D array of shape
+        (node_num, len(paths)) write ``bathymetry[:, i]`` to ``paths[i]``
+    :type template: string or None
+    :param template: ``fort.14`` file to use as a template for the element
+        and boundary blocks, if None then use ``paths[0]/file_name``
+    :param string  file_name: file name
+
+    """
+    if template is None:
+        template = os.path.join(paths[0], file_name)
     if bathymetry is None:
         bathymetry = data.array_bathymetry()
-    
-    # pylint: disable=C0103
-    with open(file_name, 'r') as f, open(tmp, 'w') as fw:
-        fw.write(f.readline())
-        fw.write(f.readline())
-        for i, v in data.node.iteritems():
-            # pylint: disable=C0103
-            fw.write('{:<7d} {:9.8E} {:9.8E} {:7.2f}\n'.format(i, v.x, v.y,
-                                                               bathymetry[i-1]))
-            f.readline()
-        for line in f:
-            fw.write(line)
-    os.rename(tmp, file_name)
-
-
-
+    bathymetry = np.asarray(bathymetry)
 
+    # this currrently uses the template for formatting purposes
+    header, tail = _read_template(template, data.node_num)
 
+    if bathymetry.ndim == 1:
+        node_block = list(format_block(node_format, data.node_ids, data.x,
+                                       data.y, bathymetry))
+        for path in paths:
+            _write(os.path.join(path, file_name), header, node_block, tail)
+    else:
+        for i, path in enumerate(paths):
+            node_block = format_block(node_format, data.node_ids, data.x,
+                                      data.y, bathymetry[:, i])
+            _write(os.path.join(path, file_name), header, node_block, tail)
 
@@ -85,6 +85,7 @@ def read_recording_data(data, path=None):
     Calulcates and stores:
         
         * recording[key] = (meas_locs, total_obs, irtype)
+        * record_times[key] = times of the records in seconds
         * stations[key] = list() of locations
 
     :type data: :class:`~polyadcirc.run_framework.domain`
@@ -104,6 +105,7 @@ def read_recording_data(data, path=None):
         
     data.stations = {}
     data.recording = {}
+    data.record_times = {}
 
     with open(file_name, 'r+') as fid:
         line = fid.readline()
@@ -197,8 +199,23 @@ def _read_record(fid, key, line, data):
     else:
         meas_locs = data.node_num
     data.recording[key] = (meas_locs, total_obs, filetype[key][1]) 
+    data.record_times[key] = _record_times(touts, nspool, total_obs, data)
     return description
 
+def _record_times(touts, nspool, total_obs, data):
+    """
+    :param float touts: time (days) to start recording
+    :param float nspool: number of timesteps between records
+    :param int total_obs: number of records
+    :param data: object to store mesh specific data
+    :type data: :class:``~polyadcirc.run_framework.domain``
+
+    :rtype: :class:`numpy.ndarray`
+    :returns: times (seconds) of the records
+
+    """
+    return touts*24*60*60 + nspool*data.time.dt*np.arange(1, total_obs+1)
+
 def _read_record7(fid, key1, key2, line, data):
     """
     Saves metadata to ``data.stations[key]`` and ``data.recording[key]`` that
@@ -242,6 +259,8 @@ def _read_record7(fid, key1, key2, line, data):
         meas_locs = data.node_num
     data.recording[key1] = (meas_locs, total_obs, filetype[key1][1])
     data.recording[key2] = (meas_locs, total_obs, filetype[key2][1])
+    data.record_times[key1] = _record_times(touts, nspool, total_obs, data)
+    data.record_times[key2] = data.record_times[key1]
     return description
 
 def subdomain(fulldomain_path, subdomain_path):
@@ -487,3 +506,43 @@ def set_write_hot(nhstar, nhsinc, path=None):
     # rename files
     os.rename(tmp_name, file_name)
 
+def set_sparse_output(sparse=True, path=None):
+    """
+    Set the format of the global elevation (``fort.63``) and velocity
+    (``fort.64``) output files to sparse ASCII (``NOUTGE``, ``NOUTGV`` = 4),
+    which omits the default (dry) values, or to full ASCII (``NOUTGE``,
+    ``NOUTGV`` = 1). The sign of ``NOUTGE``/``NOUTGV`` is kept and output
+    that is turned off (0) is left off.
+
+    :param bool sparse: flag whether to write sparse (True) or full (False)
+        ASCII output
+    :param string path: directory containing the ``fort.15`` file
+
+    """
+    if path is None:
+        path = os.getcwd()
+
+    tmp_name = os.path.join(path, "temp.15")
+    file_name = os.path.join(path, "fort.15")
+
+    if sparse:
+        nout_format = 4
+    else:
+        nout_format = 1
+
+    with open(file_name, 'r') as fid_read, open(tmp_name, 'w') as fid_write:
+        line = fid_read.readline()
+        while line != '':
+            if line.find('NOUTGE') >= 0 or line.find('NOUTGV') >= 0:
+                line = line.partition('!')
+                values = line[0].split()
+                nout = int(values[0])
+                if nout != 0:
+                    values[0] = str(int(math.copysign(nout_format, nout)))
+                fid_write.write(' {:<35} {}{}'.format(' '.join(values), '!',
+                                                      line[-1]))
+            else:
+                fid_write.write(line)
+            line = fid_read.readline()
+    # rename files
+    os.rename(tmp_name, file_name)
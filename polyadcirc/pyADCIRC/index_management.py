@@ -0,0 +1,368 @@
+# Copyright (C) 2013 Lindley Graham
+
+"""
+This module, :mod:`~polyadcirc.pyADCIRC.index_management`, builds byte offset
+indices of ``fort.14``, ``fort.13``, and timeseries (``fort.6*``, ``fort.7*``)
+formatted files so that readers can :meth:`file.seek` directly to a section or
+record instead of reading the file from the top. Indices are stored in a
+sidecar file (``.fort.##.idx.npz``) next to the indexed file, see
+:mod:`~polyadcirc.pyADCIRC.cache_management`.
+"""
+
+import numpy as np
+import polyadcirc.pyADCIRC.cache_management as cache
+
+#: file extension of index sidecar files
+index_ext = '.idx.npz'
+#: number of bytes read at a time while scanning
+block_size = 2**24
+#: number of bytes read by the first read of :meth:`skip_lines`
+first_block_size = 2**12
+
+def skip_lines(fid, num_lines):
+    """
+    Advance ``fid`` past the next ``num_lines`` lines by counting newlines in
+    blocks. The first block is :data:`first_block_size` bytes and each
+    following block is twice as large up to :data:`block_size` so that
+    skipping a few lines does not read a large block.
+
+    :type fid: :class:`file`
+    :param fid: file object opened for reading, only use
+        :meth:`file.readline`, :meth:`file.read`, and :meth:`file.seek` with
+        ``fid``
+    :param int num_lines: number of lines to skip
+    :rtype: int
+    :returns: offset of the start of the next line
+
+    """
+    size = first_block_size
+    while num_lines > 0:
+        start = fid.tell()
+        block = fid.read(size)
+        size = min(2*size, block_size)
+        if block == '':
+            raise IOError('unexpected end of file')
+        count = block.count('\n')
+        if count < num_lines:
+            num_lines -= count
+            continue
+        end = -1
+        for _ in xrange(num_lines):
+            end = block.find('\n', end+1)
+        fid.seek(start+end+1)
+        num_lines = 0
+    return fid.tell()
+
+def record_offsets(fid, record_lines):
+    """
+    Find the offsets of the starts of all records of ``record_lines`` lines
+    from the current position of ``fid`` to the end of the file. Newlines are
+    located with :meth:`numpy.flatnonzero` on each block.
+
+    :type fid: :class:`file`
+    :param fid: file object opened for reading positioned at the start of the
+        first record
+    :param int record_lines: number of lines in each record
+    :rtype: :class:`numpy.ndarray`
+    :returns: offsets of the start of each complete record
+
+    """
+    start = fid.tell()
+    offsets = [np.array([start], dtype=np.int64)]
+    # number of lines started before the current block
+    lines = 0
+    base = start
+    last = '\n'
+    while True:
+        block = fid.read(block_size)
+        if block == '':
+            break
+        last = block[-1]
+        newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) ==
+                                  ord('\n'))
+        # line number of the line started after each newline
+        started = lines+1+np.arange(len(newlines))
+        select = started % record_lines == 0
+        offsets.append(base+newlines[select]+1)
+        lines += len(newlines)
+        base += len(block)
+    if last != '\n':
+        # the last line is not terminated by a newline
+        lines += 1
+    return np.concatenate(offsets)[:lines/record_lines]
+
+def fixed_record_offsets(fid, record_lines, checks=3):
+    """
+    Find the offsets of the starts of all records of ``record_lines`` lines
+    from the current position of ``fid`` assuming that every record has the
+    same length in bytes as the first record (i.e. the lines are written
+    with fixed width formats). Only the first record and the starts of
+    ``checks`` evenly spaced records (including the last complete record)
+    are read.
+
+    :type fid: :class:`file`
+    :param fid: file object opened for reading positioned at the start of the
+        first record
+    :param int record_lines: number of lines in each record
+    :param int checks: number of records after the first to check
+    :rtype: :class:`numpy.ndarray` or None
+    :returns: offsets of the start of each complete record or None if the
+        records are not all the same length
+
+    """
+    start = fid.tell()
+    first_line = fid.readline()
+    try:
+        skip_lines(fid, record_lines-1)
+    except IOError:
+        return None
+    record_length = fid.tell()-start
+    fid.seek(-1, 2)
+    size = fid.tell()+1
+    if fid.read(1) != '\n':
+        # the last line is not terminated by a newline
+        size += 1
+    num = (size-start)/record_length
+    if num < 1:
+        return None
+    offsets = start+record_length*np.arange(num, dtype=np.int64)
+    # each checked record must start after a newline with a line that looks
+    # like the first line of the first record and end with a newline
+    tokens = len(first_line.split())
+    for i in np.unique(np.linspace(0, num-1, checks+1).astype(int)):
+        fid.seek(int(offsets[i])-1)
+        if fid.read(1) != '\n':
+            return None
+        line = fid.readline()
+        if len(line) != len(first_line) or len(line.split()) != tokens:
+            return None
+        fid.seek(int(offsets[i])+record_length-1)
+        if fid.read(1) not in ('\n', ''):
+            return None
+    return offsets
+
+def sparse_record_offsets(fid):
+    """
+    Find the offsets of the starts of all records of a sparse ASCII formatted
+    timeseries file from the current position of ``fid`` to the end of the
+    file. The first line of each record contains the number of lines that
+    follow it. The file is scanned once in blocks, newlines are located with
+    :meth:`numpy.flatnonzero` on each block and only the first line of each
+    record is parsed.
+
+    :type fid: :class:`file`
+    :param fid: file object opened for reading positioned at the start of the
+        first record
+    :rtype: :class:`numpy.ndarray`
+    :returns: offsets of the start of each complete record
+
+    """
+    offsets = []
+    # offset of the start of the current record
+    start = fid.tell()
+    # offset of the start of the current block
+    base = start
+    # part of the first line of the current record in previous blocks
+    pending = ''
+    # number of lines of the current record left to skip, None while the
+    # first line of the record is read
+    skip = None
+    while True:
+        block = fid.read(block_size)
+        if block == '':
+            break
+        newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) ==
+                                  ord('\n'))
+        # position in ``block`` and index in ``newlines`` of the next line
+        pos, i = 0, 0
+        while True:
+            if skip is None:
+                if i == len(newlines):
+                    pending += block[pos:]
+                    break
+                line = pending+block[pos:newlines[i]]
+                pending = ''
+                if line.strip() == '':
+                    return np.array(offsets, dtype=np.int64)
+                skip = int(line.split()[2])
+                pos = newlines[i]+1
+                i += 1
+            if i+skip > len(newlines):
+                skip -= len(newlines)-i
+                break
+            if skip > 0:
+                i += skip
+                pos = newlines[i-1]+1
+            offsets.append(start)
+            start = base+pos
+            skip = None
+        base += len(block)
+    if skip is None and len(pending.split()) > 2 and \
+            int(pending.split()[2]) == 0:
+        # the last record is a first line without a newline
+        offsets.append(start)
+    return np.array(offsets, dtype=np.int64)
+
+def _build_fort14(fid):
+    """
+    :type fid: :class:`file`
+    :param fid: ``fort.14`` file object
+    :rtype: dict
+    :returns: offsets of the node, element, and boundary blocks
+
+    """
+    fid.readline()
+    element_num, node_num = np.fromstring(fid.readline().partition('!')[0],
+                                          dtype=int, sep=' ')[:2]
+    index = {'node_num':node_num, 'element_num':element_num}
+    index['nodes'] = fid.tell()
+    index['elements'] = skip_lines(fid, node_num)
+    index['boundaries'] = skip_lines(fid, element_num)
+    return index
+
+def _build_fort13(fid):
+    """
+    :type fid: :class:`file`
+    :param fid: ``fort.13`` file object
+    :rtype: dict
+    :returns: names of the nodal attributes, offsets of the lines following
+        the names in the header (units, values per node, default value), and
+        offsets of the lines following the names in the body (number of
+        non-default nodes, non-default values)
+
+    """
+    fid.readline()
+    node_num = int(fid.readline().split()[0])
+    attr_num = int(fid.readline().split()[0])
+    names, defaults, values = [], [], {}
+    for _ in xrange(attr_num):
+        names.append(fid.readline().strip())
+        defaults.append(fid.tell())
+        skip_lines(fid, 3)
+    # attributes in the body may be in a different order than in the header
+    for _ in xrange(attr_num):
+        name = fid.readline().strip()
+        values[name] = fid.tell()
+        non_default = int(fid.readline().split()[0])
+        skip_lines(fid, non_default)
+    return {'node_num':node_num, 'names':np.array(names),
+            'defaults':np.array(defaults, dtype=np.int64),
+            'values':np.array([values[attr] for attr in names],
+                              dtype=np.int64)}
+
+def _build_timeseries(fid):
+    """
+    :type fid: :class:`file`
+    :param fid: ``fort.6*`` or ``fort.7*`` file object
+    :rtype: dict
+    :returns: number of stations/nodes and offsets of each record (time line
+        followed by a line for each station/node), the offsets are computed
+        from the length of the first record if all records are the same
+        length, see :meth:`fixed_record_offsets`, and are found with
+        :meth:`sparse_record_offsets` for sparse ASCII formatted files
+
+    """
+    fid.readline()
+    header = np.fromstring(fid.readline().partition('!')[0], sep=' ')
+    meas_locs = int(header[1])
+    start = fid.tell()
+    if len(fid.readline().partition('!')[0].split()) == 4:
+        # sparse ASCII format
+        fid.seek(start)
+        return {'meas_locs':meas_locs, 'records':sparse_record_offsets(fid)}
+    fid.seek(start)
+    records = fixed_record_offsets(fid, meas_locs+1)
+    if records is None:
+        fid.seek(start)
+        records = record_offsets(fid, meas_locs+1)
+    return {'meas_locs':meas_locs, 'records':records}
+
+#: index builders for each file type
+builders = {'fort14':_build_fort14, 'fort13':_build_fort13,
+            'timeseries':_build_timeseries}
+
+def file_kind(file_name):
+    """
+    :param string file_name: file name
+    :rtype: string
+    :returns: key into :data:`builders` for ``file_name``
+
+    """
+    if file_name.endswith('.14'):
+        return 'fort14'
+    elif file_name.endswith('.13'):
+        return 'fort13'
+    return 'timeseries'
+
+def get_index(file_name, kind=None, use_cache=True):
+    """
+    Load the index of ``file_name`` from its sidecar or build (and save) it if
+    the sidecar does not exist or is out of date.
+
+    :param string file_name: path to a ``fort.14``, ``fort.13``, or
+        timeseries formatted file
+    :type kind: string or None
+    :param kind: key into :data:`builders`, if None determined from the file
+        extension
+    :param bool use_cache: flag whether or not to load/save the sidecar
+    :rtype: dict
+    :returns: index of ``file_name``
+
+    """
+    if kind is None:
+        kind = file_kind(file_name)
+    if use_cache:
+        index = cache.load(file_name, index_ext)
+        if index is not None:
+            return index
+    with open(file_name, 'r') as fid:
+        index = builders[kind](fid)
+    if use_cache:
+        cache.save(file_name, index, index_ext)
+    return index
+
+def count_records(file_name, use_cache=True):
+    """
+    Counts the complete records of a timeseries formatted file (e.g. of a
+    hotstarted run where the header does not match the number of records)
+    using the index of the file.
+
+    :param string file_name: path to a timeseries formatted file
+    :param bool use_cache: flag whether or not to load/save the sidecar
+    :rtype: int
+    :returns: number of complete records
+
+    """
+    return get_index(file_name, 'timeseries', use_cache)['records'].shape[0]
+
+def seek_record(fid, index, record):
+    """
+    Move ``fid`` to the start of a record of a timeseries formatted file.
+
+    :type fid: :class:`file`
+    :param fid: file object of the indexed file
+    :param dict index: index of the file, see :meth:`get_index`
+    :param int record: record (timestep) number starting from 0
+
+    """
+    fid.seek(int(index['records'][record]))
+
+def seek_attribute(fid, index, name, default=False):
+    """
+    Move ``fid`` to the line after the name of a nodal attribute in a
+    ``fort.13`` formatted file.
+
+    :type fid: :class:`file`
+    :param fid: file object of the indexed file
+    :param dict index: index of the file, see :meth:`get_index`
+    :param string name: name of the nodal attribute
+    :param bool default: if True seek to the header section (units, values
+        per node, default value) otherwise seek to the body section (number
+        of non-default nodes, non-default values)
+
+    """
+    i = list(index['names']).index(name)
+    if default:
+        fid.seek(int(index['defaults'][i]))
+    else:
+        fid.seek(int(index['values'][i]))
@@ -3,17 +3,30 @@
 """
 This module provides methods for retrieving data from ASCII ADCIRC formatted
 timeseries and non-timeseries data files and returning that data as numpy
-arrays.
+arrays. Both the full and the sparse ASCII formats (``NOUTGE``, ``NOUTGV`` =
+4, see :meth:`~polyadcirc.pyADCIRC.fort15_management.set_sparse_output`) are
+supported, values omitted from sparse files are filled with the default value
+of each record.
 """
 
-import subprocess, os
+import os, multiprocessing, abc
+from multiprocessing.pool import ThreadPool
+from itertools import islice
 import numpy as np
 import polyadcirc.pyADCIRC.fort15_management as f15
+import polyadcirc.pyADCIRC.index_management as index_management
+import polyadcirc.pyADCIRC.fort14_management as f14
 
-def get_data_nts(kk, path, data, nts_data, file_names=["tinun.63"]):
+#: number of bytes read at a time from timeseries formatted files
+block_size = 2**24
+
+def get_data_nts(kk, path, data, nts_data, file_names=["tinun.63"],
+                 timesteps=None, ihot=None, params=None):
     """
     Retrieves data from a nontimeseries formatted files in path and adds data
-    to ``nts_data``
+    to ``nts_data``. Names in ``file_names`` that are keys of
+    :data:`reductions` (e.g. ``timemax63``) are computed from the
+    timeseries files with :meth:`get_reductions`.
 
     :param int kk: run number
     :param string path: ``RF_directory_*`` path
@@ -21,21 +34,26 @@ def get_data_nts(kk, path, data, nts_data, file_names=["tinun.63"]):
     :param dict nts_data: reference to dict() to store data to
     :param list file_names: list of :program:`ADCIRC` output files to
         retrieve data from
+    :param int timesteps: number of timesteps to reduce
+    :param int ihot: hotstart flag (0, 67, 68)
+    :type params: dict or None
+    :param params: keyword arguments of the reducers, see
+        :meth:`get_reductions`
 
     """
-    for fid in file_names:
-        key = fid.replace('.', '')
-        if key == "timemax63":
-            ts_sr, time_obs = get_ts_sr(path, "fort.63", True)  
-            i = np.argmax(ts_sr, 1)
-            nts_data[key][..., kk] = np.squeeze(time_obs[i])
+    keys = [fid.replace('.', '') for fid in file_names]
+    reduced = get_reductions(path, [key for key in keys if \
+            reductions.has_key(key)], timesteps, ihot, params)
+    for fid, key in zip(file_names, keys):
+        if reduced.has_key(key):
+            nts_data[key][..., kk] = reduced[key]
         else:
             nts_data[key][..., kk] = get_nts_sr(path, data, fid)
     
 def get_nts_sr(path, data, file_name):
     """
     Retrieves data from a nontimeseries formatted file in path and adds data
-    to ``nts_data``
+    to ``nts_data``. Both full and sparse ASCII formatted files are read.
 
     :param string path: ``RF_directory_*`` path
     :param data: :class:`~polyadcirc.run_framework.domain`
@@ -47,19 +65,23 @@ def get_nts_sr(path, data, file_name):
 
     """
 
-    single_nodal_data = np.zeros((data.node_num,))        
     with open(os.path.join(path, file_name), 'r') as fid:
         # skip header information
         # skip some header information
-        fid.readline()
-        fid.readline()
-        fid.readline()
-        for i in xrange(data.node_num): 
-            single_nodal_data[i] = np.fromstring(fid.readline(), sep=' ')[1]
+        next(fid)
+        next(fid)
+        line = next(fid)
+        if is_sparse(line):
+            header = np.fromstring(line, sep=' ')
+            block = f14.read_block(fid, int(header[2]), 2)
+            single_nodal_data = _scatter(header, block, data.node_num)[:, 0]
+        else:
+            single_nodal_data = f14.read_block(fid, data.node_num, 2)[:, 1]
     return single_nodal_data
 
 def get_data_ts(kk, path, ts_data, time_obs, file_names=["fort.61"],
-                timesteps=None, ihot=None):
+                timesteps=None, ihot=None, nodes=None, window=None,
+                stride=None, record_times=None):
     """
     Retrieves data from a timeseries formatted files in path and adds data
     to ``ts_data``
@@ -71,20 +93,867 @@ def get_data_ts(kk, path, ts_data, time_obs, file_names=["fort.61"],
     :param list file_names: list of :program:`ADCIRC` output files to
     :param int ihot: hotstart flag (0, 67, 68)
     :param int timesteps: number of timesteps to read
+    :param nodes: positions of the nodes to read from global (not station)
+        files, see :meth:`get_ts_sr`
+    :param tuple window: (t0, t1) times of the records to read
+    :param int stride: read every ``stride`` record
+    :type record_times: dict or None
+    :param record_times: times of the records of each file (e.g.
+        :attr:`~polyadcirc.run_framework.domain.domain.record_times`) used
+        to select the records in ``window``, these should be the times
+        used to pre-allocate ``ts_data``, if None computed from the header
+        of each file
 
     """
     for fid in file_names:
         key = fid.replace('.', '')
+        if f15.filetype.has_key(key) and f15.filetype[key][0]:
+            # station files
+            key_nodes = None
+        else:
+            key_nodes = nodes
+        if record_times is not None:
+            key_times = record_times.get(key)
+        else:
+            key_times = None
+        single_timeseries_data, times = get_ts_sr(path, fid, kk == 0,
+                                                  timesteps, ihot, key_nodes,
+                                                  window, stride, key_times)
+        if single_timeseries_data.shape[1] != ts_data[key].shape[1]:
+            raise ValueError('{} in {} has {:d} selected records, expected '
+                             '{:d}'.format(fid, path,
+                                           single_timeseries_data.shape[1],
+                                           ts_data[key].shape[1]))
+        ts_data[key][..., kk] = single_timeseries_data
         if kk == 0:
-            ts_data[key][..., kk], time_obs[key] = get_ts_sr(path, fid, True,
-                                                             timesteps, ihot)
+            time_obs[key] = times
+
+def _get_run(column, path, data, ts_data, nts_data, ts_names, nts_names,
+             options):
+    """
+    Reads the output of a single run into column ``column`` of the arrays in
+    ``ts_data`` and ``nts_data``.
+
+    :rtype: tuple
+    :returns: (dict of views of the columns of ``ts_data``, dict of the times
+        of the recordings, dict of views of the columns of ``nts_data``)
+
+    """
+    ts_column, time_obs, nts_column = {}, {}, {}
+    for fid in ts_names:
+        key = fid.replace('.', '')
+        ts_column[key] = ts_data[key][..., column:column+1]
+    for fid in nts_names:
+        key = fid.replace('.', '')
+        nts_column[key] = nts_data[key][..., column:column+1]
+    ts_options = dict([(k, v) for k, v in options.iteritems() if k != \
+                       'params'])
+    get_data_ts(0, path, ts_column, time_obs, ts_names,
+                record_times=getattr(data, 'record_times', None),
+                **ts_options)
+    get_data_nts(0, path, data, nts_column, nts_names,
+                 options.get('timesteps'), options.get('ihot'),
+                 options.get('params'))
+    return ts_column, time_obs, nts_column
+
+#: arguments of :meth:`_get_run` shared with forked worker processes by
+#: :meth:`get_data_batch`
+_shared = None
+
+def _get_run_process(task):
+    """
+    Reads the output of a single run in a worker process. Columns of arrays
+    that are memory-mapped (:class:`numpy.memmap`) are written in place, the
+    columns of other arrays are returned to the parent process.
+
+    :param tuple task: (column, path)
+    :rtype: tuple
+    :returns: (column, dict of columns of ``ts_data``, dict of the times of
+        the recordings, dict of columns of ``nts_data``)
+
+    """
+    column, path = task
+    data, ts_data, nts_data, ts_names, nts_names, options = _shared
+    ts_column, time_obs, nts_column = _get_run(column, path, data, ts_data,
+                                               nts_data, ts_names, nts_names,
+                                               options)
+    ts_column = dict([(k, np.array(v)) for k, v in ts_column.iteritems() \
+            if not isinstance(ts_data[k], np.memmap)])
+    nts_column = dict([(k, np.array(v)) for k, v in nts_column.iteritems() \
+            if not isinstance(nts_data[k], np.memmap)])
+    return column, ts_column, time_obs, nts_column
+
+def get_data_batch(columns, paths, data, ts_data, time_obs, nts_data,
+                   ts_names, nts_names, workers=1, processes=False,
+                   **options):
+    """
+    Retrieves data from the output files of a batch of runs and stores the
+    data of the run in ``paths[i]`` in column ``columns[i]`` of the arrays in
+    ``ts_data`` and ``nts_data``. The runs are read concurrently by a pool of
+    ``workers`` threads or processes. Worker processes are forked and write
+    directly into arrays that are memory-mapped (:class:`numpy.memmap`),
+    other arrays are filled from the columns returned by the workers.
+
+    :param list columns: column (run number) of each run
+    :param list paths: ``RF_directory_*`` path of each run
+    :param data: :class:`~polyadcirc.run_framework.domain`
+    :param dict ts_data: reference to dict() to store timeseries data to
+    :type time_obs: dict or None
+    :param time_obs: reference to dict() to store time data to, only
+        updated by the run in column 0
+    :param dict nts_data: reference to dict() to store non timeseries data to
+    :param list ts_names: names of ADCIRC timeseries output files
+    :param list nts_names: names of ADCIRC non timeseries output files or
+        online reductions (see :data:`reductions`)
+    :param int workers: number of threads or processes, if 1 the runs are
+        read one after another
+    :param bool processes: flag whether to use a pool of processes (True) or
+        threads (False)
+    :param options: ``timesteps``, ``ihot``, ``nodes``, ``window``,
+        ``stride``, see :meth:`get_data_ts`, and ``params``, see
+        :meth:`get_data_nts`
+
+    """
+    global _shared
+    tasks = zip(columns, paths)
+    if workers <= 1 or len(tasks) <= 1:
+        results = [(column,)+_get_run(column, path, data, ts_data, nts_data,
+                                      ts_names, nts_names, options) for \
+                   column, path in tasks]
+    elif processes:
+        _shared = (data, ts_data, nts_data, ts_names, nts_names, options)
+        pool = multiprocessing.Pool(min(workers, len(tasks)))
+        try:
+            results = pool.map(_get_run_process, tasks)
+        finally:
+            pool.close()
+            pool.join()
+            _shared = None
+        for column, ts_column, times, nts_column in results:
+            for k, v in ts_column.iteritems():
+                ts_data[k][..., column:column+1] = v
+            for k, v in nts_column.iteritems():
+                nts_data[k][..., column:column+1] = v
+    else:
+        pool = ThreadPool(min(workers, len(tasks)))
+        try:
+            results = pool.map(lambda task: (task[0],)+_get_run(task[0],
+                task[1], data, ts_data, nts_data, ts_names, nts_names,
+                options), tasks)
+        finally:
+            pool.close()
+            pool.join()
+    for column, ts_column, times, nts_column in results:
+        if column != 0 or time_obs is None:
+            continue
+        for k, v in times.iteritems():
+            if time_obs.has_key(k) and time_obs[k].shape == v.shape:
+                # keep pre-allocated (e.g. memory-mapped) arrays
+                time_obs[k][:] = v
+            else:
+                time_obs[k] = v
+
+def get_ts_info(path, file_name, timesteps=None, ihot=None):
+    """
+    Reads the header of a timeseries formatted file in path
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file
+    :param int timesteps: number of timesteps to read
+    :param int ihot: hotstart flag (0, 67, 68)
+
+    :rtype: tuple
+    :returns: (number of stations/nodes, number of records to read, number
+        of values per station/node)
+
+    """
+    with open(os.path.join(path, file_name), 'r') as fid:
+        # skip some header information
+        fid.readline()
+        line = fid.readline().strip()#rpartition('File')[0]
+        line = np.fromstring(line, sep=' ')
+    meas_locs = int(line[1])
+    if ihot > 0:
+        # the header of a hotstarted run does not match the number of records
+        total_obs = index_management.count_records(os.path.join(path,
+                                                                file_name))
+    else:
+        total_obs = int(line[0])
+    if timesteps and timesteps < total_obs:
+        total_obs = timesteps
+    key = file_name.replace('.', '')
+    if f15.filetype.has_key(key):
+        irtype = f15.filetype[key][1]
+    else:
+        irtype = int(line[4])
+    return meas_locs, total_obs, irtype
+
+def record_times(path, file_name, total_obs):
+    """
+    Computes the times of the records of a timeseries formatted file in path
+    from the time of the first record and the recording interval in the
+    header.
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file
+    :param int total_obs: number of records
+
+    :rtype: :class:`numpy.ndarray`
+    :returns: times of the records
+
+    """
+    interval = record_interval(path, file_name)
+    with open(os.path.join(path, file_name), 'r') as fid:
+        fid.readline()
+        fid.readline()
+        first = np.fromstring(fid.readline(), sep=' ')
+    if first.size == 0:
+        return np.zeros((0,))
+    return first[0]+interval*np.arange(total_obs)
+
+def record_interval(path, file_name):
+    """
+    Reads the recording interval from the header of a timeseries formatted
+    file in path.
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file
+
+    :rtype: float
+    :returns: time between records
+
+    """
+    with open(os.path.join(path, file_name), 'r') as fid:
+        fid.readline()
+        header = np.fromstring(fid.readline().partition('!')[0], sep=' ')
+    if header.size < 3:
+        raise IOError('missing or truncated header in '
+                      '{}'.format(os.path.join(path, file_name)))
+    return header[2]
+
+def select_records(times, window=None, stride=None):
+    """
+    :param times: :class:`numpy.ndarray` of the times of the records
+    :param tuple window: (t0, t1) times of the first and last records to
+        select
+    :param int stride: select every ``stride`` record (counting from the
+        first record of the file)
+
+    :rtype: :class:`numpy.ndarray`
+    :returns: positions of the selected records in increasing order
+
+    """
+    select = np.ones(times.shape, dtype=bool)
+    if window is not None:
+        select &= np.logical_and(times >= window[0], times <= window[1])
+    if stride:
+        select[np.arange(times.shape[0]) % stride != 0] = False
+    return np.flatnonzero(select)
+
+def select_nodes(nodes, meas_locs):
+    """
+    :param nodes: positions (zero based) of the nodes/stations to select or
+        a boolean mask of length ``meas_locs``, e.g.
+        :meth:`~polyadcirc.run_framework.domain.domain.nodes_in_polygon`
+    :param int meas_locs: number of stations/nodes in each record
+
+    :rtype: :class:`numpy.ndarray`
+    :returns: positions of the selected nodes
+
+    """
+    nodes = np.asarray(nodes)
+    if nodes.dtype == bool:
+        if nodes.shape[0] != meas_locs:
+            raise ValueError('node mask must have one entry per node')
+        return np.flatnonzero(nodes)
+    return nodes.astype(int)
+
+def _records(path, file_name, total_obs, window, stride, times=None):
+    """
+    :type times: :class:`numpy.ndarray` or None
+    :param times: times of the records (e.g.
+        :attr:`~polyadcirc.run_framework.domain.domain.record_times` from
+        the ``fort.15``), if None computed from the header, see
+        :meth:`record_times`
+    :rtype: :class:`numpy.ndarray` or None
+    :returns: positions of the records in ``window`` and ``stride`` or None
+        if all records are selected
+
+    """
+    if window is None and not stride:
+        return None
+    if times is None:
+        times = record_times(path, file_name, total_obs)
+    else:
+        times = np.asarray(times)[:total_obs]
+    return select_records(times, window, stride)
+
+def iter_ts_sr(path, file_name, timesteps=None, ihot=None, nodes=None,
+               window=None, stride=None, times=None):
+    """
+    Iterates over the records of a timeseries formatted file in path. Records
+    are read and parsed in chunks of about :data:`block_size` bytes so that
+    only one chunk is held in memory at a time. Lines of records or nodes
+    that are not selected are not parsed.
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file to retrieve data
+        from
+    :param int timesteps: number of timesteps to read
+    :param int ihot: hotstart flag (0, 67, 68)
+    :param nodes: positions (zero based) of the stations/nodes to read or a
+        boolean mask, see :meth:`select_nodes`, if None read all of them
+    :param tuple window: (t0, t1) times of the records to read
+    :param int stride: read every ``stride`` record
+    :param times: times of the records used to select the records in
+        ``window``, if None computed from the header, see :meth:`_records`
+
+    :rtype: generator
+    :returns: tuples of (times of the records in the chunk, array of
+        dimensions (``meas_locs``, number of records in the chunk) or
+        (``meas_locs``, number of records in the chunk, ``irtype``))
+
+    """
+    meas_locs, total_obs, irtype = get_ts_info(path, file_name, timesteps,
+                                               ihot)
+    records = _records(path, file_name, total_obs, window, stride, times)
+    return _iter_chunks(os.path.join(path, file_name), meas_locs, total_obs,
+                        irtype, nodes, records)
+
+def _iter_chunks(file_name, meas_locs, total_obs, irtype, nodes=None,
+                 records=None):
+    """
+    See :meth:`iter_ts_sr`
+
+    :param string file_name: path to a timeseries formatted file
+    :param int meas_locs: number of stations/nodes in each record
+    :param int total_obs: number of records to read
+    :param int irtype: number of values per station/node
+    :param nodes: positions of the stations/nodes to read
+    :param records: :class:`numpy.ndarray` of the positions of the records
+        to read in increasing order, see :meth:`select_records`
+    :rtype: generator
+
+    """
+    # lines of each record to parse
+    line_keep = None
+    inverse = None
+    sub_locs = meas_locs
+    if nodes is not None:
+        nodes = select_nodes(nodes, meas_locs)
+        unique, inverse = np.unique(nodes, return_inverse=True)
+        if np.array_equal(unique, nodes):
+            inverse = None
+        line_keep = np.zeros((meas_locs+1,), dtype=bool)
+        line_keep[0] = True
+        line_keep[1+unique] = True
+        sub_locs = unique.shape[0]
+    # records to parse
+    record_keep = None
+    if records is not None:
+        record_keep = np.zeros((total_obs,), dtype=bool)
+        record_keep[records] = True
+        if records.shape[0] > 0:
+            total_obs = records[-1]+1
         else:
-            ts_data[key][..., kk] = get_ts_sr(path, fid, timesteps, ihot)[0] 
+            total_obs = 0
+    i = 0
+    with open(file_name, 'r') as fid:
+        # skip header information
+        fid.readline()
+        fid.readline()
+        start = fid.tell()
+        sparse = is_sparse(fid.readline())
+        fid.seek(start)
+        if sparse:
+            for chunk in _iter_sparse(fid, meas_locs, total_obs, irtype,
+                                      nodes, record_keep):
+                yield chunk
+            return
+        for block, num in _record_blocks(fid, meas_locs):
+            if i >= total_obs:
+                break
+            num = min(num, total_obs-i)
+            if record_keep is None and line_keep is None:
+                times, values = _parse_records(block, meas_locs, irtype, num)
+            else:
+                if record_keep is None:
+                    keep = np.ones((num,), dtype=bool)
+                else:
+                    keep = record_keep[i:i+num]
+                if not keep.any():
+                    i += num
+                    continue
+                block = _select_lines(block, meas_locs+1, keep, line_keep)
+                times, values = _parse_records(block, sub_locs, irtype,
+                                               np.sum(keep))
+            values = values.transpose((1, 0, 2))
+            if inverse is not None:
+                values = values[inverse]
+            if irtype == 1:
+                values = values[..., 0]
+            yield times, values
+            i += num
+    if i < total_obs:
+        raise IOError('unexpected end of file in {}, read {:d} of {:d} '
+                      'records'.format(file_name, i, total_obs))
+
+def is_sparse(line):
+    """
+    :param string line: first line of a record
+    :rtype: bool
+    :returns: True if ``line`` is the first line of a record of a sparse
+        ASCII formatted file (time, timestep, number of non-default values,
+        default value) and False if it is the first line of a record of a
+        full ASCII formatted file (time, timestep)
+
+    """
+    return len(line.partition('!')[0].split()) == 4
+
+def _scatter(header, block, meas_locs):
+    """
+    :param header: :class:`numpy.ndarray` of the values in the first line of
+        a record of a sparse ASCII formatted file
+    :param block: :class:`numpy.ndarray` of shape (number of non-default
+        values, 1+``irtype``) of the node numbers and non-default values
+    :param int meas_locs: number of stations/nodes
+    :rtype: :class:`numpy.ndarray`
+    :returns: array of dimensions (``meas_locs``, ``irtype``) of the values
+        at every station/node, nodes that are not in ``block`` have the
+        default value (:data:`dry_value` for elevations)
+
+    """
+    values = np.empty((meas_locs, block.shape[1]-1))
+    values.fill(header[3])
+    values[block[:, 0].astype(int)-1] = block[:, 1:]
+    return values
+
+def _iter_sparse(fid, meas_locs, total_obs, irtype, nodes=None,
+                 record_keep=None):
+    """
+    Iterates over the records of a sparse ASCII formatted file one record at
+    a time and scatters the non-default values into dense arrays. The lines
+    of records that are not selected are not parsed.
+
+    :type fid: :class:`file`
+    :param fid: file object positioned at the start of the first record
+    :param int meas_locs: number of stations/nodes in each record
+    :param int total_obs: number of records to read
+    :param int irtype: number of values per station/node
+    :param nodes: :class:`numpy.ndarray` of the positions of the
+        stations/nodes to read
+    :param record_keep: boolean :class:`numpy.ndarray`, records to read
+    :rtype: generator
+
+    """
+    for i in xrange(total_obs):
+        line = next(fid, '')
+        if line == '':
+            raise IOError('unexpected end of file in {}, read {:d} of {:d} '
+                          'records'.format(fid.name, i, total_obs))
+        header = np.fromstring(line, sep=' ')
+        num = int(header[2])
+        if record_keep is not None and not record_keep[i]:
+            for _ in islice(fid, num):
+                pass
+            continue
+        block = f14.read_block(fid, num, 1+irtype)
+        values = _scatter(header, block, meas_locs)
+        if nodes is not None:
+            values = values[nodes]
+        values = values[:, np.newaxis, :]
+        if irtype == 1:
+            values = values[..., 0]
+        yield header[:1], values
+
+def _select_lines(block, record_lines, record_keep, line_keep=None):
+    """
+    Removes the lines of records and of stations/nodes that are not selected
+    from ``block`` with a single boolean mask over its bytes.
+
+    :param string block: whole records
+    :param int record_lines: number of lines in each record
+    :param record_keep: boolean :class:`numpy.ndarray`, records to keep
+    :param line_keep: boolean :class:`numpy.ndarray` of length
+        ``record_lines``, lines of each record to keep, if None keep all of
+        them
+    :rtype: string
+    :returns: the selected lines
+
+    """
+    chars = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero(chars == ord('\n'))+1
+    if ends.shape[0] == 0 or ends[-1] != chars.shape[0]:
+        ends = np.append(ends, chars.shape[0])
+    ends = ends[:record_keep.shape[0]*record_lines]
+    starts = np.concatenate(([0], ends[:-1]))
+    lines = np.arange(ends.shape[0])
+    keep = record_keep[lines/record_lines]
+    if line_keep is not None:
+        keep &= line_keep[lines % record_lines]
+    return chars[:ends[-1]][np.repeat(keep, ends-starts)].tostring()
+
+def iter_ts_records(path, file_name, timesteps=None, ihot=None, nodes=None,
+                    window=None, stride=None):
+    """
+    Iterates over the records of a timeseries formatted file in path one
+    record at a time, see :meth:`iter_ts_sr`
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file to retrieve data
+        from
+    :param int timesteps: number of timesteps to read
+    :param int ihot: hotstart flag (0, 67, 68)
+    :param nodes: positions of the stations/nodes to read
+    :param tuple window: (t0, t1) times of the records to read
+    :param int stride: read every ``stride`` record
+
+    :rtype: generator
+    :returns: tuples of (time of the recording, array of dimensions
+        (``meas_locs``,) or (``meas_locs``, ``irtype``))
+
+    """
+    for times, values in iter_ts_sr(path, file_name, timesteps, ihot, nodes,
+                                    window, stride):
+        for j in xrange(times.shape[0]):
+            yield times[j], values[:, j, ...]
+
+def map_ts_sr(path, file_name, function, timesteps=None, ihot=None):
+    """
+    Applies ``function`` to each record of a timeseries formatted file in
+    path without holding more than one chunk of records in memory, e.g. ::
+
+        volume, time_obs = map_ts_sr(path, 'fort.63', lambda t, eta:
+                vol.sub_volume(domain, eta, elements)[0])
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file to retrieve data
+        from
+    :param function: function of (time, values) that returns a scalar or
+        an array, where values is an array of dimensions (``meas_locs``,) or
+        (``meas_locs``, ``irtype``)
+    :param int timesteps: number of timesteps to read
+    :param int ihot: hotstart flag (0, 67, 68)
+
+    :rtype: tuple
+    :returns: (array of the results stacked along the first axis, times of
+        the recordings)
+
+    """
+    results, time_obs = [], []
+    for t, values in iter_ts_records(path, file_name, timesteps, ihot):
+        results.append(function(t, values))
+        time_obs.append(t)
+    return np.array(results), np.array(time_obs)
+
+def reduce_ts_sr(path, file_name, function, initial, timesteps=None,
+                 ihot=None):
+    """
+    Folds ``function`` over the chunks of records of a timeseries formatted
+    file in path, e.g. the maximum elevation at each node is ::
+
+        reduce_ts_sr(path, 'fort.63', lambda m, t, eta: np.maximum(m,
+                eta.max(axis=1)), -np.inf)
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file to retrieve data
+        from
+    :param function: function of (accumulated value, times, values) that
+        returns the new accumulated value, see :meth:`iter_ts_sr` for the
+        dimensions of times and values
+    :param initial: initial accumulated value
+    :param int timesteps: number of timesteps to read
+    :param int ihot: hotstart flag (0, 67, 68)
+
+    :returns: the accumulated value
+
+    """
+    value = initial
+    for times, values in iter_ts_sr(path, file_name, timesteps, ihot):
+        value = function(value, times, values)
+    return value
+
+#: value recorded at dry nodes in :program:`ADCIRC` output files
+dry_value = -99999.0
+
+#: number of nodes (or stations) fixed at a time by :meth:`fix_dry`
+dry_chunk = 2**12
+
+def fix_dry(values, bathymetry):
+    """
+    Converts elevations to water depths in place by adding the bathymetry of
+    each node (or station) and sets the values of dry nodes
+    (:data:`dry_value`) to zero. The nodes are fixed in chunks of
+    :data:`dry_chunk` nodes so that the temporary dry mask is small and
+    memory-mapped arrays are read and written once in order.
+
+    :param values: :class:`numpy.ndarray` of elevations whose first
+        dimension is the number of nodes (or stations), e.g. of dimensions
+        (``meas_locs``, ``total_obs``, ``irtype``, ``num_points``)
+    :param bathymetry: :class:`numpy.ndarray` of dimensions
+        (``values.shape[0]``,)
+    :rtype: :class:`numpy.ndarray`
+    :returns: values
+
+    """
+    bathymetry = np.reshape(bathymetry, (-1,)+(1,)*(values.ndim-1))
+    if bathymetry.shape[0] != values.shape[0]:
+        raise ValueError('bathymetry of {:d} nodes does not match values of '
+                         '{:d} nodes'.format(bathymetry.shape[0],
+                                             values.shape[0]))
+    for i in xrange(0, values.shape[0], dry_chunk):
+        chunk = values[i:i+dry_chunk]
+        dry = chunk == dry_value
+        chunk += bathymetry[i:i+dry_chunk]
+        chunk[dry] = 0.0
+    return values
+
+class reducer(object):
+    """
+    Online reduction over the chunks of records of a timeseries formatted file
+    (see :meth:`iter_ts_sr`) that stores O(``meas_locs``) values. Vector
+    (``irtype`` = 2) records are reduced by their magnitude. Subclasses
+    implement :meth:`start`, :meth:`reduce`, and :meth:`result`.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    def __init__(self):
+        """
+        Initialization
+        """
+        #: int, number of records reduced
+        self.num = 0
+        #: float, time of the first record
+        self.first_time = None
+        #: float, time of the last record
+        self.last_time = None
+        #: float, time between records when fewer than two records are
+        #: reduced (e.g. from the header, see :meth:`record_interval`)
+        self.record_interval = 0.0
+
+    def update(self, times, values):
+        """
+        Adds a chunk of records to the reduction.
+
+        :param times: :class:`numpy.ndarray` of the times of the records
+        :param values: :class:`numpy.ndarray` of dimensions (``meas_locs``,
+            number of records) or (``meas_locs``, number of records,
+            ``irtype``)
+
+        """
+        dry = values == dry_value
+        if values.ndim == 3:
+            dry = np.any(dry, axis=2)
+            values = np.sqrt(np.sum(values**2, axis=2))
+        if self.num == 0:
+            self.first_time = times[0]
+            self.start(values.shape[0])
+        self.reduce(times, values, dry)
+        self.num += times.shape[0]
+        self.last_time = times[-1]
+
+    def interval(self):
+        """
+        :rtype: float
+        :returns: average time between records
+        """
+        if self.num < 2:
+            return self.record_interval
+        return (self.last_time-self.first_time)/(self.num-1)
+
+    @abc.abstractmethod
+    def start(self, meas_locs):
+        """
+        Allocates the running values.
+
+        :param int meas_locs: number of stations/nodes in each record
+
+        """
+
+    @abc.abstractmethod
+    def reduce(self, times, values, dry):
+        """
+        Updates the running values with a chunk of records.
+
+        :param times: :class:`numpy.ndarray` of the times of the records
+        :param values: :class:`numpy.ndarray` of dimensions (``meas_locs``,
+            number of records)
+        :param dry: boolean :class:`numpy.ndarray` of dimensions
+            (``meas_locs``, number of records), True where a value is dry
+
+        """
+
+    @abc.abstractmethod
+    def result(self):
+        """
+        :rtype: :class:`numpy.ndarray`
+        :returns: array of dimensions (``meas_locs``,)
+        """
+
+class running_max(reducer):
+    """
+    Maximum wet value, :data:`dry_value` if always dry
+    """
+    def start(self, meas_locs):
+        self.value = np.empty((meas_locs,))
+        self.value.fill(-np.inf)
+
+    def reduce(self, times, values, dry):
+        np.maximum(self.value, np.where(dry, -np.inf, values).max(axis=1),
+                   out=self.value)
+
+    def result(self):
+        return np.where(np.isinf(self.value), dry_value, self.value)
+
+class running_min(reducer):
+    """
+    Minimum wet value, :data:`dry_value` if always dry
+    """
+    def start(self, meas_locs):
+        self.value = np.empty((meas_locs,))
+        self.value.fill(np.inf)
+
+    def reduce(self, times, values, dry):
+        np.minimum(self.value, np.where(dry, np.inf, values).min(axis=1),
+                   out=self.value)
+
+    def result(self):
+        return np.where(np.isinf(self.value), dry_value, self.value)
 
-def get_ts_sr(path, file_name, get_time=False, timesteps=None, ihot=None):
+class time_of_max(reducer):
+    """
+    Time of the first occurrence of the maximum wet value, 0 if always dry
+    """
+    def start(self, meas_locs):
+        self.value = np.empty((meas_locs,))
+        self.value.fill(-np.inf)
+        self.time = np.zeros((meas_locs,))
+
+    def reduce(self, times, values, dry):
+        values = np.where(dry, -np.inf, values)
+        i = np.argmax(values, axis=1)
+        chunk_max = values[np.arange(values.shape[0]), i]
+        new = chunk_max > self.value
+        self.value[new] = chunk_max[new]
+        self.time[new] = times[i[new]]
+
+    def result(self):
+        return self.time
+
+class time_above(reducer):
+    """
+    Length of time a wet value is above :attr:`threshold`
+    """
+    def __init__(self, threshold=0.0):
+        """
+        Initialization
+        """
+        super(time_above, self).__init__()
+        #: float, threshold value
+        self.threshold = threshold
+
+    def start(self, meas_locs):
+        self.count = np.zeros((meas_locs,), dtype=int)
+
+    def reduce(self, times, values, dry):
+        self.count += np.sum(np.logical_and(values > self.threshold,
+                                            np.logical_not(dry)), axis=1)
+
+    def result(self):
+        return self.count*self.interval()
+
+class wet_count(reducer):
+    """
+    Number of records in which a station/node is wet (inundated)
+    """
+    def start(self, meas_locs):
+        self.count = np.zeros((meas_locs,), dtype=int)
+
+    def reduce(self, times, values, dry):
+        self.count += dry.shape[1]-np.sum(dry, axis=1)
+
+    def result(self):
+        return self.count.astype(float)
+
+class running_mean(reducer):
+    """
+    Mean wet value, :data:`dry_value` if always dry
+    """
+    def start(self, meas_locs):
+        self.total = np.zeros((meas_locs,))
+        self.count = np.zeros((meas_locs,), dtype=int)
+
+    def reduce(self, times, values, dry):
+        self.total += np.where(dry, 0.0, values).sum(axis=1)
+        self.count += dry.shape[1]-np.sum(dry, axis=1)
+
+    def result(self):
+        wet = self.count > 0
+        mean = np.empty(self.total.shape)
+        mean.fill(dry_value)
+        mean[wet] = self.total[wet]/self.count[wet]
+        return mean
+
+#: online reductions that can be requested by name in ``nts_names``, key:
+#: (timeseries file, :class:`reducer` subclass)
+reductions = {'max63':('fort.63', running_max),
+              'min63':('fort.63', running_min),
+              'timemax63':('fort.63', time_of_max),
+              'timeabove63':('fort.63', time_above),
+              'wetcount63':('fort.63', wet_count),
+              'mean63':('fort.63', running_mean),
+              'max64':('fort.64', running_max),
+              'min64':('fort.64', running_min),
+              'timemax64':('fort.64', time_of_max),
+              'timeabove64':('fort.64', time_above),
+              'mean64':('fort.64', running_mean)}
+
+def get_reductions(path, keys, timesteps=None, ihot=None, params=None):
+    """
+    Computes the online reductions in ``keys`` (see :data:`reductions`) of
+    the timeseries formatted files in path with a single pass over each file.
+
+    :param string path: ``RF_directory_*`` path
+    :param list keys: keys of :data:`reductions`
+    :param int timesteps: number of timesteps to read
+    :param int ihot: hotstart flag (0, 67, 68)
+    :type params: dict or None
+    :param params: keyword arguments of the :class:`reducer` of each key,
+        e.g. ``{'timeabove63': {'threshold': 0.5}}``
+
+    :rtype: dict
+    :returns: arrays of dimensions (``meas_locs``,) for each key, files
+        without records give the always dry value of each reduction
+
+    """
+    if params is None:
+        params = {}
+    # group the reducers by file
+    by_file = {}
+    for key in keys:
+        file_name, reducer_class = reductions[key]
+        by_file.setdefault(file_name, {})[key] = \
+                reducer_class(**params.get(key, {}))
+    results = {}
+    for file_name, reducers in by_file.iteritems():
+        interval = record_interval(path, file_name)
+        for r in reducers.itervalues():
+            r.record_interval = interval
+        for times, values in iter_ts_sr(path, file_name, timesteps, ihot):
+            for r in reducers.itervalues():
+                r.update(times, values)
+        for key, r in reducers.iteritems():
+            if r.num == 0:
+                # no records, e.g. TOUTS is after the end of the run
+                r.start(get_ts_info(path, file_name, timesteps, ihot)[0])
+            results[key] = r.result()
+    return results
+
+def get_ts_sr(path, file_name, get_time=False, timesteps=None, ihot=None,
+              nodes=None, window=None, stride=None, times=None):
     """
     Retrieves data from a timeseries formatted file in path and adds data
-    to ``ts_data``
+    to ``ts_data``, see :meth:`iter_ts_sr`
 
     :param string path: ``RF_directory_*`` path
     :param string file_name: :program:`ADCIRC` output file to retrieve data
@@ -92,46 +961,159 @@ def get_ts_sr(path, file_name, get_time=False, timesteps=None, ihot=None):
     :param bool: flag for whether or not to record times of recordings
     :param int timesteps: number of timesteps to read
     :param int ihot: hotstart flag (0, 67, 68)
+    :param nodes: positions (zero based) of the stations/nodes to read or a
+        boolean mask, see :meth:`select_nodes`, if None read all of them
+    :param tuple window: (t0, t1) times of the records to read
+    :param int stride: read every ``stride`` record
+    :param times: times of the records used to select the records in
+        ``window``, if None computed from the header, see :meth:`_records`
     
     :rtype: :class:`numpy.ndarray`
     :returns: array of dimensions (``data.node_num``,)
     
     """
-    # determine the number of lines in the file if HOTSTARTED
-    if ihot > 0:
-        p = subprocess.Popen(['wc', '-l', os.path.join(path, file_name)],
-                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        result, err = p.communicate()
-        if p.returncode != 0:
-            raise IOError(err)
-        total_lines = int(result.strip().split()[0])
+    meas_locs, total_obs, irtype = get_ts_info(path, file_name, timesteps,
+                                               ihot)
+    records = _records(path, file_name, total_obs, window, stride, times)
+    if nodes is not None:
+        nodes = select_nodes(nodes, meas_locs)
+        shape = [nodes.shape[0]]
+    else:
+        shape = [meas_locs]
+    if records is not None:
+        shape.append(records.shape[0])
+    else:
+        shape.append(total_obs)
+    if irtype != 1:
+        shape.append(irtype)
+    single_timeseries_data = np.zeros(shape)
+    if get_time:
+        time_obs = np.zeros((shape[1],))
+    else:
+        time_obs = None
+    i = 0
+    for times, values in _iter_chunks(os.path.join(path, file_name),
+                                      meas_locs, total_obs, irtype, nodes,
+                                      records):
+        num = times.shape[0]
+        if get_time:
+            time_obs[i:i+num] = times
+        single_timeseries_data[:, i:i+num, ...] = values
+        i += num
+    return (single_timeseries_data, time_obs)
 
-    with open(os.path.join(path, file_name), 'r') as fid:
-        # skip some header information
+def _record_blocks(fid, meas_locs):
+    """
+    Reads the records (a time line followed by a line for each station/node)
+    of a timeseries formatted file in blocks of about :data:`block_size`
+    bytes. Blocks are split at record boundaries which are located with
+    :meth:`numpy.flatnonzero`.
+
+    :type fid: :class:`file`
+    :param fid: file object positioned at the start of a record
+    :param int meas_locs: number of stations/nodes in each record
+    :rtype: generator
+    :returns: tuples of (string containing whole records, number of records)
+
+    """
+    record_lines = meas_locs+1
+    pending = []
+    # number of lines in ``pending``
+    lines = 0
+    while True:
+        block = fid.read(block_size)
+        if block == '':
+            break
+        newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) ==
+                                  ord('\n'))
+        # index in ``newlines`` of the first and last record boundaries
+        first = record_lines-lines-1
+        if first >= len(newlines):
+            pending.append(block)
+            lines += len(newlines)
+            continue
+        last = first+((len(newlines)-1-first)/record_lines)*record_lines
+        cut = newlines[last]+1
+        pending.append(block[:cut])
+        yield ''.join(pending), 1+(last-first)/record_lines
+        pending = [block[cut:]]
+        lines = len(newlines)-1-last
+    # the last record may not end with a newline
+    if lines == record_lines-1 and ''.join(pending).strip() != '':
+        yield ''.join(pending), 1
+
+def _parse_records(block, meas_locs, irtype, num=None):
+    """
+    Parses whole records of a timeseries formatted file with a single call to
+    :meth:`numpy.fromstring`. If the records are not laid out as expected
+    each line is parsed individually.
+
+    :param string block: whole records
+    :param int meas_locs: number of stations/nodes in each record
+    :param int irtype: number of values per station/node
+    :param int num: number of records to parse, if None then parse all of
+        the records in ``block``
+    :rtype: tuple
+    :returns: (times of the records, array of size (num, meas_locs, irtype))
+
+    """
+    width = 2+meas_locs*(1+irtype)
+    values = np.fromstring(block, sep=' ')
+    if values.size % width == 0 and (num is None or values.size >= num*width):
+        values = values.reshape((-1, width))[:num]
+        times = values[:, 0]
+        values = values[:, 2:].reshape((-1, meas_locs, 1+irtype))[..., 1:]
+        return times, values
+    # parse each line
+    lines = block.splitlines()
+    if num is None:
+        num = len(lines)/(meas_locs+1)
+    times = np.zeros((num,))
+    values = np.zeros((num, meas_locs, irtype))
+    for i in xrange(num):
+        start = i*(meas_locs+1)
+        times[i] = np.fromstring(lines[start], sep=' ')[0]
+        for j in xrange(meas_locs):
+            values[i, j, ...] = np.fromstring(lines[start+1+j], sep=' ')[1:]
+    return times, values
+
+def get_record(path, file_name, record):
+    """
+    Retrieves a single record (timestep) from a timeseries formatted file in
+    path by seeking to it using the index of the file
+
+    See :meth:`~polyadcirc.pyADCIRC.index_management.get_index`
+
+    :param string path: ``RF_directory_*`` path
+    :param string file_name: :program:`ADCIRC` output file to retrieve data
+        from
+    :param int record: record number starting from 0
+
+    :rtype: tuple
+    :returns: (time of the recording, array of dimensions (``meas_locs``,) or
+        (``meas_locs``, ``irtype``))
+
+    """
+    full_file_name = os.path.join(path, file_name)
+    index = index_management.get_index(full_file_name, 'timeseries')
+    meas_locs = int(index['meas_locs'])
+    with open(full_file_name, 'r') as fid:
         fid.readline()
-        line = fid.readline().strip()#rpartition('File')[0]
-        line = np.fromstring(line, sep=' ')
-        meas_locs = int(line[1])
-        if ihot > 0:
-            total_obs = (total_lines-1)/(meas_locs+1)
+        irtype = int(np.fromstring(fid.readline().partition('!')[0],
+                                   sep=' ')[4])
+        index_management.seek_record(fid, index, record)
+        line = fid.readline()
+        header = np.fromstring(line, sep=' ')
+        time_obs = header[0]
+        if is_sparse(line):
+            lines = ''.join(islice(iter(fid.readline, ''), int(header[2])))
         else:
-            total_obs = int(line[0])
-        if timesteps and timesteps < total_obs:
-            total_obs = timesteps
-        irtype = f15.filetype[file_name.replace('.', '')][1]
-        single_timeseries_data = np.zeros((meas_locs, total_obs, irtype))
-        if get_time:
-            time_obs = np.zeros((total_obs,))
-        else:
-            time_obs = None
-        for i in xrange(total_obs):
-            if get_time:
-                time_obs[i] = np.fromstring(fid.readline(), sep=' ')[0]
-            else:
-                fid.readline()
-            for j in xrange(meas_locs): 
-                single_timeseries_data[j, i, ...] = np.fromstring(\
-                        fid.readline(), sep=' ')[1:]
-    if irtype == 1:
-        single_timeseries_data = np.squeeze(single_timeseries_data, axis=2)
-    return (single_timeseries_data, time_obs)
+            lines = ''.join(islice(iter(fid.readline, ''), meas_locs))
+    values = np.fromstring(lines, sep=' ').reshape((-1, 1+irtype))
+    if is_sparse(line):
+        values = _scatter(header, values, meas_locs)
+    else:
+        values = values[:, 1:]
+    if values.shape[1] == 1:
+        values = values[:, 0]
+    return time_obs, values
@@ -16,6 +16,7 @@ from matplotlib.collections import LineCollection
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 import polyadcirc.pyGriddata.file_management as fm
 import polyadcirc.pyADCIRC.fort15_management as f15
+import polyadcirc.pyADCIRC.output as output
 import polyadcirc.pyGriddata.table_to_mesh_map as tmm
 
 _stationmarkers = {'fort61':'bo', 'fort62':'go', 'fort71':'ro', 'fort72':'co',
@@ -38,10 +39,8 @@ def get_Triangulation(domain, path=None, save=True, show=False, ics=1,
 
     """
 
-    x = np.array([n.x for n in domain.node.itervalues()])
-    y = np.array([n.y for n in domain.node.itervalues()])
-    triangles = np.array([e-1 for e in domain.element.itervalues()])
-    triangulation = tri.Triangulation(x, y, triangles)
+    triangles = domain.triangles()
+    triangulation = tri.Triangulation(domain.x, domain.y, triangles)
     plt.figure()
     if path is None:
         path = os.getcwd()
@@ -123,7 +122,7 @@ def station_locations(domain, path=None, bathy = False, save=True,
     if path is None:
         path = os.getcwd()
     if bathy:
-        z = np.array([n.bathymetry for n in domain.node.itervalues()])
+        z = domain.array_bathymetry()
         plt.tripcolor(domain.triangulation, z, shading='gouraud',
                       cmap=plt.cm.ocean)
         plt.gca().set_aspect('equal')
@@ -202,7 +201,8 @@ def basis_functions(domain, bv_array, path=None, save=True, show=False,
               show, ics, ext, cmap)
 
 def random_fields(domain, points, bv_dict, path=None, save=True, show =
-                  False, ics=1, ext='.png', cmap = plt.cm.jet):
+                  False, ics=1, ext='.png', cmap = plt.cm.jet,
+                  block_size=100):
     """
     Given a ``bv_dict`` a set of random points, plot the ``r_fields``
     generated in
@@ -211,8 +211,8 @@ def random_fields(domain, points, bv_dict, path=None, save=True, show =
     :param domain: :class:`~polyadcirc.run_framework.domain`
     :type points: :class:`numpy.ndarray`
     :param points: weights for points at which the random domain was sampled
-    :type bv_dict: list of ``dict``
-    :param bv_dict: list of basis vectors based on land classification
+    :type bv_dict: :class:`scipy.sparse.csc_matrix`
+    :param bv_dict: basis vectors based on land classification
     :type path: string or None
     :param path: directory to store plots
     :type save: bool
@@ -222,6 +222,7 @@ def random_fields(domain, points, bv_dict, path=None, save=True, show =
     :param int ics:  polar coordinate option (1 = cart coords, 2 = polar
         coords)
     :param string ext: file extension
+    :param int block_size: number of fields to generate at a time
 
     """
     vmax = np.max(points)
@@ -230,11 +231,13 @@ def random_fields(domain, points, bv_dict, path=None, save=True, show =
     vmin = np.min(points)
     clim = (vmin, vmax)
     default = domain.read_default()
-    for i in xrange(points.shape[1]):
-        z = tmm.combine_basis_vectors(points[..., i], bv_dict, default,
-                                      domain.node_num)
-        field(domain, z, 'random_field_'+str(i), clim, path, save, show, ics,
-              ext, cmap)
+    for start, stop, fields in tmm.iter_basis_vectors_batch(points, bv_dict,
+                                                            default,
+                                                            domain.node_num,
+                                                            block_size):
+        for i in xrange(start, stop):
+            field(domain, fields[:, i-start], 'random_field_'+str(i), clim,
+                  path, save, show, ics, ext, cmap)
 
 def mean_field(domain, points, bv_dict, path=None, save=True, show =
                False, ics=1, ext='.png'): 
@@ -245,8 +248,8 @@ def mean_field(domain, points, bv_dict, path=None, save=True, show =
     :param domain: :class:`~polyadcirc.run_framework.domain`
     :type points: :class:`numpy.ndarray`
     :param points: weights for points at which the random domain was sampled
-    :type bv_dict: list of ``dict``
-    :param bv_dict: list of basis vectors based on land classification    
+    :type bv_dict: :class:`scipy.sparse.csc_matrix`
+    :param bv_dict: basis vectors based on land classification    
     :type path: string or None
     :param path: directory to store plots
     :type save: bool
@@ -449,7 +452,7 @@ def nts_pcolor(nts_data, domain, keys=None, points=None, path=None,
         keys = nts_data.keys()
     s_keys = list()
     for k in keys:
-        if k == 'timemax63':
+        if output.reductions.has_key(k):
             s_keys.append(k)
         elif not(f15.filetype[k][0]) and f15.filetype[k][1] == 1:
             s_keys.append(k)
@@ -8,8 +8,10 @@ values for that ``*.table``, or dict, or array of these values.
 
 import glob, os
 import numpy as np
+import scipy.sparse as sp
 from polyadcirc.pyADCIRC.basic import comm
 import polyadcirc.pyADCIRC.fort13_management as f13
+import polyadcirc.pyADCIRC.cache_management as cache
 
 size = comm.Get_size()
 rank = comm.Get_rank()
@@ -31,23 +33,131 @@ class LenError(Error):
         super(LenError, self).__init__()
 
 
-def get_basis_vectors(path=None):
+def _landuse_signature(landuse_folders):
     """
-    Each dict is structured as follows:
-    keys -- node number
-    values -- weighting for spatial averaging
-    currently assumes only 1 folder per landuse classification with the name
-    ``landuse_*/``
+    :param list landuse_folders: sorted list of ``landuse_*`` folders
+    :rtype: dict
+    :returns: names of the ``landuse_*`` folders and modification times of
+        their ``fort.13`` files (not of the folders, reading a ``fort.13``
+        writes its index into the folder)
+
+    """
+    mtimes = [os.stat(os.path.join(folder, 'fort.13')).st_mtime for folder \
+              in landuse_folders]
+    return {'_folders':np.array([os.path.basename(folder) for folder in
+                                 landuse_folders]),
+            '_mtimes':np.array(mtimes)}
+
+def get_basis_vectors(path=None, use_cache=True):
+    """
+    Reads in the basis vectors (one per landuse classification) as the columns
+    of a sparse matrix where the rows are the nodes in numerical order and the
+    entries are the weightings for spatial averaging. Currently assumes only 1
+    folder per landuse classification with the name ``landuse_*/``.
+
+    If ``use_cache`` the matrix is loaded from ``path/.landuse.npz`` if the
+    names of the ``landuse_*`` folders and the modification times of their
+    ``fort.13`` files match those recorded in the cache. Otherwise the matrix
+    is built from the ``fort.13`` files and the cache is (re)written.
 
     :param string path: folder containing the landuse folders
-    :rtype: list
-    :returns: list of dicts for each landuse classification.
+    :param bool use_cache: flag whether or not to use the cache
+    :rtype: :class:`scipy.sparse.csc_matrix`
+    :returns: matrix of size (node_num, num_basis_vec)
     
     """
+    if path is None:
+        path = os.getcwd()
     landuse_folders = glob.glob(os.path.join(path, 'landuse_*'))
     landuse_folders.sort()
-    basis_vec = [f13.read_nodal_attr_dict(folder) for folder in landuse_folders]
-    return basis_vec    
+    cache_name = os.path.join(path, 'landuse')
+    if use_cache:
+        sig = _landuse_signature(landuse_folders)
+        arrays = cache.load(cache_name, sig=sig)
+        if arrays is not None:
+            return sp.csc_matrix((arrays['data'], arrays['indices'],
+                                  arrays['indptr']), shape=arrays['shape'])
+    columns = []
+    node_num = 0
+    for folder in landuse_folders:
+        node_num, attrs = f13.read_nodal_attrs(folder, names=\
+                ['mannings_n_at_sea_floor'])
+        columns.append(attrs['mannings_n_at_sea_floor'])
+    basis_vec = attrs_to_matrix(columns, node_num)
+    if use_cache:
+        cache.save(cache_name, {'data':basis_vec.data,
+                                'indices':basis_vec.indices,
+                                'indptr':basis_vec.indptr,
+                                'shape':np.array(basis_vec.shape)}, sig=sig)
+    return basis_vec
+
+def attrs_to_matrix(attrs, node_num):
+    """
+    Converts a list of nodal attributes into the columns of a sparse matrix.
+    Entries stored in the nodal attributes are kept even if they are zero.
+
+    :param list attrs: list of :class:`~polyadcirc.pyADCIRC.basic.nodal_attr`
+    :param int node_num: number of nodes in the mesh
+    :rtype: :class:`scipy.sparse.csc_matrix`
+    :returns: matrix of size (node_num, len(attrs))
+
+    """
+    indptr = np.zeros((len(attrs)+1,), dtype=np.int64)
+    indptr[1:] = np.cumsum([len(attr.nodes) for attr in attrs])
+    if attrs:
+        indices = np.concatenate([attr.nodes-1 for attr in attrs])
+        data = np.concatenate([attr.values[:, 0] for attr in attrs])
+    else:
+        indices, data = np.empty((0,), dtype=int), np.empty((0,))
+    matrix = sp.csc_matrix((data, indices, indptr),
+                           shape=(node_num, len(attrs)))
+    matrix.sort_indices()
+    return matrix
+
+def dicts_to_matrix(dict_list, node_num):
+    """
+    Converts a list of basis vector dicts (``key`` -- node number, ``value``
+    -- weighting) into the columns of a sparse matrix.
+
+    :param list dict_list: list of dicts
+    :param int node_num: number of nodes in the mesh
+    :rtype: :class:`scipy.sparse.csc_matrix`
+    :returns: matrix of size (node_num, len(dict_list))
+
+    """
+    rows, cols, data = [], [], []
+    for j, vector in enumerate(dict_list):
+        rows.extend(vector.iterkeys())
+        cols.extend([j]*len(vector))
+        data.extend(vector.itervalues())
+    return sp.csc_matrix((data, (np.array(rows, dtype=int)-1, cols)),
+                         shape=(node_num, len(dict_list)))
+
+def matrix_to_dicts(vectors):
+    """
+    Converts the columns of a sparse matrix of basis vectors into a list of
+    dicts (``key`` -- node number, ``value`` -- weighting).
+
+    :param vectors: :class:`scipy.sparse.csc_matrix` of basis vectors
+    :rtype: list
+    :returns: list of dicts
+
+    """
+    vectors = sp.csc_matrix(vectors)
+    return [column_to_dict(vectors, j) for j in xrange(vectors.shape[1])]
+
+def column_to_dict(vectors, j):
+    """
+    :param vectors: :class:`scipy.sparse.csc_matrix` of basis vectors
+    :param int j: column
+    :rtype: dict
+    :returns: ``key`` -- node number, ``value`` -- weighting of the stored
+        entries in column ``j`` of ``vectors``
+
+    """
+    col = slice(vectors.indptr[j], vectors.indptr[j+1])
+    return dict(zip((vectors.indices[col]+1).tolist(),
+                    vectors.data[col].tolist()))
 
 def get_basis_vec_array(path=None, node_num=None):
     """
@@ -60,14 +170,13 @@ def get_basis_vec_array(path=None, node_num=None):
     :returns: an array of size(node_num, num_basis_vec)
     
     """
-    bv_list_of_dict = get_basis_vectors(path)
+    vectors = get_basis_vectors(path).tocsr()
     if node_num is None:
-        ex_folder = glob.glob(os.path.join(path, 'landuse_*'))[0]
-        node_num = f13.read_node_num(ex_folder)
-    bv_array = np.zeros((len(bv_list_of_dict), node_num))
-    for k, v in enumerate(bv_list_of_dict):
-        bv_array[k, ...] = dict_to_array(v, 0, node_num)
-    return bv_array.transpose()
+        node_num = vectors.shape[0]
+    bv_array = np.zeros((node_num, vectors.shape[1]))
+    rows = min(node_num, vectors.shape[0])
+    bv_array[:rows] = vectors[:rows].toarray()
+    return bv_array
 
 def combine_bv_array(weights, array):
     """
@@ -94,24 +203,118 @@ def combine_basis_vectors(weights, vectors, default_value=None, node_num=None):
     
     :type weights: :class:`numpy.ndarray`
     :param weights: array of size (num_of_basis_vec, 1)
-    :type vectors: list of dicts OR :class:`numpy.ndarray` of size (node_num,
-        num_of_basis_vec) 
+    :type vectors: :class:`scipy.sparse.csc_matrix` OR list of dicts OR
+        :class:`numpy.ndarray` of size (node_num, num_of_basis_vec) 
     :param vectors: basis vectors
     :returns: an array of size (node_num, 1) containing the manningsn value at
         all nodes in numerical order or a dictionary
     
     """
-    if len(weights) != len(vectors):
+    if sp.issparse(vectors) or isinstance(vectors, np.ndarray):
+        num_of_basis_vec = vectors.shape[1]
+    else:
+        num_of_basis_vec = len(vectors)
+    if len(weights) != num_of_basis_vec:
         raise LenError('weights, vectors', 'dimensions do not match')
 
-    if isinstance(vectors[0], np.array):
-        combine_bv_array(weights, vectors)
+    if isinstance(vectors, np.ndarray):
+        return combine_bv_array(weights, vectors)
+    elif sp.issparse(vectors):
+        if default_value and node_num:
+            return combine_basis_vectors_batch(np.reshape(weights, (-1, 1)),
+                                               vectors, default_value,
+                                               node_num)[:, 0]
+        vectors = sp.csr_matrix(vectors)
+        combo = vectors.dot(np.ravel(weights))
+        # nodes with data in at least one basis vector
+        nodes = np.flatnonzero(np.diff(vectors.indptr))
+        return dict(zip((nodes+1).tolist(), combo[nodes]))
     elif default_value and node_num:
         return dict_to_array(add_dict(vectors, weights)[0], default_value,
                              node_num)
     else:
         return add_dict(vectors, weights)[0]
-        
+
+def combine_basis_vectors_batch(points, vectors, default_value=None,
+                                node_num=None):
+    """
+    Combine basis vectors using each column of ``points`` as the Manning's n
+    values for each basis vector. All of the Manning's n fields are computed
+    with a single sparse matrix-matrix product. If a ``default_value`` is set
+    then all nodes with out data are set to the ``default_value``.
+
+    :type points: :class:`numpy.ndarray`
+    :param points: array of size (num_of_basis_vec, num_of_samples)
+    :type vectors: :class:`scipy.sparse.csc_matrix` OR list of dicts OR
+        :class:`numpy.ndarray` of size (node_num, num_of_basis_vec)
+    :param vectors: basis vectors
+    :type node_num: int or None
+    :param node_num: number of nodes in the mesh, if None then the number of
+        rows in ``vectors``
+    :rtype: :class:`numpy.ndarray`
+    :returns: an array of size (node_num, num_of_samples) containing the
+        manningsn values at all nodes in numerical order for each sample
+
+    """
+    if isinstance(vectors, list):
+        if node_num is None:
+            node_num = max([max(v.iterkeys()) for v in vectors if v])
+        vectors = dicts_to_matrix(vectors, node_num)
+    if points.shape[0] != vectors.shape[1]:
+        raise LenError('points, vectors', 'dimensions do not match')
+    if node_num is None:
+        node_num = vectors.shape[0]
+    rows = min(node_num, vectors.shape[0])
+
+    if isinstance(vectors, np.ndarray):
+        fields = np.zeros((node_num, points.shape[1]))
+        fields[:rows] = np.dot(vectors[:rows], points)
+        return fields
+
+    vectors = sp.csr_matrix(vectors)[:rows]
+    if default_value:
+        fields = np.empty((node_num, points.shape[1]))
+        fields.fill(default_value)
+        # nodes with data in at least one basis vector
+        present = np.flatnonzero(np.diff(vectors.indptr))
+        fields[present] = vectors[present].dot(points)
+    else:
+        fields = np.zeros((node_num, points.shape[1]))
+        fields[:rows] = vectors.dot(points)
+    return fields
+
+def iter_basis_vectors_batch(points, vectors, default_value=None,
+                             node_num=None, block_size=None):
+    """
+    Combine basis vectors for blocks of ``block_size`` columns of ``points``
+    at a time. See :meth:`combine_basis_vectors_batch`.
+
+    :type points: :class:`numpy.ndarray`
+    :param points: array of size (num_of_basis_vec, num_of_samples)
+    :type vectors: :class:`scipy.sparse.csc_matrix` OR list of dicts OR
+        :class:`numpy.ndarray` of size (node_num, num_of_basis_vec)
+    :param vectors: basis vectors
+    :type block_size: int or None
+    :param block_size: number of samples per block, if None then
+        ``num_of_samples``
+    :rtype: generator
+    :returns: tuples of (first sample, last sample+1, array of size (node_num,
+        stop-start))
+
+    """
+    if isinstance(vectors, list):
+        if node_num is None:
+            node_num = max([max(v.iterkeys()) for v in vectors if v])
+        vectors = dicts_to_matrix(vectors, node_num)
+    num_of_samples = points.shape[1]
+    if block_size is None:
+        block_size = max(num_of_samples, 1)
+    for start in xrange(0, num_of_samples, block_size):
+        stop = min(start+block_size, num_of_samples)
+        yield start, stop, combine_basis_vectors_batch(points[:, start:stop],
+                                                       vectors, default_value,
+                                                       node_num)
+
 def add_dict(dict_list, weights):
     """
     Adds a list of ``dict`` together.
@@ -174,47 +377,55 @@ def get_default_nodes(domain, vectors=None):
     :param domain: a computational domain for a physical domain
     :type domain: :class:`~polyadcirc.run_framework.domain`
     :param vectors: basis vectors
-    :type vectors: dict
+    :type vectors: :class:`scipy.sparse.csc_matrix` or list of dicts
 
-    :rtype: list
-    :returns: list of default nodes
+    :rtype: :class:`numpy.ndarray`
+    :returns: array of default nodes (zero based indices)
 
     """
-    if vectors:
-        default_bv_array = combine_basis_vectors(np.zeros((len(vectors),)),
-                                                 vectors, 1.0, domain.node_num)
-    else:
-        default_bv_array = np.ones((domain.node_num,))
-    default_node_list = np.nonzero(default_bv_array)[0]
-    return default_node_list
+    present = np.zeros((domain.node_num,), dtype=bool)
+    if vectors is not None:
+        if not sp.issparse(vectors):
+            vectors = dicts_to_matrix(vectors, domain.node_num)
+        # nodes with data in at least one basis vector
+        present[sp.csc_matrix(vectors).indices] = True
+    return np.flatnonzero(~present)
+
+def _column(column, select):
+    """
+    :param column: :class:`scipy.sparse.csc_matrix` with a single column
+    :param select: boolean :class:`numpy.ndarray` of the stored entries to keep
+    :rtype: :class:`scipy.sparse.csc_matrix`
+    :returns: column with only the selected stored entries
+
+    """
+    return sp.csc_matrix((column.data[select], column.indices[select],
+                          [0, np.sum(select)]), shape=column.shape)
 
 def split_bv_nodes(land_class_num, vectors):
     """
     Given a set of basis vectors and a land classification class number splits
-    a land classification basis vector dictionary into nodes that are purely
+    a land classification basis vector into nodes that are purely
     that land classification and nodes that are only paritially that land
-    classification. Returns a new list of land classification vectors with::
+    classification. Returns a new set of land classification vectors with::
         
-        vectors[land_class_num] = mixed_vector
-        vectors[len(vectors)+1] = pure_vector
+        vectors[:, land_class_num] = mixed_vector
+        vectors[:, -1] = pure_vector
 
     :param int land_class_num: land classification to split
-    :param list vectors: basis vectors
+    :type vectors: :class:`scipy.sparse.csc_matrix`
+    :param vectors: basis vectors
 
-    :rtype: list
-    :returns: modified list of basis vectors
+    :rtype: :class:`scipy.sparse.csc_matrix`
+    :returns: modified basis vectors
 
     """
-    pure_vector = dict()
-    mixed_vector = dict()
-    for i, v in vectors[land_class_num].iteritems():
-        if v < 1.0:
-            mixed_vector[i] = v
-        else:
-            pure_vector[i] = v
-    vectors[land_class_num] = mixed_vector
-    vectors.append(pure_vector)
-    return vectors
+    vectors = sp.csc_matrix(vectors)
+    column = vectors[:, land_class_num]
+    pure = column.data >= 1.0
+    return sp.hstack([vectors[:, :land_class_num], _column(column, ~pure),
+                      vectors[:, land_class_num+1:], _column(column, pure)],
+                     'csc')
 
 def merge_with_fort13(domain, mann_dict, factor, land_class_num, vectors):
     """
@@ -223,34 +434,36 @@ def merge_with_fort13(domain, mann_dict, factor, land_class_num, vectors):
     replaced set to the the scaled value in the ``mann_dict`` which is created
     from reading in a ``fort.13`` formatted file. If the node is default in
     both ``mann_dict`` and ``vectors`` then it remains a default node. Returns
-    a new list of land classification vectors with::
+    a new set of land classification vectors with::
         
-        vectors[land_class_num] = mixed_vector #original values
-        vectors[max(vectors.keys())+1] = new_vector #scaled merged values
+        vectors[:, land_class_num] = mixed_vector #original values
+        vectors[:, -1] = new_vector #scaled merged values
 
     :param dict mann_dict: a dictionary created from a ``fort.13`` formatted
         file or a dictionary of Manning's n values
     :param float factor: the factor by which to divide the values in
         ``mann_dict``
     :param int land_class_num: land classification to split and merge
-    :param list vectors: basis vectors
+    :type vectors: :class:`scipy.sparse.csc_matrix`
+    :param vectors: basis vectors
 
-    :rtype: list
-    :returns: modified list of basis vectors
+    :rtype: :class:`scipy.sparse.csc_matrix`
+    :returns: modified basis vectors
 
     """
     default_node_list = get_default_nodes(domain, vectors)
     expanded_vectors = split_bv_nodes(land_class_num, vectors)
-    last = len(expanded_vectors)-1
-    new_mann_dict = expanded_vectors[last]
-    for i in default_node_list:
+    last = expanded_vectors.shape[1]-1
+    new_mann_dict = column_to_dict(expanded_vectors, last)
+    for i in default_node_list+1:
         if i in mann_dict:
             new_mann_dict[i] = mann_dict[i]/factor
     for i in new_mann_dict.keys():
         if i in mann_dict:
             new_mann_dict[i] = mann_dict[i]/factor    
-    expanded_vectors[last] = new_mann_dict
-    return expanded_vectors
+    return sp.hstack([expanded_vectors[:, :last],
+                      dicts_to_matrix([new_mann_dict],
+                                      expanded_vectors.shape[0])], 'csc')
 
 def create_shelf(domain, shelf_bathymetry, vectors):
     """
@@ -265,20 +478,17 @@ def create_shelf(domain, shelf_bathymetry, vectors):
         [min, max]
     :type shelf_bathymetry: :class:`numpy.ndarray`
     :param vectors: basis vectors
-    :type vectors: dict
+    :type vectors: :class:`scipy.sparse.csc_matrix`
 
     :rtype: dict
     :returns: basis vector that represents the continental shelf
 
     """
     bathymetry = domain.array_bathymetry()
-    shelf_dict = dict()
     default_node_list = get_default_nodes(domain, vectors)
-    for i in default_node_list:
-        if bathymetry[i] >= shelf_bathymetry[0]:
-            if bathymetry[i] <= shelf_bathymetry[1]:
-                shelf_dict[i+1] = 1.0
-    return shelf_dict
+    shelf = bathymetry[default_node_list] >= shelf_bathymetry[0]
+    shelf &= bathymetry[default_node_list] <= shelf_bathymetry[1]
+    return dict.fromkeys((default_node_list[shelf]+1).tolist(), 1.0)
 
 def create_from_fort13(domain, mann_dict, vectors):
     """
@@ -292,14 +502,14 @@ def create_from_fort13(domain, mann_dict, vectors):
     :param dict mann_dict: a dictionary created from a ``fort.13`` formatted
         file or a dictionary of Manning's n values
     :param vectors: basis vectors
-    :type vectors: dict
+    :type vectors: :class:`scipy.sparse.csc_matrix`
 
     :rtype: dict
     :returns: basis vector of values
     """
     new_mann_dict = dict()
     default_node_list = get_default_nodes(domain, vectors)
-    for i in default_node_list:
+    for i in (default_node_list+1).tolist():
         if i in mann_dict:
             new_mann_dict[i] = mann_dict[i]
     return new_mann_dict
@@ -348,7 +558,8 @@ def determine_types(domain, vectors):
 
     :param domain: a computational domain for a physical domain
     :type domain: :class:`~polyadcirc.run_framework.domain`
-    :param list vectors: basis vectors
+    :type vectors: :class:`scipy.sparse.csc_matrix`
+    :param vectors: basis vectors
 
     :rtype: :class:`numpy.ndarray`
     :returns: sorted list of ranking, land classification number, and
@@ -356,9 +567,9 @@ def determine_types(domain, vectors):
 
     """
     domain.read_spatial_grid_header()
-    percentages = np.array([np.sum(v.values()) for v in vectors])
+    percentages = np.asarray(vectors.sum(0)).ravel()
     percentages = percentages * 100.0 / domain.node_num
     sort_ind = np.argsort(percentages).tolist()
     sort_ind.reverse()
-    return np.column_stack((range(len(vectors)), sort_ind,
+    return np.column_stack((range(vectors.shape[1]), sort_ind,
                             percentages[sort_ind]))
@@ -7,8 +7,15 @@ This subpackage contains
   mesh(es), grid(s)
 * :mod:`~polyadcirc.run_framework.random_manningsn` a class and associated set
   of methods to run a set of ADCIRC simulations with varying parameters
+* :mod:`~polyadcirc.run_framework.store_management` reading/writing of result
+  stores of run data
+* :mod:`~polyadcirc.run_framework.catalog_management` a SQLite catalog of the
+  status of each run used to resume interrupted sets of runs
+* :mod:`~polyadcirc.run_framework.scheduler_management` scheduling of runs
+  onto slots that are refilled as soon as their run exits
 
 """
 
 __all__ = ['random_manningsn', 'domain', 'subdomain', 'fulldomain',
-           'random_wall', 'random_wall_Q']
+           'random_wall', 'random_wall_Q', 'store_management',
+           'catalog_management', 'scheduler_management']
@@ -0,0 +1,231 @@
+# Copyright (C) 2013 Lindley Graham
+
+"""
+This module, :mod:`~polyadcirc.run_framework.catalog_management`, handles the
+run catalog of a set of runs. The catalog is a SQLite database
+(``catalog.db``) in the result store of the set of runs (see
+:mod:`~polyadcirc.run_framework.store_management`) that records the
+parameters, ``RF_directory_*``, status, and timings of each run (sample) so
+that a set of runs that was interrupted (e.g. by the wall-clock limit of the
+queue) can be resumed without repeating the runs that were completed.
+
+The status of a run is one of
+
+pending
+    the run has not been started
+running
+    :program:`ADCIRC` has been started for the run
+simulated
+    :program:`ADCIRC` has finished, the output has not been read
+failed
+    :program:`ADCIRC` exited with an error (see :meth:`catalog.returncodes`),
+    the output is not read and the run is repeated when the set of runs is
+    resumed
+done
+    the output has been read and saved
+"""
+
+import os, sqlite3, time, json
+import numpy as np
+import polyadcirc.run_framework.store_management as store
+
+#: name of the catalog file in a result store
+catalog_name = 'catalog.db'
+
+def catalog_file(file_name):
+    """
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :rtype: string
+    :returns: path to the catalog of ``file_name``
+
+    """
+    return os.path.join(store.store_name(file_name), catalog_name)
+
+class catalog(object):
+    """
+    Run catalog of a set of runs stored in a SQLite database
+    """
+    def __init__(self, file_name):
+        """
+        Initialization
+        """
+        path = os.path.dirname(file_name)
+        if path and not os.path.exists(path):
+            os.makedirs(path)
+        #: string, path to the SQLite database
+        self.file_name = file_name
+        #: :class:`sqlite3.Connection`, connection to the database
+        self.connection = sqlite3.connect(file_name)
+        with self.connection:
+            self.connection.execute('CREATE TABLE IF NOT EXISTS runs ('
+                                    'sample INTEGER PRIMARY KEY, '
+                                    'params TEXT, rf_dir TEXT, '
+                                    'status TEXT, started REAL, '
+                                    'finished REAL, ingested REAL, '
+                                    'returncode INTEGER)')
+            columns = [row[1] for row in self.connection.execute(\
+                    'PRAGMA table_info(runs)')]
+            if 'returncode' not in columns:
+                # catalog written before return codes were recorded
+                self.connection.execute('ALTER TABLE runs ADD COLUMN '
+                                        'returncode INTEGER')
+
+    def close(self):
+        """
+        Close the connection to the database.
+        """
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM '
+                                       'runs').fetchone()[0]
+
+    def reset(self, points):
+        """
+        Remove all runs from the catalog and add a pending run for each
+        sample (column) in ``points``.
+
+        :param points: :class:`numpy.ndarray` of dimensions (``dim``,
+            ``num_points``) of the parameters of each run
+
+        """
+        points = np.asarray(points)
+        with self.connection:
+            self.connection.execute('DELETE FROM runs')
+            self.connection.executemany('INSERT INTO runs (sample, params, '
+                                        'status) VALUES (?, ?, ?)',
+                                        [(i, json.dumps(points[:, i].tolist()),
+                                          'pending') for i in \
+                                         xrange(points.shape[1])])
+
+    def matches(self, points):
+        """
+        :param points: :class:`numpy.ndarray` of dimensions (``dim``,
+            ``num_points``) of the parameters of each run
+        :rtype: bool
+        :returns: True if the catalog has the same runs as ``points``
+
+        """
+        points = np.asarray(points)
+        rows = self.connection.execute('SELECT params FROM runs ORDER BY '
+                                       'sample').fetchall()
+        if len(rows) != points.shape[1]:
+            return False
+        params = np.array([json.loads(row[0]) for row in rows]).transpose()
+        return params.shape == points.shape and np.allclose(params, points)
+
+    def samples(self, status=None):
+        """
+        :type status: string or None
+        :param status: status of the runs, if None all runs
+        :rtype: list
+        :returns: samples (run numbers) with ``status`` in increasing order
+
+        """
+        if status is None:
+            rows = self.connection.execute('SELECT sample FROM runs ORDER BY '
+                                           'sample')
+        else:
+            rows = self.connection.execute('SELECT sample FROM runs WHERE '
+                                           'status = ? ORDER BY sample',
+                                           (status,))
+        return [row[0] for row in rows]
+
+    def pending(self):
+        """
+        :rtype: list
+        :returns: samples (run numbers) of the runs that are not done
+            (including runs that were interrupted) in increasing order
+
+        """
+        rows = self.connection.execute('SELECT sample FROM runs WHERE status '
+                                       '!= ? ORDER BY sample', ('done',))
+        return [row[0] for row in rows]
+
+    def start(self, samples, rf_dirs):
+        """
+        Record that :program:`ADCIRC` has been started for ``samples``.
+
+        :param list samples: samples (run numbers)
+        :param list rf_dirs: ``RF_directory_*`` of each sample
+
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.executemany('UPDATE runs SET status = ?, '
+                                        'rf_dir = ?, started = ?, finished = '
+                                        'NULL, ingested = NULL, returncode = '
+                                        'NULL WHERE sample = ?',
+                                        [('running', rf_dir, now, sample) for \
+                                         sample, rf_dir in zip(samples,
+                                                               rf_dirs)])
+
+    def finish(self, samples, returncodes=None):
+        """
+        Record that :program:`ADCIRC` has finished for ``samples``. Runs
+        with a non-zero return code are marked failed.
+
+        :param list samples: samples (run numbers)
+        :type returncodes: list or None
+        :param returncodes: exit status of each sample, if None the exit
+            status is not known and the runs are marked simulated
+
+        """
+        if returncodes is None:
+            self._update(samples, 'simulated', 'finished')
+            return
+        now = time.time()
+        with self.connection:
+            self.connection.executemany('UPDATE runs SET status = ?, '
+                                        'finished = ?, returncode = ? WHERE '
+                                        'sample = ?', [('simulated' if \
+                                                code == 0 else 'failed', now,
+                                                code, sample) for sample, \
+                                                code in zip(samples,
+                                                            returncodes)])
+
+    def ingest(self, samples):
+        """
+        Record that the output of ``samples`` has been read and saved.
+
+        :param list samples: samples (run numbers)
+
+        """
+        self._update(samples, 'done', 'ingested')
+
+    def _update(self, samples, status, column):
+        """
+        :param list samples: samples (run numbers)
+        :param string status: new status of ``samples``
+        :param string column: timing column set to the current time
+
+        """
+        now = time.time()
+        with self.connection:
+            self.connection.executemany('UPDATE runs SET status = ?, '+column+
+                                        ' = ? WHERE sample = ?',
+                                        [(status, now, sample) for sample in \
+                                         samples])
+
+    def timings(self):
+        """
+        :rtype: :class:`numpy.ndarray`
+        :returns: array of dimensions (``num_points``, 3) of the started,
+            finished, and ingested times of each run (NaN if not recorded)
+
+        """
+        rows = self.connection.execute('SELECT started, finished, ingested '
+                                       'FROM runs ORDER BY sample').fetchall()
+        return np.array([[np.nan if t is None else t for t in row] for row in \
+                rows]).reshape((-1, 3))
+
+    def returncodes(self):
+        """
+        :rtype: dict
+        :returns: exit status of each failed run (sample)
+
+        """
+        rows = self.connection.execute('SELECT sample, returncode FROM runs '
+                                       'WHERE status = ?', ('failed',))
+        return dict(rows.fetchall())
@@ -3,16 +3,188 @@
 """
 See :class:`domain`
 """
-import subprocess, os
+import subprocess, os, collections
 import numpy as np
 from scipy.interpolate import griddata
+from matplotlib.path import Path
 from polyadcirc.pyADCIRC.basic import pickleable 
+import polyadcirc.pyADCIRC.basic as basic
+import polyadcirc.pyADCIRC.adjacency as adjacency
 import polyadcirc.pyADCIRC.prep_management as prep
 import polyadcirc.pyADCIRC.fort15_management as f15
 import polyadcirc.pyADCIRC.fort14_management as f14
 import polyadcirc.pyADCIRC.fort13_management as f13
 import polyadcirc.pyADCIRC.plotADCIRC as plot
 
+#: names of the per node values stored as arrays in a :class:`domain`
+node_fields = ('x', 'y', 'bathymetry', 'manningsn')
+
+class node_view(object):
+    """
+    A view of a single node in a :class:`domain`. Reading or setting ``x``,
+    ``y``, ``bathymetry``, or ``manningsn`` reads from or writes to the arrays
+    stored in the :class:`domain`. Any other attributes set on a node are kept
+    by the :class:`domain`. Once the adjacency maps of the :class:`domain`
+    have been created ``element`` is the list of elements containing this node
+    and ``neighbors`` is the ``set()`` of nodes adjacent to this node.
+    """
+    def __init__(self, data, index):
+        """
+        Initialization
+        """
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_index', index)
+
+    def __getattr__(self, name):
+        if name in node_fields:
+            values = getattr(self._data, name)
+            if values is None:
+                raise AttributeError(name)
+            return values[self._index]
+        extra = self._data.node_extra.get(self._index)
+        if extra is not None and name in extra:
+            return extra[name]
+        if name == 'element' and self._data.node_to_element is not None:
+            return self._data.element_ids[adjacency.row(\
+                    self._data.node_to_element, self._index)].tolist()
+        if name == 'neighbors' and self._data.node_to_node is not None:
+            return set(self._data.node_ids[adjacency.row(\
+                    self._data.node_to_node, self._index)].tolist())
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in node_fields:
+            if getattr(self._data, name) is None:
+                values = np.empty((self._data.node_num,))
+                values.fill(np.nan)
+                setattr(self._data, name, values)
+            getattr(self._data, name)[self._index] = value
+        else:
+            self._data.node_extra.setdefault(self._index, {})[name] = value
+
+class node_dict(collections.Mapping):
+    """
+    A ``dict`` like view of the nodes in a :class:`domain` where ``key`` --
+    node number, ``value`` -- :class:`node_view`. Iterates over the nodes in
+    the order they are stored.
+    """
+    def __init__(self, data):
+        """
+        Initialization
+        """
+        self._data = data
+
+    def __getitem__(self, key):
+        index = self._data.node_index(key)
+        if index is None:
+            raise KeyError(key)
+        return node_view(self._data, index)
+
+    def __setitem__(self, key, value):
+        index = self._data.node_index(key)
+        if index is None:
+            raise KeyError(key)
+        new_node = node_view(self._data, index)
+        for name in node_fields:
+            if hasattr(value, name):
+                setattr(new_node, name, getattr(value, name))
+
+    def __iter__(self):
+        if self._data.node_ids is None:
+            return iter([])
+        return iter(self._data.node_ids.tolist())
+
+    def __len__(self):
+        if self._data.node_ids is None:
+            return 0
+        return len(self._data.node_ids)
+
+    def has_key(self, key):
+        """
+        :param int key: node number
+        :rtype: bool
+        :returns: True if the node exists
+        """
+        return key in self
+
+    def __contains__(self, key):
+        return self._data.node_index(key) is not None
+
+class element_dict(collections.Mapping):
+    """
+    A ``dict`` like view of the elements in a :class:`domain` where ``key`` --
+    element number, ``value`` -- array of the node numbers of the vertices.
+    """
+    def __init__(self, data):
+        """
+        Initialization
+        """
+        self._data = data
+
+    def __getitem__(self, key):
+        index = self._data.element_index(key)
+        if index is None:
+            raise KeyError(key)
+        return self._data.connectivity[index]
+
+    def __iter__(self):
+        if self._data.element_ids is None:
+            return iter([])
+        return iter(self._data.element_ids.tolist())
+
+    def __len__(self):
+        if self._data.element_ids is None:
+            return 0
+        return len(self._data.element_ids)
+
+    def has_key(self, key):
+        """
+        :param int key: element number
+        :rtype: bool
+        :returns: True if the element exists
+        """
+        return key in self
+
+    def __contains__(self, key):
+        return self._data.element_index(key) is not None
+
+def _index(ids, order, nums):
+    """
+    :param ids: :class:`numpy.ndarray` of ids
+    :param order: None if ``ids`` is ``1, 2, ..., len(ids)`` otherwise
+        ``numpy.argsort(ids)``
+    :param nums: int or :class:`numpy.ndarray` of ids to look up
+    :rtype: int or :class:`numpy.ndarray`
+    :returns: position of ``nums`` in ``ids``, -1 or None if missing
+
+    """
+    scalar = np.isscalar(nums)
+    nums = np.asarray(nums, dtype=int)
+    if order is None:
+        index = nums - 1
+        missing = (index < 0) | (index >= len(ids))
+    else:
+        index = np.searchsorted(ids, nums, sorter=order)
+        index[index >= len(ids)] = 0
+        index = order[index]
+        missing = ids[index] != nums
+    if scalar:
+        return None if missing else int(index)
+    index[missing] = -1
+    return index
+
+def _order(ids):
+    """
+    :param ids: :class:`numpy.ndarray` of ids
+    :rtype: None or :class:`numpy.ndarray`
+    :returns: None if ``ids`` is ``1, 2, ..., len(ids)`` otherwise
+        ``numpy.argsort(ids)``
+
+    """
+    if np.array_equal(ids, np.arange(1, len(ids)+1)):
+        return None
+    return np.argsort(ids, kind='mergesort')
+
 class domain(pickleable):
     """
     :class:`~polyadcirc.run_framework.domain` 
@@ -28,10 +200,16 @@ class domain(pickleable):
         number of nodes
     element_num
         number of elements
+    mesh
+        :class:`~polyadcirc.pyADCIRC.basic.mesh` with the nodal coordinates,
+        bathymetry, and element connectivity stored as arrays
     node
-        list of nodes
+        ``dict`` like view of the nodes
     element
-        list of elements where each element is a list of nodes
+        ``dict`` like view of the elements where each element is a list of
+        nodes
+    manningsn
+        array of Manning's *n* values
     manningsn_default
         default Manning's *n* value 
     manningsn_num
@@ -40,6 +218,12 @@ class domain(pickleable):
         instance of :class:`~polyadcirc.pyADCIRC.basic.time` class
     make_domain_map
         (bool) whether or not a domain map has been created
+    node_to_element
+        node to element map, see
+        :meth:`~polyadcirc.pyADCIRC.adjacency.node_to_element`
+    node_to_node
+        node to node map, see
+        :meth:`~polyadcirc.pyADCIRC.adjacency.node_to_node`
 
     """
     def __init__(self, path, node_num=0, element_num=0, node=None,
@@ -51,21 +235,183 @@ class domain(pickleable):
         self.node_num = node_num
         #: int, number of elements
         self.element_num = element_num
+        #: :class:`~polyadcirc.pyADCIRC.basic.mesh`, array-backed mesh
+        self.mesh = None
+        #: :class:`numpy.ndarray`, Manning's *n* value at each node
+        self.manningsn = None
+        #: dict, attributes other than :data:`node_fields` set on nodes
+        self.node_extra = dict()
+        #: :class:`scipy.sparse.csr_matrix`, node to element map
+        self.node_to_element = None
+        #: :class:`scipy.sparse.csr_matrix`, node to node map
+        self.node_to_node = None
+        self._node_order = None
+        self._node_order_ids = None
+        self._element_order = None
+        self._element_order_ids = None
         if node or element:
             #: bool, whether or not a domain map has been created
             self.make_domain_map = False
-            #: list, list of nodes
-            self.node = node
-            #: list, list of elements where each element is a list of nodes
-            self.element = element
+            self.set_nodes(node)
+            self.set_elements(element)
         else:
             self.make_domain_map = True
-            self.node = dict()
-            self.element = dict()
         #: string, full path to the dir containing the ``fort.##`` files
         self.path = path
         super(domain, self).__init__()
 
+    @property
+    def node(self):
+        """
+        ``dict`` like view of the nodes, ``key`` -- node number, ``value`` --
+        :class:`node_view`
+        """
+        return node_dict(self)
+
+    @property
+    def element(self):
+        """
+        ``dict`` like view of the elements, ``key`` -- element number,
+        ``value`` -- array of node numbers
+        """
+        return element_dict(self)
+
+    def _mesh_array(self, name):
+        if self.mesh is None:
+            return None
+        return getattr(self.mesh, name)
+
+    @property
+    def node_ids(self):
+        """ :class:`numpy.ndarray`, node numbers """
+        return self._mesh_array('node_ids')
+
+    @property
+    def x(self):
+        """ :class:`numpy.ndarray`, x - coordinates of the nodes """
+        return self._mesh_array('x')
+
+    @property
+    def y(self):
+        """ :class:`numpy.ndarray`, y - coordinates of the nodes """
+        return self._mesh_array('y')
+
+    @property
+    def bathymetry(self):
+        """ :class:`numpy.ndarray`, bathymetry at the nodes """
+        return self._mesh_array('bathymetry')
+
+    @bathymetry.setter
+    def bathymetry(self, value):
+        # pylint: disable=C0111
+        self.mesh.bathymetry[:] = value
+
+    @property
+    def element_ids(self):
+        """ :class:`numpy.ndarray`, element numbers """
+        return self._mesh_array('element_ids')
+
+    @property
+    def connectivity(self):
+        """
+        :class:`numpy.ndarray` of shape (element_num, 3), node numbers of the
+        vertices of each element
+        """
+        return self._mesh_array('connectivity')
+
+    def set_mesh(self, grid):
+        """
+        Replaces the mesh stored in this domain
+
+        :param grid: :class:`~polyadcirc.pyADCIRC.basic.mesh`
+
+        """
+        self.mesh = grid
+        self.node_num = grid.node_num
+        self.element_num = grid.element_num
+        if self.manningsn is not None and len(self.manningsn) != \
+                grid.node_num:
+            self.manningsn = None
+        self.node_extra = dict()
+        self.node_to_element = None
+        self.node_to_node = None
+
+    def set_nodes(self, node):
+        """
+        Replaces the nodes in this domain with the nodes in ``node``
+
+        :param dict node: ``key`` -- node number, ``value`` --
+            :class:`~polyadcirc.pyADCIRC.basic.node`
+
+        """
+        keys = sorted(node.iterkeys())
+        values = [node[k] for k in keys]
+        grid = basic.mesh(np.array(keys, dtype=int),
+                          np.array([v.x for v in values], dtype=float),
+                          np.array([v.y for v in values], dtype=float),
+                          np.array([v.bathymetry for v in values],
+                                   dtype=float),
+                          np.empty((0,), dtype=int),
+                          np.empty((0, 3), dtype=np.int32))
+        if self.mesh is not None:
+            grid.element_ids = self.mesh.element_ids
+            grid.connectivity = self.mesh.connectivity
+        self.set_mesh(grid)
+        if all([hasattr(v, 'manningsn') for v in values]) and values:
+            self.manningsn = np.array([v.manningsn for v in values])
+
+    def set_elements(self, element):
+        """
+        Replaces the elements in this domain with the elements in ``element``
+
+        :param dict element: ``key`` -- element number, ``value`` -- list of
+            node numbers
+
+        """
+        keys = sorted(element.iterkeys())
+        if self.mesh is None:
+            self.set_nodes({})
+        self.mesh.element_ids = np.array(keys, dtype=int)
+        self.mesh.connectivity = np.array([element[k] for k in keys],
+                                          dtype=np.int32).reshape((-1, 3))
+        self.element_num = len(keys)
+        self.node_to_element = None
+        self.node_to_node = None
+
+    def node_index(self, nums):
+        """
+        :param nums: node number(s)
+        :type nums: int or :class:`numpy.ndarray`
+        :rtype: int or :class:`numpy.ndarray`
+        :returns: position(s) of the node(s) in the arrays of this domain,
+            missing nodes are None or -1
+
+        """
+        ids = self.node_ids
+        if ids is None:
+            return None if np.isscalar(nums) else -np.ones_like(nums)
+        if self._node_order_ids is not ids:
+            self._node_order = _order(ids)
+            self._node_order_ids = ids
+        return _index(ids, self._node_order, nums)
+
+    def element_index(self, nums):
+        """
+        :param nums: element number(s)
+        :type nums: int or :class:`numpy.ndarray`
+        :rtype: int or :class:`numpy.ndarray`
+        :returns: position(s) of the element(s) in the arrays of this domain,
+            missing elements are None or -1
+
+        """
+        ids = self.element_ids
+        if ids is None:
+            return None if np.isscalar(nums) else -np.ones_like(nums)
+        if self._element_order_ids is not ids:
+            self._element_order = _order(ids)
+            self._element_order_ids = ids
+        return _index(ids, self._element_order, nums)
+
     def read_spatial_grid_header(self):
         """
         Reads in spatial grid header from ``fort.14`` file in self.path
@@ -111,57 +457,90 @@ class domain(pickleable):
         # Read in the fort.15 file
         self.read_recording_data()
 
+    def triangles(self):
+        """
+        :rtype: :class:`numpy.ndarray` of shape (element_num, 3)
+        :returns: positions of the vertices of each element in the node arrays
+            of this domain
+
+        """
+        return self.node_index(self.connectivity)
+
     def make_node_to_element_map(self):
         """
-        Create the node to element map
+        Create the node to element map, the elements containing each node are
+        stored in ``self.node[#].element``
+
+        See :meth:`~polyadcirc.pyADCIRC.adjacency.node_to_element`
         """
-        for k, v in self.node.iteritems():
-            v.element = []
-            for i, w in self.element.iteritems():
-                if k in w:
-                    v.element.append(i)
+        self.node_to_element = adjacency.node_to_element(self.triangles(),
+                                                         self.node_num)
+
+    def nodes_in_polygon(self, vertices):
+        """
+        Finds the nodes inside of a polygon, e.g. to read a region of
+        interest from global output files with
+        :meth:`~polyadcirc.pyADCIRC.output.get_ts_sr`
+
+        :param vertices: :class:`numpy.ndarray` of shape (n, 2) of the x, y
+            coordinates of the vertices of the polygon
+        :rtype: :class:`numpy.ndarray`
+        :returns: positions (zero based) of the nodes inside of the polygon
+
+        """
+        polygon = Path(np.asarray(vertices))
+        inside = polygon.contains_points(np.column_stack((self.x, self.y)))
+        return np.flatnonzero(inside)
 
     def array_bathymetry(self):
         """
     
         :rtype: :class:`numpy.ndarray` of size(1, node_num)
         :returns: array containing the bathymetry at all nodes in numerical
-            order
+            order (this is a view not a copy)
 
         """
-        bathymetry = np.array([node.bathymetry for node in self.node.values()])
-        self.bathymetry = bathymetry
         return self.bathymetry
     
+    def array_station_bathymetry(self, key='fort61'):
+        """
+        :param string key: key for domain.stations[key]
+        :rtype: :class:`numpy.ndarray` of size(len(self.stations[key]),)
+        :returns: array containing the bathymetry at all stations, see
+            :meth:`set_station_bathymetry`
+
+        """
+        return np.array([s.bathymetry for s in self.stations[key]])
+
     def array_x(self):
         """
         
         :rtype: :class:`numpy.ndarray` of size(1, node_num)
         :returns: array containing the x locations at all nodes in numerical
-            order
+            order (this is a view not a copy)
 
         """
-        return np.array([node.x for node in self.node.values()])   
+        return self.x
     
     def array_y(self):
         """
         
         :rtype: :class:`numpy.ndarray` of size(1, node_num)
         :returns: array containing the y locations at all nodes in numerical
-            order
+            order (this is a view not a copy)
 
         """
-        return np.array([node.y for node in self.node.values()])
+        return self.y
     
     def array_manningsn(self):
         """
         
         :rtype: :class:`numpy.ndarray` of size(1, node_num)
         :returns: array of containing the Manning's *n* value at all nodes in
-            numerical order
+            numerical order (this is a view not a copy)
 
         """
-        return np.array([node.manningsn for node in self.node.values()]) 
+        return self.manningsn
 
     def dict_bathymetry(self):
         """
@@ -170,10 +549,7 @@ class domain(pickleable):
         :returns: ``key`` -- node number, ``value`` -- bathymetry
 
         """
-        temp = dict()
-        for k, node in self.node.iteritems():
-            temp[k] = node.bathymetry
-        return temp
+        return dict(zip(self.node_ids.tolist(), self.bathymetry))
 
     def dict_manningsn(self):
         """
@@ -182,10 +558,7 @@ class domain(pickleable):
         :returns: ``key`` -- node number, ``value`` -- manningsn
 
         """
-        temp = dict()
-        for k, node in self.node.iteritems():
-            temp[k] = node.manningsn
-        return temp
+        return dict(zip(self.node_ids.tolist(), self.manningsn))
 
     def read_nodal_attr(self, path=None, file_name='fort.13'):
         """
@@ -276,13 +649,12 @@ class domain(pickleable):
         if path is None:
             path = self.path
         if x_lims is None:
-            x_lims = [0, 0]
-            x_lims[0] = np.min(np.array([node.x for node in \
-                    self.node.values()]))  
-            x_lims[1] = np.max(np.array([node.x for node in \
-                    self.node.values()]))
-        for n in self.node.values():
-            n.bathymetry += adjust_factor(n.x, x_lims, b_lims)
+            x_lims = [np.min(self.x), np.max(self.x)]
+        if b_lims is not None:
+            inside = (self.x >= x_lims[0]) & (self.x <= x_lims[1])
+            slope = (b_lims[1]-b_lims[0]) / (x_lims[1]-x_lims[0])
+            self.bathymetry[inside] += b_lims[0] + (self.x[inside] - 
+                                                    x_lims[0])*slope
         if plotb:
             self.plot_bathymetry(path)
  
@@ -299,10 +671,9 @@ class domain(pickleable):
         """
         if path is None:
             path = self.path
-        for n in self.node.values():
-            if box_limits[0] <= n.x <= box_limits[1]: 
-                if  box_limits[2] <= n.y <= box_limits[3]:
-                    n.bathymetry = wall_height
+        inside = (box_limits[0] <= self.x) & (self.x <= box_limits[1])
+        inside &= (box_limits[2] <= self.y) & (self.y <= box_limits[3])
+        self.bathymetry[inside] = wall_height
         if plotb:
             self.plot_bathymetry(path, save, show)
 
@@ -317,7 +688,7 @@ class domain(pickleable):
             :meth:`scipy.interpolate.griddata` 
 
         """
-        points = np.array([[n.x, n.y] for n in self.node.itervalues()])
+        points = np.column_stack((self.x, self.y))
         station_locs = np.array([[s.x, s.y] for s in self.stations[key]])
         station_bath = griddata(points, self.array_bathymetry(), 
                                 station_locs, method)
@@ -388,16 +759,11 @@ class domain(pickleable):
         """
         Determine the neighbors of each of the nodes and store in
         ``self.node[#].neighbors`` as a ``set()``.
+
+        See :meth:`~polyadcirc.pyADCIRC.adjacency.node_to_node`
         """
-        for n in self.node.itervalues():
-            n.neighbors = set()
-        for e in self.element.itervalues():
-            self.node[e[0]].neighbors.add(e[1])
-            self.node[e[0]].neighbors.add(e[2])
-            self.node[e[1]].neighbors.add(e[0])
-            self.node[e[1]].neighbors.add(e[2])
-            self.node[e[2]].neighbors.add(e[1])
-            self.node[e[2]].neighbors.add(e[0])
+        self.node_to_node = adjacency.node_to_node(self.triangles(),
+                                                   self.node_num)
 
 def adjust_factor(x, x_lims, b_lims=None):
     """
@@ -10,6 +10,7 @@ from distutils.spawn import find_executable
 import scipy.io as sio
 import numpy as np
 import polyadcirc.pyADCIRC.fort15_management as f15
+import polyadcirc.pyADCIRC.fort13_management as f13
 from polyadcirc.pyADCIRC.basic import pickleable
 import polyadcirc.pyGriddata.table_to_mesh_map as tmm
 from polyadcirc.pyGriddata.file_management import copy, mkdir
@@ -17,8 +18,12 @@ import polyadcirc.pyADCIRC.plotADCIRC as plot
 import polyadcirc.pyADCIRC.prep_management as prep
 import polyadcirc.pyADCIRC.output as output
 import polyadcirc.run_framework.domain as dom
+import polyadcirc.run_framework.store_management as store
+import polyadcirc.run_framework.catalog_management as catalog
+import polyadcirc.run_framework.scheduler_management as scheduler
 
-def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
+def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir, lazy=False,
+            samples=None, nodes=None):
     """
     Loads data from ``save_file`` into a
     :class:`~polyadcirc.run_framework.random_manningsn.runSet` object.
@@ -33,6 +38,14 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
     :param string basis_dir: directory where ``landuse_*`` folders are located
     :param string base_dir: directory that contains ADCIRC executables, and
         machine specific ``in.prep#`` files
+    :param bool lazy: flag whether to read (and fix) the data of each file
+        when it is first accessed (True), see
+        :class:`~polyadcirc.run_framework.store_management.lazy_data`, or
+        to read all of the data now (False)
+    :param samples: slice, positions, or boolean mask of the runs to load,
+        only used if ``lazy``
+    :param nodes: slice, positions, or boolean mask of the nodes to load
+        from global (not station) files, only used if ``lazy``
     :rtype: tuple of :class:`~polyadcirc.run_framework.random_manningsn.runSet`
         and :class:`~polyadcirc.run_framework.random_manningsn.domain` objects
     :returns: (main_run, domain)
@@ -53,8 +66,14 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
     main_run.ts_data = {}
     main_run.nts_data = {}
 
-    # load the data from at *.mat file
-    mdat = sio.loadmat(os.path.join(save_dir, save_file))
+    if lazy:
+        mann_pts = load_lazy(main_run, domain, os.path.join(save_dir,
+                                                            save_file),
+                             samples, nodes)
+        return (main_run, domain, mann_pts)
+
+    # load the data from a result store or *.mat file
+    mdat = store.loadmat(os.path.join(save_dir, save_file))
     if mdat.has_key('mann_pts'):
         mann_pts = mdat['mann_pts']
     else:
@@ -65,11 +84,12 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
         if skey[-1] == 'time':
             # check to see if the key is "*_time"
             main_run.time_obs[skey[0]] = v
-        elif f15.filetype.has_key(skey[0]) or skey[0] == 'timemax63':
+        elif f15.filetype.has_key(skey[0]) or \
+                output.reductions.has_key(skey[0]):
             if len(v.shape) == 2:
                 # check to see if key is nts_data
                 main_run.nts_data[skey[0]] = v
-            elif skey[0] == 'timemax63':
+            elif output.reductions.has_key(skey[0]):
                 main_run.nts_data[skey[0]] = v
             else:
                 # check to see if key is ts_data
@@ -84,9 +104,67 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
 
     return (main_run, domain, mann_pts)
 
+def load_lazy(main_run, domain, file_name, samples=None, nodes=None):
+    """
+    Sets ``main_run.ts_data``, ``main_run.nts_data``, and
+    ``main_run.time_obs`` to
+    :class:`~polyadcirc.run_framework.store_management.lazy_data` of
+    ``file_name`` that fix the dry data of ``fort61``, ``fort63``, and
+    ``maxele63`` when they are first accessed.
+
+    :param main_run: :class:`~polyadcirc.run_framework.random_manningsn.runSet`
+    :param domain: :class:`~polyadcirc.run_framework.domain` with the
+        station bathymetry set
+    :param string file_name: path to a ``*.mat`` file or a result store
+    :param samples: slice, positions, or boolean mask of the runs to load
+    :param nodes: slice, positions, or boolean mask of the nodes to load
+        from global (not station) files
+    :rtype: :class:`numpy.ndarray` or None
+    :returns: mann_pts of the selected runs
+
+    """
+    ts_names, nts_names, time_names = {}, {}, {}
+    selections = {}
+    for k, shape in store.shapes(file_name).iteritems():
+        skey = k.split('_')
+        if skey[-1] == 'time':
+            # check to see if the key is "*_time"
+            time_names[skey[0]] = k
+            continue
+        elif f15.filetype.has_key(skey[0]) and f15.filetype[skey[0]][0]:
+            # station files
+            selections[skey[0]] = [(-1, samples)]
+        elif f15.filetype.has_key(skey[0]) or \
+                output.reductions.has_key(skey[0]):
+            selections[skey[0]] = [(0, nodes), (-1, samples)]
+        else:
+            continue
+        if len(shape) == 2 or output.reductions.has_key(skey[0]):
+            # check to see if key is nts_data
+            nts_names[skey[0]] = k
+        else:
+            # check to see if key is ts_data
+            ts_names[skey[0]] = k
+
+    bathymetry = {'fort63':domain.array_bathymetry(),
+                  'maxele63':domain.array_bathymetry()}
+    if domain.stations.has_key('fort61'):
+        bathymetry['fort61'] = domain.array_station_bathymetry()
+    main_run.ts_data = store.lazy_data(file_name, ts_names, selections,
+                                       bathymetry)
+    main_run.nts_data = store.lazy_data(file_name, nts_names, selections,
+                                        bathymetry)
+    main_run.time_obs = store.lazy_data(file_name, time_names)
+
+    mdat = store.loadmat(file_name, ['mann_pts'])
+    if mdat.has_key('mann_pts'):
+        return store.select(mdat['mann_pts'], [(-1, samples)])
+    return None
+
 def fix_dry_data(ts_data, data):
     """
-    Fix dry elevation station data flags
+    Fix dry elevation station data flags in place, see
+    :meth:`~polyadcirc.pyADCIRC.output.fix_dry`
 
     :param ts_data: time series data
     :param data: :class:`~polyadcirc.run_framework.domain`
@@ -94,17 +172,13 @@ def fix_dry_data(ts_data, data):
     :returns: ts_data
 
     """
-    mdat = np.ma.masked_equal(ts_data['fort61'], -99999.0)
-
-    for k, v in enumerate(data.stations['fort61']):
-        mdat[k-1, :, :] = mdat[k-1, :, :] + v.bathymetry
-
-    ts_data['fort61'] = mdat.filled(0.0)
+    output.fix_dry(ts_data['fort61'], data.array_station_bathymetry())
     return ts_data
 
 def fix_dry_nodes(ts_data, data):
     """
-    Fix dry elevation data flags
+    Fix dry elevation data flags in place, see
+    :meth:`~polyadcirc.pyADCIRC.output.fix_dry`
 
     :param ts_data: time series data
     :param data: :class:`~polyadcirc.run_framework.domain`
@@ -113,17 +187,13 @@ def fix_dry_nodes(ts_data, data):
     :returns: ts_data
 
     """
-    mdat = np.ma.masked_equal(ts_data['fort63'], -99999.0)
-
-    for k, v in data.node.iteritems():
-        mdat[k-1, :, :] = mdat[k-1, :, :] + v.bathymetry
-
-    ts_data['fort63'] = mdat.filled(0.0)
+    output.fix_dry(ts_data['fort63'], data.array_bathymetry())
     return ts_data
 
 def fix_dry_nodes_nts(nts_data, data):
     """
-    Fix dry elevation data flags
+    Fix dry elevation data flags in place, see
+    :meth:`~polyadcirc.pyADCIRC.output.fix_dry`
 
     :param nts_data: non time series data
     :param data: :class:`~polyadcirc.run_framework.domain`
@@ -132,12 +202,7 @@ def fix_dry_nodes_nts(nts_data, data):
     :returns: nts_data
 
     """
-    mdat = np.ma.masked_equal(nts_data['maxele63'], -99999.0)
-
-    for k, v in data.node.iteritems():
-        mdat[k-1, :] = mdat[k-1, :] + v.bathymetry
-
-    nts_data['maxele63'] = mdat.filled(0.0)
+    output.fix_dry(nts_data['maxele63'], data.array_bathymetry())
     return nts_data
 
 def convert_to_hours(time_obs):
@@ -196,6 +261,10 @@ def concatenate(run_data1, run_data2):
         run_data_list = zip(run_list, points_list)
         reduce(concatenate, run_data_list)
 
+    To combine the saved data of several runs without loading all of them
+    into memory see
+    :meth:`~polyadcirc.run_framework.store_management.merge`.
+
     :param run_data1: (runSet for run1, sample points for run1)
     :type tuple: (:class:`~polyadcirc.run_framework.random_manningsn.runSet`,
         :class:`numpy.ndarray`)
@@ -293,6 +362,35 @@ class runSet(pickleable):
         self.rf_dirs = None
         #: dict of :class:`numpy.ndarray`, time in (s) of observations
         self.time_obs = None
+        #: int, number of workers that read the output of each batch
+        self.ingest_workers = 1
+        #: bool, flag whether the workers are processes (True) or threads
+        #: (False)
+        self.ingest_processes = False
+        #: dict, keyword arguments of the reducers of the online reductions
+        #: in ``nts_names``, e.g. ``{'timeabove63': {'threshold': 0.5}}``,
+        #: see :meth:`~polyadcirc.pyADCIRC.output.get_reductions`
+        self.reduction_params = {}
+        #: str, format of saved run data (``'store'`` -- result store where
+        #: each batch only writes its own runs, see
+        #: :mod:`~polyadcirc.run_framework.store_management`, ``'mat'`` --
+        #: ``*.mat`` file rewritten after each batch)
+        self.save_format = 'store'
+        #: dict, axis of each key of the saved run data with one entry per
+        #: run if not the last axis
+        self.sample_axes = {}
+        #: bool, flag whether to memory-map ``ts_data``, ``nts_data``, and
+        #: ``time_obs`` to files in the result store in ``save_dir`` (True)
+        #: or to keep them in memory (False)
+        self.memmap_data = False
+        #: str, how runs are scheduled (``'batch'`` -- batches of
+        #: :attr:`num_of_parallel_runs` runs that wait for the slowest run,
+        #: ``'slots'`` -- each slot is refilled as soon as its run exits, see
+        #: :mod:`~polyadcirc.run_framework.scheduler_management`,
+        #: ``'pipeline'`` -- batches that run while the next batch is prepped
+        #: and the previous batch is ingested in a second set of
+        #: ``RF_directory_*``, see :meth:`run_pipeline`)
+        self.schedule = 'batch'
         if script_name:
             #: str, name of the batch bash script
             self.script_name = script_name
@@ -315,17 +413,17 @@ class runSet(pickleable):
         rf_dirs = glob.glob(os.path.join(self.save_dir, 'RF_directory_*'))
         num_dir = len(rf_dirs)
         # set up all rf_dirs
-        if num_dir >= self.num_of_parallel_runs:
+        if num_dir >= self.num_of_rf_dirs():
             for path in rf_dirs:
                 self.setup_rfdir(path, num_procs)
-        elif num_dir < self.num_of_parallel_runs:
-            for i in xrange(num_dir, self.num_of_parallel_runs):
+        elif num_dir < self.num_of_rf_dirs():
+            for i in xrange(num_dir, self.num_of_rf_dirs()):
                 rf_dirs.append(os.path.join(self.save_dir, 
                                             'RF_directory_'+str(i+1)))
                 self.setup_rfdir(rf_dirs[i], num_procs)
         self.rf_dirs = rf_dirs
         #PARALLEL: create file containing the list of rf_dirs
-        self.update_dir_file(self.num_of_parallel_runs)
+        self.update_dir_file(len(rf_dirs))
         self.write_prep_script(1)
         self.write_prep_script(2)
         self.write_prep_script(5)
@@ -336,6 +434,17 @@ class runSet(pickleable):
             self.link_random_field_directories()
         return rf_dirs
 
+    def num_of_rf_dirs(self):
+        """
+        :rtype: int
+        :returns: number of ``RF_directory_*`` needed by :attr:`schedule`,
+            twice :attr:`num_of_parallel_runs` for ``'pipeline'``
+
+        """
+        if self.schedule == 'pipeline':
+            return 2*self.num_of_parallel_runs
+        return self.num_of_parallel_runs
+
     def link_random_field_directories(self):
         """
         Assumes that the pre-preped ``RF_directory`` is ``RF_directory_1``.
@@ -437,7 +546,7 @@ class runSet(pickleable):
         prep.write_5(path, num_procs)
 
     def write_run_script(self, num_procs, num_jobs, procs_pnode, TpN,
-                         screenout=True, num_writers=None):
+                         screenout=True, num_writers=None, rf_dirs=None):
         """
         Creates a bash script called ``self.script_name`` in ``self.base_dir``
 
@@ -451,6 +560,9 @@ class runSet(pickleable):
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files
         :param int TpN: number of tasks (cores to use) per node (wayness)
+        :type rf_dirs: list or None
+        :param rf_dirs: ``RF_directory_*`` of each job, if None
+            ``self.rf_dirs``
         
         :rtype: string 
         :returns: name of bash script for running a batch of jobs within our
@@ -460,14 +572,15 @@ class runSet(pickleable):
         if find_executable('ibrun'):
             return self.write_run_script_ibrun(num_procs, num_jobs,
                                                procs_pnode, TpN, screenout,
-                                               num_writers) 
+                                               num_writers, rf_dirs) 
         else:
             return self.write_run_script_noibrun(num_procs, num_jobs,
                                                  procs_pnode, TpN, screenout,
-                                                 num_writers)
+                                                 num_writers, rf_dirs)
 
     def write_run_script_noibrun(self, num_procs, num_jobs, procs_pnode, TpN,
-                                 screenout=True, num_writers=None):
+                                 screenout=True, num_writers=None,
+                                 rf_dirs=None):
         """
         MPI VERSION 1.4.1 for EUCLID with the modules needed to run ADCIRC
 
@@ -485,13 +598,17 @@ class runSet(pickleable):
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files
         :param int TpN: number of tasks (processors to use) per node (wayness)
+        :type rf_dirs: list or None
+        :param rf_dirs: ``RF_directory_*`` of each job, if None
+            ``self.rf_dirs``
         
         :rtype: str
         :returns: name of bash script for running a batch of jobs within our
             processor allotment
 
         """
-        tmp_file = self.script_name.partition('.')[0]+'.tmp'
+        if rf_dirs is None:
+            rf_dirs = self.rf_dirs
         #num_nodes = int(math.ceil(num_procs*num_jobs/float(TpN)))
         with open(os.path.join(self.base_dir, self.script_name), 'w') as f:
             #f.write('#!/bin/bash\n')
@@ -499,23 +616,10 @@ class runSet(pickleable):
             # processors on a node?
             for i in xrange(num_jobs):
                 # write the bash file containing mpi commands
-                #line = 'ibrun -n {:d} -o {:d} '.format(num_procs,
-                #        num_procs*i*(procs_pnode/TpN))
-                line = 'mpirun -f $TMP/machines -binding user:'
-                # comma separated list of ranks w/o spaces
-                for j in xrange(num_procs-1):
-                    line += str(j+i*num_procs)+','
-                line += str((i+1)*num_procs-1)+' '
-                if TpN != procs_pnode:
-                    line += '-ranks-per-proc {:d} '.format(TpN)
-                line += '-np {:d} '.format(num_procs)
-                line += './padcirc -I {0} -O {0} '.format(self.rf_dirs[i])
-                if num_writers:
-                    line += '-W '+str(num_writers)+' '
-                if not screenout:
-                    line += '> '+tmp_file
-                line += ' &\n'
-                f.write(line)
+                line = self.launch_line_noibrun(num_procs, i, procs_pnode,
+                                                TpN, screenout, num_writers,
+                                                rf_dirs[i])
+                f.write(line+' &\n')
             f.write('wait\n')
         curr_stat = os.stat(os.path.join(self.base_dir, self.script_name))
         os.chmod(os.path.join(self.base_dir, self.script_name),
@@ -523,7 +627,8 @@ class runSet(pickleable):
         return self.script_name
 
     def write_run_script_noibrun_MPI19(self, num_procs, num_jobs, procs_pnode,
-                                       TpN, screenout=True, num_writers=None):
+                                       TpN, screenout=True, num_writers=None,
+                                       rf_dirs=None):
         """
         Creates a bash script called ``self.script_name`` in ``self.base_dir``
         and a set of rankfiles named ``rankfile_n`` to run multiple
@@ -539,52 +644,30 @@ class runSet(pickleable):
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files
         :param int TpN: number of tasks (processors to use) per node (wayness)
+        :type rf_dirs: list or None
+        :param rf_dirs: ``RF_directory_*`` of each job, if None
+            ``self.rf_dirs``
         
         :rtype: string 
         :returns: name of bash script for running a batch of jobs within our
             processor allotment
 
         """
-        tmp_file = self.script_name.partition('.')[0]+'.tmp'
+        if rf_dirs is None:
+            rf_dirs = self.rf_dirs
         #num_nodes = int(math.ceil(num_procs*num_jobs/float(TpN)))
         with open(os.path.join(self.base_dir, self.script_name), 'w') as f:
             #f.write('#!/bin/bash\n')
             # change i to 2*i or something like that to no use all of the
             # processors on a node?
             for i in xrange(num_jobs):
-                # write the bash file containing mpi commands
-                #line = 'ibrun -n {:d} -o {:d} '.format(num_procs,
-                #        num_procs*i*(procs_pnode/TpN))
-                rankfile = '{}rankfile{:d}'.format(self.script_name.partition\
-                        ('.')[0], i)
-                line = 'mpirun -machinefile $TMP/machines -rf '
-                line += rankfile+' -np {:d} '.format(num_procs)
-                line += './padcirc -I {0} -O {0} '.format(self.rf_dirs[i])
-                if num_writers:
-                    line += '-W '+str(num_writers)+' '
-                if not screenout:
-                    line += '> '+tmp_file
-                line += ' &\n'
-                f.write(line)
-                # write the rankfile containing the bindings
-                with open(os.path.join(self.base_dir, rankfile), 'w') as frank:
-                    for j in xrange(num_procs):
-                        # rank, node_num, slot_nums
-                        if TpN == procs_pnode:
-                            line = 'rank {:d}=n+{:d} slot={:d}'.format(j,\
-                                    (i*num_procs+j)/procs_pnode,\
-                                    (i*num_procs+j)%procs_pnode)
-                        else:
-                            processors_per_process = procs_pnode/TpN
-                            line = 'rank {:d}=n+{:d} slot={:d}-{:d}'.format(j,\
-                                    (i*num_procs+j)/TpN,\
-                                    ((i*num_procs+j)*processors_per_process)\
-                                    %procs_pnode,\
-                                    ((i*num_procs+j)*processors_per_process)\
-                                    %procs_pnode+processors_per_process-1)
-                        if j < num_procs-1:
-                            line += '\n'
-                        frank.write(line)
+                # write the bash file containing mpi commands and the
+                # rankfile containing the bindings
+                line = self.launch_line_noibrun_MPI19(num_procs, i,
+                                                      procs_pnode, TpN,
+                                                      screenout, num_writers,
+                                                      rf_dirs[i])
+                f.write(line+' &\n')
             f.write('wait\n')
         curr_stat = os.stat(os.path.join(self.base_dir, self.script_name))
         os.chmod(os.path.join(self.base_dir, self.script_name),
@@ -593,7 +676,8 @@ class runSet(pickleable):
 
     
     def write_run_script_ibrun(self, num_procs, num_jobs, procs_pnode, TpN,
-                               screenout=True, num_writers=None):
+                               screenout=True, num_writers=None,
+                               rf_dirs=None):
         """
         Creates a bash script called ``self.script_name`` in ``self.base_dir``
 
@@ -607,33 +691,180 @@ class runSet(pickleable):
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files
         :param int TpN: number of tasks (cores to use) per node (wayness)
+        :type rf_dirs: list or None
+        :param rf_dirs: ``RF_directory_*`` of each job, if None
+            ``self.rf_dirs``
         
         :rtype: string 
         :returns: name of bash script for running a batch of jobs within our
             processor allotment
 
         """
-        tmp_file = self.script_name.partition('.')[0]+'.tmp'
+        if rf_dirs is None:
+            rf_dirs = self.rf_dirs
         with open(os.path.join(self.base_dir, self.script_name), 'w') as f:
             f.write('#!/bin/bash\n')
             # change i to 2*i or something like that to no use all of the
             # processors on a node?
             for i in xrange(num_jobs):
-                line = 'ibrun -n {:d} -o {:d} '.format(num_procs,\
-                       num_procs*i*(procs_pnode/TpN))
-                line += './padcirc -I {0} -O {0} '.format(self.rf_dirs[i])
-                if num_writers:
-                    line += '-W '+str(num_writers)+' '
-                if not screenout:
-                    line += '> '+tmp_file
-                line += ' &\n'
-                f.write(line)
+                line = self.launch_line_ibrun(num_procs, i, procs_pnode, TpN,
+                                              screenout, num_writers,
+                                              rf_dirs[i])
+                f.write(line+' &\n')
             f.write('wait\n')
         curr_stat = os.stat(os.path.join(self.base_dir, self.script_name))
         os.chmod(os.path.join(self.base_dir, self.script_name),
                  curr_stat.st_mode | stat.S_IXUSR)
         return self.script_name
 
+    def launch_line(self, num_procs, slot, procs_pnode, TpN, screenout=True,
+                    num_writers=None, rf_dir=None):
+        """
+        Line of a bash script that launches :program:`PADCIRC` in slot
+        ``slot`` (``self.rf_dirs[slot]`` and the processors of the ``slot``
+        job of a batch), see :meth:`write_run_script`
+
+        :param int num_procs: number of processors per job
+        :param int slot: slot number
+        :param int procs_pnode: number of processors per node
+        :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param bool screenout: flag (True --  write ``ADCIRC`` output to
+            screen, False -- write ``ADCIRC`` output to temp file)
+        :param int num_writers: number of MPI processes to dedicate soley to
+            the task of writing ascii files
+        :type rf_dir: string or None
+        :param rf_dir: ``RF_directory_*`` of the job, if None
+            ``self.rf_dirs[slot]``
+
+        :rtype: string
+        :returns: launch line (without ``&`` or newline)
+
+        """
+        if find_executable('ibrun'):
+            return self.launch_line_ibrun(num_procs, slot, procs_pnode, TpN,
+                                          screenout, num_writers, rf_dir)
+        else:
+            return self.launch_line_noibrun(num_procs, slot, procs_pnode, TpN,
+                                            screenout, num_writers, rf_dir)
+
+    def launch_line_noibrun(self, num_procs, slot, procs_pnode, TpN,
+                            screenout=True, num_writers=None, rf_dir=None):
+        """
+        MPI VERSION 1.4.1 for EUCLID, see :meth:`launch_line` and
+        :meth:`write_run_script_noibrun`
+        """
+        tmp_file = self.script_name.partition('.')[0]+'.tmp'
+        if rf_dir is None:
+            rf_dir = self.rf_dirs[slot]
+        #line = 'ibrun -n {:d} -o {:d} '.format(num_procs,
+        #        num_procs*slot*(procs_pnode/TpN))
+        line = 'mpirun -f $TMP/machines -binding user:'
+        # comma separated list of ranks w/o spaces
+        for j in xrange(num_procs-1):
+            line += str(j+slot*num_procs)+','
+        line += str((slot+1)*num_procs-1)+' '
+        if TpN != procs_pnode:
+            line += '-ranks-per-proc {:d} '.format(TpN)
+        line += '-np {:d} '.format(num_procs)
+        line += './padcirc -I {0} -O {0} '.format(rf_dir)
+        if num_writers:
+            line += '-W '+str(num_writers)+' '
+        if not screenout:
+            line += '> '+tmp_file
+        return line
+
+    def launch_line_noibrun_MPI19(self, num_procs, slot, procs_pnode, TpN,
+                                  screenout=True, num_writers=None,
+                                  rf_dir=None):
+        """
+        MPI VERSION 1.9, see :meth:`launch_line` and
+        :meth:`write_run_script_noibrun_MPI19`. Also writes the rankfile
+        ``rankfile_slot`` containing the bindings of the slot.
+        """
+        tmp_file = self.script_name.partition('.')[0]+'.tmp'
+        if rf_dir is None:
+            rf_dir = self.rf_dirs[slot]
+        rankfile = '{}rankfile{:d}'.format(self.script_name.partition\
+                ('.')[0], slot)
+        line = 'mpirun -machinefile $TMP/machines -rf '
+        line += rankfile+' -np {:d} '.format(num_procs)
+        line += './padcirc -I {0} -O {0} '.format(rf_dir)
+        if num_writers:
+            line += '-W '+str(num_writers)+' '
+        if not screenout:
+            line += '> '+tmp_file
+        # write the rankfile containing the bindings
+        with open(os.path.join(self.base_dir, rankfile), 'w') as frank:
+            for j in xrange(num_procs):
+                # rank, node_num, slot_nums
+                if TpN == procs_pnode:
+                    rank = 'rank {:d}=n+{:d} slot={:d}'.format(j,\
+                            (slot*num_procs+j)/procs_pnode,\
+                            (slot*num_procs+j)%procs_pnode)
+                else:
+                    processors_per_process = procs_pnode/TpN
+                    rank = 'rank {:d}=n+{:d} slot={:d}-{:d}'.format(j,\
+                            (slot*num_procs+j)/TpN,\
+                            ((slot*num_procs+j)*processors_per_process)\
+                            %procs_pnode,\
+                            ((slot*num_procs+j)*processors_per_process)\
+                            %procs_pnode+processors_per_process-1)
+                if j < num_procs-1:
+                    rank += '\n'
+                frank.write(rank)
+        return line
+
+    def launch_line_ibrun(self, num_procs, slot, procs_pnode, TpN,
+                          screenout=True, num_writers=None, rf_dir=None):
+        """
+        See :meth:`launch_line` and :meth:`write_run_script_ibrun`
+        """
+        tmp_file = self.script_name.partition('.')[0]+'.tmp'
+        if rf_dir is None:
+            rf_dir = self.rf_dirs[slot]
+        line = 'ibrun -n {:d} -o {:d} '.format(num_procs,\
+               num_procs*slot*(procs_pnode/TpN))
+        line += './padcirc -I {0} -O {0} '.format(rf_dir)
+        if num_writers:
+            line += '-W '+str(num_writers)+' '
+        if not screenout:
+            line += '> '+tmp_file
+        return line
+
+    def write_slot_scripts(self, num_procs, procs_pnode, TpN, screenout=True,
+                           num_writers=None):
+        """
+        Creates a bash script for each of the ``self.num_of_parallel_runs``
+        slots in ``self.base_dir`` that runs a single :program:`PADCIRC` job
+        in the slot with the launch line of :meth:`launch_line` and exits
+        with its exit status.
+
+        :param int num_procs: number of processors per job
+        :param int procs_pnode: number of processors per node
+        :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param bool screenout: flag (True --  write ``ADCIRC`` output to
+            screen, False -- write ``ADCIRC`` output to temp file)
+        :param int num_writers: number of MPI processes to dedicate soley to
+            the task of writing ascii files
+
+        :rtype: list
+        :returns: names of the bash scripts of each slot
+
+        """
+        scripts = []
+        for slot in xrange(self.num_of_parallel_runs):
+            script = '{}_slot{:d}.sh'.format(self.script_name.partition\
+                    ('.')[0], slot)
+            with open(os.path.join(self.base_dir, script), 'w') as f:
+                f.write('#!/bin/bash\n')
+                f.write(self.launch_line(num_procs, slot, procs_pnode, TpN,
+                                         screenout, num_writers)+'\n')
+            curr_stat = os.stat(os.path.join(self.base_dir, script))
+            os.chmod(os.path.join(self.base_dir, script),
+                     curr_stat.st_mode | stat.S_IXUSR)
+            scripts.append(script)
+        return scripts
+
     def write_prep_script(self, n, screenout=False):
         """
         Creats a bash script to run :program:`adcprep` with ``in.prepn``
@@ -661,30 +892,517 @@ class runSet(pickleable):
                  curr_stat.st_mode | stat.S_IXUSR)
         return os.path.join(self.save_dir, 'prep_'+str(n)+'.sh')
 
-    def update_dir_file(self, num_dirs):
+    def update_dir_file(self, num_dirs, rf_dirs=None):
         """
 
         Create a list of RF_dirs for the prep_script to use.
 
         :param int num_dirs: number of RF_dirs to put in ``dir_list``
+        :type rf_dirs: list or None
+        :param rf_dirs: RF_dirs to choose from, if None ``self.rf_dirs``
 
         """
+        if rf_dirs is None:
+            rf_dirs = self.rf_dirs
         with open(os.path.join(self.save_dir, 'dir_list'), 'w') as f:
             for i in xrange(num_dirs-1):
-                f.write(self.rf_dirs[i]+'\n')
-            f.write(self.rf_dirs[num_dirs-1])
+                f.write(rf_dirs[i]+'\n')
+            f.write(rf_dirs[num_dirs-1])
 
-    def save(self, mdict, save_file):
+    def save(self, mdict, save_file, samples=None):
         """
-        Save matrices to a ``*.mat`` file for use by ``MATLAB BET`` code and
-        :meth:`~polyadcirc.run_framework.random_manningsn.loadmat`
+        Save matrices to a result store (see
+        :mod:`~polyadcirc.run_framework.store_management`) or a ``*.mat``
+        file, depending on :attr:`save_format`, for use by
+        :meth:`~polyadcirc.run_framework.random_manningsn.loadmat`. Use
+        :meth:`export_mat` to create a ``*.mat`` file for use by ``MATLAB
+        BET`` code from a result store.
 
         :param dict mdict: dictonary of run data
         :param string save_file: file name
+        :type samples: slice or None
+        :param samples: runs that have changed since the last save, if None
+            all runs are saved (only used by result stores)
+
+        """
+        if self.save_format == 'store':
+            store.save(os.path.join(self.save_dir, save_file), mdict,
+                       samples, self.sample_axes)
+        else:
+            sio.savemat(os.path.join(self.save_dir, save_file), mdict,
+                        do_compression=True)
+
+    def export_mat(self, save_file, mat_file=None):
+        """
+        Export the result store of ``save_file`` to a ``*.mat`` file for use
+        by ``MATLAB BET`` code.
+
+        :param string save_file: file name
+        :type mat_file: string or None
+        :param mat_file: name of the ``*.mat`` file, if None ``save_file``
+
+        """
+        if mat_file is None:
+            mat_file = save_file
+        store.export_mat(os.path.join(self.save_dir, save_file),
+                         os.path.join(self.save_dir, mat_file))
+
+    def clear_save_file(self, save_file, backup=True):
+        """
+        Move or remove the ``*.mat`` file and result store of a previous set
+        of runs saved to ``save_file``. Moved files are prefixed with the
+        number of previously moved files.
+
+        :param string save_file: file name
+        :param bool backup: flag (True -- move, False -- remove)
+
+        """
+        save_path = os.path.join(self.save_dir, save_file)
+        paths = [save_path, store.store_name(save_path)]
+        if not save_path.endswith('.mat'):
+            # :meth:`scipy.io.savemat` appends the extension
+            paths.append(save_path+'.mat')
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            if backup:
+                name = os.path.basename(path)
+                old_files = glob.glob(os.path.join(self.save_dir, "*"+name))
+                shutil.move(path, os.path.join(self.save_dir,
+                                               str(len(old_files))+name))
+            elif os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+
+    def allocate(self, key, shape, save_file=None):
+        """
+        Pre-allocate a zero filled array for ``key`` of the run data. If
+        :attr:`memmap_data` and ``save_file`` is given the array is
+        memory-mapped to a file in the result store of ``save_file`` (see
+        :meth:`~polyadcirc.run_framework.store_management.allocate`) so that
+        its size is limited by the disk instead of the memory.
+
+        :param string key: key of the array in the saved run data
+        :param tuple shape: shape of the array
+        :type save_file: string or None
+        :param save_file: file name
+        :rtype: :class:`numpy.ndarray` or :class:`numpy.memmap`
+        :returns: zero filled array
+
+        """
+        if self.memmap_data and save_file is not None:
+            return store.allocate(os.path.join(self.save_dir, save_file), key,
+                                  shape, axis=self.sample_axes.get(key, -1))
+        return np.zeros(shape)
+
+    def open_catalog(self, save_file, points, resume=False, backup=True):
+        """
+        Open the run catalog (see
+        :mod:`~polyadcirc.run_framework.catalog_management`) of
+        ``save_file``. If ``resume`` and a previous set of runs saved to the
+        result store of ``save_file`` has a catalog the catalog is kept,
+        otherwise the save file is cleared (see :meth:`clear_save_file`) and
+        every sample of ``points`` is pending.
+
+        :param string save_file: file name
+        :param points: :class:`numpy.ndarray` of dimensions (``dim``,
+            ``num_points``) of the parameters of each run
+        :param bool resume: flag whether to resume a previous set of runs
+        :param bool backup: flag (True -- move, False -- remove) for
+            :meth:`clear_save_file`
+        :rtype: tuple
+        :returns: (run catalog, True if the previous set of runs is
+            resumed), see
+            :class:`~polyadcirc.run_framework.catalog_management.catalog`
+
+        """
+        save_path = os.path.join(self.save_dir, save_file)
+        catalog_file = catalog.catalog_file(save_path)
+        if resume and self.save_format == 'store' and \
+                store.is_store(save_path) and os.path.exists(catalog_file):
+            run_catalog = catalog.catalog(catalog_file)
+            if not run_catalog.matches(points):
+                run_catalog.close()
+                raise ValueError('points do not match the runs in '+
+                                 catalog_file)
+            return run_catalog, True
+        self.clear_save_file(save_file, backup)
+        run_catalog = catalog.catalog(catalog_file)
+        run_catalog.reset(points)
+        return run_catalog, False
+
+    def close_catalog(self, run_catalog, save_file):
+        """
+        Close the run catalog opened by :meth:`open_catalog` and check that
+        every run succeeded.
+
+        :param run_catalog:
+            :class:`~polyadcirc.run_framework.catalog_management.catalog`
+        :param string save_file: name of the file the runs are saved to
+
+        :raises RuntimeError: if any run exited with an error, the data of
+            the failed runs in ``save_file`` is zero and they are rerun when
+            the set of runs is resumed (see :meth:`open_catalog`)
+
+        """
+        failed = run_catalog.returncodes()
+        num_points = len(run_catalog)
+        run_catalog.close()
+        if failed:
+            raise RuntimeError('{:d} of {:d} runs exited with an error (run: '
+                               'exit status) {}, their data in {} is zero, '
+                               'rerun them with resume=True'.format(\
+                                       len(failed), num_points, failed,
+                                       save_file))
+
+    def resume_save_file(self, save_file, ts_names, nts_names):
+        """
+        Set ``self.ts_data``, ``self.nts_data``, and ``self.time_obs`` to the
+        arrays saved to the result store of ``save_file`` by a previous set
+        of runs. The arrays are memory-mapped if :attr:`memmap_data`.
+
+        :param string save_file: file name
+        :param list ts_names: names of ADCIRC timeseries
+            output files to be recorded from each run
+        :param list nts_names: names of ADCIRC non timeseries
+            output files to be recorded from each run
+        :rtype: dict
+        :returns: dictonary of run data
+
+        """
+        if self.memmap_data:
+            mmap_mode = 'r+'
+        else:
+            mmap_mode = None
+        mdict = store.load(os.path.join(self.save_dir, save_file),
+                           mmap_mode=mmap_mode)
+        self.nts_data = {}
+        for fid in nts_names:
+            key = fid.replace('.', '')
+            self.nts_data[key] = mdict[key]
+        self.ts_data = {}
+        self.time_obs = {}
+        for fid in ts_names:
+            key = fid.replace('.', '')
+            self.ts_data[key] = mdict[key]
+            self.time_obs[key] = mdict[key+'_time']
+        return mdict
+
+    def batches(self, samples):
+        """
+        :param list samples: samples (run numbers)
+        :rtype: list
+        :returns: ``samples`` split into batches of at most
+            ``self.num_of_parallel_runs`` samples
+
+        """
+        return [samples[i:i+self.num_of_parallel_runs] for i in \
+                xrange(0, len(samples), self.num_of_parallel_runs)]
 
+    def prep_slot(self, slot, screenout=False):
         """
-        sio.savemat(os.path.join(self.save_dir, save_file), mdict,
-                    do_compression=True)
+        Run :program:`adcprep` with ``in.prep5`` in ``self.rf_dirs[slot]``
+        (the ``fort.13`` of a single run), see :meth:`write_prep_script`
+
+        :param int slot: slot number
+        :param bool screenout: flag (True --  write ``ADCPREP`` output to
+            screen, False -- write ``ADCPREP`` output to ``prep_o.txt`` file)
+
+        """
+        rf_dir = self.rf_dirs[slot]
+        with open(os.path.join(rf_dir, 'in.prep5'), 'r') as fin:
+            if screenout:
+                subprocess.call(['./adcprep'], stdin=fin, cwd=rf_dir)
+            else:
+                with open(os.path.join(rf_dir, 'prep_o.txt'), 'w') as fout:
+                    subprocess.call(['./adcprep'], stdin=fin, stdout=fout,
+                                    cwd=rf_dir)
+
+    def prep_slots(self, slots, n=5):
+        """
+        Run :program:`adcprep` with ``in.prepn`` in the ``RF_directory_*``
+        of ``slots`` in parallel with ``prep_n.sh``, see
+        :meth:`write_prep_script`
+
+        :param list slots: slot numbers
+        :param int n: n for ``in.prepn`` input to ADCPREP
+
+        """
+        self.write_prep_script(n)
+        #PARALLEL: update file containing the list of rf_dirs
+        self.update_dir_file(len(slots), [self.rf_dirs[i] for i in slots])
+        devnull = open(os.devnull, 'w')
+        p = subprocess.Popen(['./prep_'+str(n)+'.sh'], stdout=devnull,
+                             cwd=self.save_dir)
+        p.communicate()
+        devnull.close()
+
+    def run_samples(self, samples, write_inputs, ingest, run_catalog,
+                    num_procs, procs_pnode, TpN, screenout=True,
+                    num_writers=None):
+        """
+        Runs :program:`ADCIRC` for ``samples`` in the ``RF_directory_*``
+        (slots) as scheduled by :attr:`schedule`, see :meth:`run_batches`,
+        :meth:`run_slots`, and :meth:`run_pipeline`
+
+        :param list samples: samples (run numbers) to run
+        :param write_inputs: callable, ``write_inputs(batch, slots)`` writes
+            the inputs (e.g. ``fort.13``) of the runs in ``batch`` to the
+            ``RF_directory_*`` of ``slots``
+        :param ingest: callable, ``ingest(batch, slots)`` reads the outputs
+            of the runs in ``batch`` from the ``RF_directory_*`` of
+            ``slots`` and saves them
+        :param run_catalog:
+            :class:`~polyadcirc.run_framework.catalog_management.catalog`
+        :param int num_procs: number of processors per :program:`ADCIRC`
+            simulation
+        :param int procs_pnode: number of processors per node
+        :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param bool screenout: flag (True --  write ``ADCIRC`` output to
+            screen, False -- write ``ADCIRC`` output to temp file
+        :param int num_writers: number of MPI processes to dedicate soley to
+            the task of writing ascii files
+
+        """
+        if self.schedule == 'slots':
+            self.run_slots(samples, write_inputs, ingest, run_catalog,
+                           num_procs, procs_pnode, TpN, screenout,
+                           num_writers)
+        elif self.schedule == 'pipeline':
+            self.run_pipeline(samples, write_inputs, ingest, run_catalog,
+                              num_procs, procs_pnode, TpN, screenout,
+                              num_writers)
+        else:
+            self.run_batches(samples, write_inputs, ingest, run_catalog,
+                             num_procs, procs_pnode, TpN, screenout,
+                             num_writers)
+
+    def run_batches(self, samples, write_inputs, ingest, run_catalog,
+                    num_procs, procs_pnode, TpN, screenout=True,
+                    num_writers=None):
+        """
+        Runs :program:`ADCIRC` for ``samples`` in batches of
+        :attr:`num_of_parallel_runs` runs. Each batch is prepped with
+        ``prep_5.sh`` and run with :meth:`write_run_script` and waits for
+        the slowest run in the batch. See :meth:`run_samples` for the
+        parameters.
+
+        """
+        num_points = len(run_catalog)
+        for batch in self.batches(samples):
+            step = len(batch)
+            slots = range(step)
+            run_script = self.write_run_script(num_procs, step, procs_pnode,
+                                               TpN, screenout, num_writers)
+            # write the inputs (e.g. Manning's n fields) of the batch
+            write_inputs(batch, slots)
+            self.prep_slots(slots)
+            run_catalog.start(batch, self.rf_dirs[:step])
+            devnull = open(os.devnull, 'w')
+            p = subprocess.Popen(['./'+run_script], stdout=devnull, cwd=
+                                 self.base_dir)
+            p.communicate()
+            devnull.close()
+            run_catalog.finish(batch)
+            # get data, update and save
+            ingest(batch, slots)
+            run_catalog.ingest(batch)
+            if num_points <= self.num_of_parallel_runs:
+                pass
+            elif (batch[0]+1)%(num_points/self.num_of_parallel_runs) == 0:
+                msg = str(batch[0]+1)+" of "+str(num_points)
+                print msg+" runs have been completed."
+
+    def run_slots(self, samples, write_inputs, ingest, run_catalog,
+                  num_procs, procs_pnode, TpN, screenout=True,
+                  num_writers=None):
+        """
+        Runs :program:`ADCIRC` for ``samples`` in :attr:`num_of_parallel_runs`
+        slots with a
+        :class:`~polyadcirc.run_framework.scheduler_management.slot_scheduler`.
+        As soon as the run in a slot exits its outputs are ingested and the
+        next sample is prepped (see :meth:`prep_slot`) and launched in the
+        slot with the script of the slot (see :meth:`write_slot_scripts`).
+        Runs that exit with an error are not ingested and are marked failed
+        in ``run_catalog``. See :meth:`run_samples` for the parameters.
+
+        """
+        scripts = self.write_slot_scripts(num_procs, procs_pnode, TpN,
+                                          screenout, num_writers)
+        devnull = open(os.devnull, 'w')
+
+        def prepare(sample, slot):
+            write_inputs([sample], [slot])
+            self.prep_slot(slot)
+            run_catalog.start([sample], [self.rf_dirs[slot]])
+
+        def launch(slot):
+            return subprocess.Popen(['./'+scripts[slot]], stdout=devnull,
+                                    cwd=self.base_dir)
+
+        def finish(sample, slot, returncode):
+            run_catalog.finish([sample], [returncode])
+            if returncode != 0:
+                print "Run {:d} in {} exited with {:d}.".format(sample,
+                        self.rf_dirs[slot], returncode)
+                return
+            ingest([sample], [slot])
+            run_catalog.ingest([sample])
+
+        try:
+            scheduler.slot_scheduler(self.num_of_parallel_runs, prepare,
+                                     launch, finish).run(samples)
+        finally:
+            devnull.close()
+
+    def run_pipeline(self, samples, write_inputs, ingest, run_catalog,
+                     num_procs, procs_pnode, TpN, screenout=True,
+                     num_writers=None):
+        """
+        Runs :program:`ADCIRC` for ``samples`` in batches of
+        :attr:`num_of_parallel_runs` runs that alternate between two sets
+        of ``RF_directory_*`` (slots ``0`` to ``num_of_parallel_runs-1`` and
+        ``num_of_parallel_runs`` to ``2*num_of_parallel_runs-1``, see
+        :meth:`num_of_rf_dirs`). While batch ``k`` runs the outputs of batch
+        ``k-1`` are ingested and saved and then the inputs of batch ``k+1``
+        are written and prepped in the set of ``RF_directory_*`` of batch
+        ``k-1``. Batch ``k`` runs on the same processors as in
+        :meth:`run_batches`. See :meth:`run_samples` for the parameters.
+
+        """
+        if len(self.rf_dirs) < 2*self.num_of_parallel_runs:
+            raise ValueError('the pipeline needs {:d} RF_directory_* but '
+                             'there are {:d}, set schedule before calling '
+                             'initialize_random_field_directories'.format(\
+                                     2*self.num_of_parallel_runs,
+                                     len(self.rf_dirs)))
+        batches = self.batches(samples)
+        if not batches:
+            return
+        num_points = len(run_catalog)
+        buffers = [range(self.num_of_parallel_runs),
+                   range(self.num_of_parallel_runs,
+                         2*self.num_of_parallel_runs)]
+
+        def prepare(k):
+            slots = buffers[k%2][:len(batches[k])]
+            # write the inputs (e.g. Manning's n fields) of the batch
+            write_inputs(batches[k], slots)
+            self.prep_slots(slots)
+            return slots
+
+        def finish(batch, slots):
+            # get data, update and save
+            ingest(batch, slots)
+            run_catalog.ingest(batch)
+            if num_points <= self.num_of_parallel_runs:
+                pass
+            elif (batch[0]+1)%(num_points/self.num_of_parallel_runs) == 0:
+                msg = str(batch[0]+1)+" of "+str(num_points)
+                print msg+" runs have been completed."
+
+        slots = prepare(0)
+        previous = None
+        devnull = open(os.devnull, 'w')
+        try:
+            for k, batch in enumerate(batches):
+                rf_dirs = [self.rf_dirs[i] for i in slots]
+                run_script = self.write_run_script(num_procs, len(batch),
+                                                   procs_pnode, TpN,
+                                                   screenout, num_writers,
+                                                   rf_dirs)
+                run_catalog.start(batch, rf_dirs)
+                p = subprocess.Popen(['./'+run_script], stdout=devnull,
+                                     cwd=self.base_dir)
+                # the previous batch must be ingested before its
+                # RF_directory_* are reused by the next batch
+                if previous:
+                    finish(*previous)
+                if k+1 < len(batches):
+                    next_slots = prepare(k+1)
+                p.wait()
+                run_catalog.finish(batch)
+                previous = (batch, slots)
+                if k+1 < len(batches):
+                    slots = next_slots
+            finish(*previous)
+        finally:
+            devnull.close()
+
+    def preallocate_ts(self, data, ts_names, num_points, nodes=None,
+                       window=None, stride=None, save_file=None):
+        """
+        Pre-allocate ``self.ts_data`` and ``self.time_obs`` for the
+        timeseries data of ``num_points`` runs. Arrays of global (not
+        station) files are sized to ``nodes`` and arrays of all files are
+        sized to the records in ``window`` and ``stride`` of
+        ``data.record_times``, the same times used to select the records
+        when the output is read (see
+        :meth:`~polyadcirc.pyADCIRC.output.get_data_ts`).
+
+        :param data: :class:`~polyadcirc.run_framework.domain`
+        :param list ts_names: names of ADCIRC timeseries
+            output files to be recorded from each run
+        :param int num_points: number of runs
+        :param nodes: positions (zero based) of the nodes to record or a
+            boolean mask, see :meth:`~polyadcirc.pyADCIRC.output.get_ts_sr`
+        :param tuple window: (t0, t1) times of the records to record
+        :param int stride: record every ``stride`` record
+        :type save_file: string or None
+        :param save_file: file name, see :meth:`allocate`
+
+        """
+        self.ts_data = {}
+        self.time_obs = {}
+        for fid in ts_names:
+            key = fid.replace('.', '')
+            meas_locs, total_obs, irtype = data.recording[key]
+            if nodes is not None and not f15.filetype[key][0]:
+                meas_locs = output.select_nodes(nodes, meas_locs).shape[0]
+            if window is not None or stride:
+                total_obs = output.select_records(data.record_times[key],
+                                                  window, stride).shape[0]
+            if irtype == 1:
+                shape = (meas_locs, total_obs, num_points)
+            else:
+                shape = (meas_locs, total_obs, irtype, num_points)
+            self.ts_data[key] = self.allocate(key, shape, save_file)
+            self.time_obs[key] = self.allocate(key+'_time', (total_obs,),
+                                               save_file)
+
+    def get_batch_data(self, data, columns, ts_names, nts_names, slots=None,
+                       **options):
+        """
+        Retrieves data from the output files in the first ``len(columns)``
+        ``RF_directory_*`` (or the ``RF_directory_*`` of ``slots``) and
+        stores it in ``columns`` of ``self.ts_data`` and ``self.nts_data``
+        using :attr:`ingest_workers` threads or processes, see
+        :meth:`~polyadcirc.pyADCIRC.output.get_data_batch`. Online
+        reductions use the parameters in :attr:`reduction_params`.
+
+        :param data: :class:`~polyadcirc.run_framework.domain`
+        :param list columns: column (run number) of each run in the batch
+        :param list ts_names: names of ADCIRC timeseries
+            output files to be recorded from each run
+        :param list nts_names: names of ADCIRC non timeseries
+            output files to be recorded from each run
+        :type slots: list or None
+        :param slots: slot of each run in the batch, if None
+            ``range(len(columns))``
+        :param options: ``nodes``, ``window``, ``stride``, see
+            :meth:`~polyadcirc.pyADCIRC.output.get_data_ts`
+
+        """
+        if slots is None:
+            rf_dirs = self.rf_dirs[:len(columns)]
+        else:
+            rf_dirs = [self.rf_dirs[i] for i in slots]
+        output.get_data_batch(columns, rf_dirs, data,
+                              self.ts_data, self.time_obs, self.nts_data,
+                              ts_names, nts_names, self.ingest_workers,
+                              self.ingest_processes,
+                              params=self.reduction_params, **options)
 
     def update_mdict(self, mdict):
         """
@@ -729,11 +1447,13 @@ class runSet(pickleable):
     def run_points(self, data, points, save_file, num_procs=12, procs_pnode=12,
                    ts_names=["fort.61"], nts_names=["maxele.63"],
                    screenout=True, cleanup_dirs=True, num_writers=None,
-                   TpN=None):
+                   TpN=None, nodes=None, window=None, stride=None,
+                   resume=False):
         """
         Runs :program:`ADCIRC` for all of the configurations specified by
         ``points`` and returns a dictonary of arrays containing data from
-        output files
+        output files. The runs are scheduled by :attr:`schedule`, see
+        :meth:`run_samples`.
 
         Reads in a default Manning's *n* value from ``self.save_dir`` and
         stores it in ``data.manningsn_default``
@@ -752,7 +1472,9 @@ class runSet(pickleable):
         :param list ts_names: names of ADCIRC timeseries
             output files to be recorded from each run
         :param list nts_names: names of ADCIRC non timeseries
-            output files to be recorded from each run
+            output files or online reductions (see
+            :data:`~polyadcirc.pyADCIRC.output.reductions`) to be recorded
+            from each run
         :param bool screenout: flag (True --  write ``ADCIRC`` output to
             screen, False -- write ``ADCIRC`` output to temp file
         :param bool cleanup_dirs: flag to delete all RF_dirs after run (True
@@ -760,6 +1482,20 @@ class runSet(pickleable):
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files. This MUST be < num_procs
         :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param nodes: positions (zero based) of the nodes to record from
+            global timeseries output files or a boolean mask, see
+            :meth:`~polyadcirc.run_framework.domain.domain.nodes_in_polygon`
+        :param tuple window: (t0, t1) times of the records to record from
+            timeseries output files
+        :param int stride: record every ``stride`` record of timeseries
+            output files
+        :param bool resume: flag whether to resume a previous call with the
+            same ``points`` and ``save_file`` that was interrupted and only
+            run the samples that were not completed, see
+            :meth:`open_catalog`
+
+        :raises RuntimeError: if any run exited with an error, the data of
+            the other runs is saved to ``save_file``
         
         :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`,
             :class:`numpy.ndarray`) 
@@ -773,97 +1509,65 @@ class runSet(pickleable):
         if TpN is None:
             TpN = procs_pnode
         # setup and save to shelf
-        # set up saving
-        if glob.glob(os.path.join(self.save_dir, save_file)):
-            old_files = glob.glob(os.path.join(self.save_dir, 
-                                               "*"+save_file)) 
-            shutil.move(os.path.join(self.save_dir, save_file),
-                        os.path.join(self.save_dir, 
-                                     str(len(old_files))+save_file))
-
-        # Save matricies to *.mat file for use by MATLAB or Python
-        mdict = dict()
-        mdict['mann_pts'] = points
-        self.save(mdict, save_file)
+        # set up saving and the run catalog
+        run_catalog, resumed = self.open_catalog(save_file, points, resume)
+        num_points = points.shape[1]
 
-        bv_dict = tmm.get_basis_vectors(self.basis_dir)
+        if resumed:
+            mdict = self.resume_save_file(save_file, ts_names, nts_names)
+        else:
+            # Save matricies to *.mat file for use by MATLAB or Python
+            mdict = dict()
+            mdict['mann_pts'] = points
+            self.save(mdict, save_file)
 
-        # Pre-allocate arrays for various data files
-        num_points = points.shape[1]
-        # Pre-allocate arrays for non-timeseries data
-        nts_data = {}
-        self.nts_data = nts_data
-        for fid in nts_names:
-            key = fid.replace('.', '')
-            nts_data[key] = np.zeros((data.node_num, num_points))
-        # Pre-allocate arrays for timeseries data
-        ts_data = {}
-        time_obs = {}
-        self.ts_data = ts_data
-        self.time_obs = time_obs
-        for fid in ts_names:
-            key = fid.replace('.', '')
-            meas_locs, total_obs, irtype = data.recording[key]
-            if irtype == 1:
-                ts_data[key] = np.zeros((meas_locs, total_obs, num_points))
-            else:
-                ts_data[key] = np.zeros((meas_locs, total_obs,
-                                         irtype, num_points))
-            time_obs[key] = np.zeros((total_obs,))
+            # Pre-allocate arrays for non-timeseries data
+            self.nts_data = {}
+            for fid in nts_names:
+                key = fid.replace('.', '')
+                self.nts_data[key] = self.allocate(key, (data.node_num,
+                                                         num_points),
+                                                   save_file)
+            # Pre-allocate arrays for timeseries data
+            self.preallocate_ts(data, ts_names, num_points, nodes, window,
+                                stride, save_file)
 
-        # Update and save
-        self.update_mdict(mdict)
-        self.save(mdict, save_file)
+            # Update and save
+            self.update_mdict(mdict)
+            self.save(mdict, save_file)
+        ts_data = self.ts_data
+        nts_data = self.nts_data
+        time_obs = self.time_obs
 
+        bv_dict = tmm.get_basis_vectors(self.basis_dir)
         default = data.read_default(path=self.save_dir)
-
-        for k in xrange(0, num_points, self.num_of_parallel_runs):
-            if k+self.num_of_parallel_runs >= num_points:
-                stop = num_points
-                step = stop-k
-            else:
-                stop = k+self.num_of_parallel_runs
-                step = self.num_of_parallel_runs
-            run_script = self.write_run_script(num_procs, step, procs_pnode,
-                                               TpN, screenout, num_writers)
-            self.write_prep_script(5)
-            for i in xrange(0, step):
-                # generate the Manning's n field
-                r_field = tmm.combine_basis_vectors(points[..., i+k], bv_dict,
-                                                    default, data.node_num)
+        mann_template = f13.fort13_template(os.path.join(self.save_dir,
+                                                         'fort.13'))
+
+        def write_inputs(batch, slots):
+            # generate the Manning's n fields
+            r_fields = tmm.combine_basis_vectors_batch(\
+                    points[..., batch], bv_dict, default, data.node_num)
+            for i, slot in enumerate(slots):
                 # create the fort.13 for r_field
-                data.update_mann(r_field, self.rf_dirs[i])
-            # do a batch run of python
-            #PARALLEL: update file containing the list of rf_dirs
-            self.update_dir_file(self.num_of_parallel_runs)
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./prep_5.sh'], stdout=devnull, cwd=
-                                 self.save_dir)
-            p.communicate()
-            devnull.close()
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./'+run_script], stdout=devnull, cwd=
-                                 self.base_dir)
-            p.communicate()
-            devnull.close()
+                mann_template.write(r_fields[:, i], self.rf_dirs[slot])
+
+        def ingest(batch, slots):
             # get data
-            for i, kk in enumerate(range(k, stop)):
-                output.get_data_ts(kk, self.rf_dirs[i], self.ts_data, time_obs,
-                                   ts_names)
-                output.get_data_nts(kk, self.rf_dirs[i], data, self.nts_data,
-                                    nts_names)
+            self.get_batch_data(data, batch, ts_names, nts_names, slots,
+                                nodes=nodes, window=window, stride=stride)
             # Update and save
             self.update_mdict(mdict)
-            self.save(mdict, save_file)
-            if num_points <= self.num_of_parallel_runs:
-                pass
-            elif (k+1)%(num_points/self.num_of_parallel_runs) == 0:
-                msg = str(k+1)+" of "+str(num_points)
-                print msg+" runs have been completed."
+            self.save(mdict, save_file, slice(batch[0], batch[-1]+1))
+
+        self.run_samples(run_catalog.pending(), write_inputs, ingest,
+                         run_catalog, num_procs, procs_pnode, TpN, screenout,
+                         num_writers)
 
         # save data
         self.update_mdict(mdict)
         self.save(mdict, save_file)
+        self.close_catalog(run_catalog, save_file)
 
         if cleanup_dirs:
             self.remove_random_field_directories()
@@ -5,15 +5,17 @@ This module contains functions to pull data from ADCIRC output files and the
 :class:`runSet` which controls the running of ADCIRC simulations within a set
 of processors allocated by the submission script
 """
-import glob, os, subprocess, shutil 
-import scipy.io as sio
+import os
 import numpy as np
 from scipy.interpolate import griddata
-import polyadcirc.pyGriddata.table_to_mesh_map as tmm
+import polyadcirc.pyADCIRC.fort13_management as f13
 import polyadcirc.pyADCIRC.output as output
+import polyadcirc.pyGriddata.table_to_mesh_map as tmm
 import polyadcirc.run_framework.random_manningsn as rmn
+import polyadcirc.run_framework.store_management as store
 
-def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
+def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir, lazy=False,
+            samples=None, nodes=None):
     """
 
     Loads data from ``save_file`` into a
@@ -29,6 +31,13 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
     :param string basis_dir: directory where ``landuse_*`` folders are located
     :param string base_dir: directory that contains ADCIRC executables, and
         machine specific ``in.prep#`` files 
+    :param bool lazy: flag whether to read (and fix) the data of each file
+        when it is first accessed, see
+        :meth:`~polyadcirc.run_framework.random_manningsn.loadmat`
+    :param samples: slice, positions, or boolean mask of the runs to load,
+        only used if ``lazy``
+    :param nodes: slice, positions, or boolean mask of the nodes to load
+        from global (not station) files, only used if ``lazy``
     
     :rtype: tuple of
         :class:`~polyadcirc.run_framework.random_manningsn_Q.runSet`,
@@ -38,11 +47,14 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
 
     """
     main_run, domain, mann_pts = rmn.loadmat(save_file, base_dir, grid_dir,
-                                             save_dir, basis_dir)
+                                             save_dir, basis_dir, lazy,
+                                             samples, nodes)
     
-       # load the data from at *.mat file
-    mdat = sio.loadmat(os.path.join(save_dir, save_file))
+    # load the data from a result store or *.mat file
+    mdat = store.loadmat(os.path.join(save_dir, save_file), ['Q'])
     Q = mdat['Q']
+    if lazy:
+        Q = store.select(Q, [(0, samples)])
     
     return (main_run, domain, mann_pts, Q)
 
@@ -81,6 +93,8 @@ class runSet(rmn.runSet):
         super(runSet, self).__init__(grid_dir, save_dir, basis_dir, 
                                      num_of_parallel_runs, base_dir,
                                      script_name)
+        # Q has one row per run
+        self.sample_axes['Q'] = 0
 
     def update_mdict(self, mdict):
         """
@@ -95,7 +109,8 @@ class runSet(rmn.runSet):
             
     def run_nobatch_q(self, data, mann_points, save_file, 
                       num_procs=12, procs_pnode=12, stations=None,
-                      screenout=True, num_writers=None, TpN=None):
+                      screenout=True, num_writers=None, TpN=None,
+                      resume=False):
         """
         
         Runs :program:`ADCIRC` for all of the configurations specified by
@@ -131,6 +146,10 @@ class runSet(rmn.runSet):
             the task of writing ascii files. This MUST be less than
             ``num_procs``
         :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param bool resume: flag whether to resume a previous call with the
+            same ``mann_points`` and ``save_file`` that was interrupted and
+            only run the samples that were not completed, see
+            :meth:`~polyadcirc.run_framework.random_manningsn.runSet.open_catalog`
     
         :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`)
         :returns: (``time_obs``, ``ts_data``, ``nts_data``)
@@ -139,34 +158,32 @@ class runSet(rmn.runSet):
         if TpN is None:
             TpN = procs_pnode
         # setup and save to shelf
-        # set up saving
-        if glob.glob(os.path.join(self.save_dir, save_file)):
-            old_files = glob.glob(os.path.join(self.save_dir, "*"+save_file)) 
-            shutil.move(os.path.join(self.save_dir, save_file),
-                        os.path.join(self.save_dir,
-                                     str(len(old_files))+save_file))
-
-        # Save matricies to *.mat file for use by MATLAB or Python
-        mdict = dict()
-        mdict['mann_pts'] = mann_points 
-        self.save(mdict, save_file)
-
-        bv_dict = tmm.get_basis_vectors(self.basis_dir)
-
-        # Pre-allocate arrays for various data files
+        # set up saving and the run catalog
+        run_catalog, resumed = self.open_catalog(save_file, mann_points,
+                                                 resume)
         num_points = mann_points.shape[1]
+
         # Pre-allocate arrays for non-timeseries data
         nts_data = {}
-        self.nts_data = nts_data
         nts_data['maxele63'] = np.empty((data.node_num,
-                                         self.num_of_parallel_runs))        
+                                         self.num_of_rf_dirs()))        
         
         # Pre-allocate arrays for QoI data
         if stations is None:
             stations = data.stations['fort61']
         xi = np.array([[s.x, s.y] for s in stations])
         points = np.column_stack((data.array_x(), data.array_y()))
-        Q = np.empty((num_points, xi.shape[0]))
+
+        if resumed:
+            mdict = self.resume_save_file(save_file, [], [])
+            Q = mdict['Q']
+        else:
+            # Save matricies to *.mat file for use by MATLAB or Python
+            mdict = dict()
+            mdict['mann_pts'] = mann_points 
+            self.save(mdict, save_file)
+            Q = np.empty((num_points, xi.shape[0]))
+        self.nts_data = nts_data
         self.Q = Q
         mdict['Q'] = Q
 
@@ -174,60 +191,42 @@ class runSet(rmn.runSet):
         self.update_mdict(mdict)
         self.save(mdict, save_file)
 
+        bv_dict = tmm.get_basis_vectors(self.basis_dir)
         default = data.read_default(path=self.save_dir)
+        mann_template = f13.fort13_template(os.path.join(self.save_dir,
+                                                         'fort.13'))
 
-        for k in xrange(0, num_points, self.num_of_parallel_runs):
-            if k+self.num_of_parallel_runs >= num_points:
-                stop = num_points
-                step = stop-k
-            else:
-                stop = k+self.num_of_parallel_runs
-                step = self.num_of_parallel_runs
-            run_script = self.write_run_script(num_procs, step,
-                                               procs_pnode, TpN, screenout,
-                                               num_writers)
-            self.write_prep_script(5)
-            for i in xrange(0, step):
-                # generate the Manning's n field
-                r_field = tmm.combine_basis_vectors(mann_points[..., i+k],
-                                                    bv_dict, default,
-                                                    data.node_num)
+        bathymetry = data.array_bathymetry()
+
+        def write_inputs(batch, slots):
+            # generate the Manning's n fields
+            r_fields = tmm.combine_basis_vectors_batch(\
+                    mann_points[..., batch], bv_dict, default,
+                    data.node_num)
+            for i, slot in enumerate(slots):
                 # create the fort.13 for r_field
-                data.update_mann(r_field, self.rf_dirs[i])
-            # do a batch run of python
-            #PARALLEL: update file containing the list of rf_dirs
-            self.update_dir_file(self.num_of_parallel_runs)
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./prep_5.sh'], stdout=devnull,
-                                 cwd=self.save_dir) 
-            p.communicate()
-            devnull.close()
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./'+run_script], stdout=devnull,
-                                 cwd=self.base_dir) 
-            p.communicate()
-            devnull.close()
-            # get data
-            for i, kk in enumerate(range(k, stop)):
-                output.get_data_nts(i, self.rf_dirs[i], data, self.nts_data,
-                                    ["maxele.63"])
+                mann_template.write(r_fields[:, i], self.rf_dirs[slot])
+
+        def ingest(batch, slots):
+            # get data, the columns of maxele63 are the slots
+            self.get_batch_data(data, slots, [], ["maxele.63"], slots)
             # fix dry nodes and interpolate to obtain QoI
-            self.fix_dry_nodes_nts(data)
-            for i, kk in enumerate(range(k, stop)):
-                values = self.nts_data["maxele63"][:, i]
+            for slot, kk in zip(slots, batch):
+                values = output.fix_dry(self.nts_data["maxele63"][:, slot],
+                                        bathymetry)
                 Q[kk, :] = griddata(points, values, xi)
             # Update and save
             self.update_mdict(mdict)
-            self.save(mdict, save_file)
-            if num_points <= self.num_of_parallel_runs:
-                pass
-            elif (k+1)%(num_points/self.num_of_parallel_runs) == 0:
-                msg = str(k+1)+" of "+str(num_points)
-                print msg+" runs have been completed."
+            self.save(mdict, save_file, slice(batch[0], batch[-1]+1))
+
+        self.run_samples(run_catalog.pending(), write_inputs, ingest,
+                         run_catalog, num_procs, procs_pnode, TpN, screenout,
+                         num_writers)
 
         # save data
         self.update_mdict(mdict)
         self.save(mdict, save_file)
+        self.close_catalog(run_catalog, save_file)
 
         return Q 
 
@@ -5,17 +5,17 @@ This module contains functions to pull data from ADCIRC output files and the
 :class:`runSet` which controls the running of ADCIRC simulations within a set
 of processors allocated by the submission script
 """
-import glob, os, subprocess, shutil 
+import os, subprocess
 import numpy as np
-import scipy.io as sio
 import polyadcirc.pyADCIRC.fort13_management as f13
 import polyadcirc.pyADCIRC.fort14_management as f14
 import polyadcirc.run_framework.random_manningsn as rmn
 import polyadcirc.pyGriddata.table_to_mesh_map as tmm
 import polyadcirc.pyADCIRC.plotADCIRC as plot
-import polyadcirc.pyADCIRC.output as output
+import polyadcirc.run_framework.store_management as store
 
-def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
+def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir, lazy=False,
+            samples=None, nodes=None):
     """
     Loads data from ``save_file`` into a
     :class:`~polyadcirc.run_framework.random_manningsn.runSet` object.
@@ -30,6 +30,13 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
     :param string basis_dir: directory where ``landuse_*`` folders are located
     :param string base_dir: directory that contains ADCIRC executables, and
         machine specific ``in.prep#`` files 
+    :param bool lazy: flag whether to read (and fix) the data of each file
+        when it is first accessed, see
+        :meth:`~polyadcirc.run_framework.random_manningsn.loadmat`
+    :param samples: slice, positions, or boolean mask of the runs to load,
+        only used if ``lazy``
+    :param nodes: slice, positions, or boolean mask of the nodes to load
+        from global (not station) files, only used if ``lazy``
     
     :rtype: tuple of :class:`~polyadcirc.run_framework.random_wall.runSet`,
         :class:`~polyadcirc.run_framework.random_manningsn.domain` objects, and
@@ -38,15 +45,19 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
 
     """
     main_run, domain, mann_pts = rmn.loadmat(save_file, base_dir, grid_dir,
-                                             save_dir, basis_dir)
+                                             save_dir, basis_dir, lazy,
+                                             samples, nodes)
     
-       # load the data from at *.mat file
-    mdat = sio.loadmat(os.path.join(save_dir, save_file))
+    # load the data from a result store or *.mat file
+    mdat = store.loadmat(os.path.join(save_dir, save_file),
+                         ['wall_pts', 'points'])
     if mdat.has_key('wall_pts'):
         wall_pts = mdat['wall_pts']
     else:
         wall_pts = None
     points = mdat['points']
+    if lazy:
+        points = store.select(points, [(-1, samples)])
     
     return (main_run, domain, mann_pts, wall_pts, points)
 
@@ -89,7 +100,8 @@ class runSet(rmn.runSet):
     def run_points(self, data, wall_points, mann_points, save_file, 
                    num_procs=12, procs_pnode=12, ts_names=["fort.61"],
                    nts_names=["maxele.63"], screenout=True, s_p_wall=
-                   None, num_writers=None, TpN=None):
+                   None, num_writers=None, TpN=None, nodes=None, window=None,
+                   stride=None, resume=False):
         """
         
         Runs :program:`ADCIRC` for all of the configurations specified by
@@ -125,12 +137,25 @@ class runSet(rmn.runSet):
         :param list ts_names: names of ADCIRC timeseries
             output files to be recorded from each run
         :param list nts_names: names of ADCIRC non timeseries
-            output files to be recorded from each run
+            output files or online reductions (see
+            :data:`~polyadcirc.pyADCIRC.output.reductions`) to be recorded
+            from each run
         :param bool screenout: flag (True --  write ``ADCIRC`` output to
             screen, False -- write ``ADCIRC`` output to temp file
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files. This MUST be less than num_procs.
         :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param nodes: positions (zero based) of the nodes to record from
+            global timeseries output files or a boolean mask, see
+            :meth:`~polyadcirc.run_framework.domain.domain.nodes_in_polygon`
+        :param tuple window: (t0, t1) times of the records to record from
+            timeseries output files
+        :param int stride: record every ``stride`` record of timeseries
+            output files
+        :param bool resume: flag whether to resume a previous call with the
+            same points and ``save_file`` that was interrupted and only run
+            the samples that were not completed, see
+            :meth:`~polyadcirc.run_framework.random_manningsn.runSet.open_catalog`
         
         :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`,
             :class:`numpy.ndarray`) 
@@ -140,126 +165,100 @@ class runSet(rmn.runSet):
         if TpN is None:
             TpN = procs_pnode
         # setup and save to shelf
-        # set up saving
-        if glob.glob(os.path.join(self.save_dir, save_file)):
-            os.remove(os.path.join(self.save_dir, save_file))
-
-        # Save matricies to *.mat file for use by MATLAB or Python
-        mdict = dict()
-        mdict['mann_pts'] = mann_points 
-        mdict['wall_pts'] = wall_points 
- 
-        self.save(mdict, save_file)
-
-        #bv_array = tmm.get_basis_vec_array(self.basis_dir)
-        bv_dict = tmm.get_basis_vectors(self.basis_dir)
-
-        # Pre-allocate arrays for various data files
         num_points = mann_points.shape[1]
         num_walls = wall_points.shape[1]
         if s_p_wall == None:
             s_p_wall = num_points/num_walls*np.ones(num_walls, dtype=int)
-       
         # store the wall points with the mann_points as points
-        mdict['points'] = np.vstack((np.repeat(wall_points, s_p_wall, 1),
-                                     mann_points))
-
-        # Pre-allocate arrays for non-timeseries data
-        nts_data = {}
-        self.nts_data = nts_data
-        for fid in nts_names:
-            key = fid.replace('.', '')
-            nts_data[key] = np.zeros((data.node_num, num_points))        
-        # Pre-allocate arrays for timeseries data
-        ts_data = {}
-        time_obs = {}
-        self.ts_data = ts_data
-        self.time_obs = time_obs
-        for fid in ts_names:
-            key = fid.replace('.', '')
-            meas_locs, total_obs, irtype = data.recording[key]
-            if irtype == 1:
-                ts_data[key] = np.zeros((meas_locs, total_obs, num_points))
-            else:
-                ts_data[key] = np.zeros((meas_locs, total_obs,
-                                         irtype, num_points))
-            time_obs[key] = np.zeros((total_obs,))
+        points = np.vstack((np.repeat(wall_points, s_p_wall, 1),
+                            mann_points))
+
+        # set up saving and the run catalog
+        run_catalog, resumed = self.open_catalog(save_file, points, resume,
+                                                 backup=False)
+
+        if resumed:
+            mdict = self.resume_save_file(save_file, ts_names, nts_names)
+        else:
+            # Save matricies to *.mat file for use by MATLAB or Python
+            mdict = dict()
+            mdict['mann_pts'] = mann_points 
+            mdict['wall_pts'] = wall_points 
+            self.save(mdict, save_file)
+            mdict['points'] = points
+
+            # Pre-allocate arrays for non-timeseries data
+            self.nts_data = {}
+            for fid in nts_names:
+                key = fid.replace('.', '')
+                self.nts_data[key] = self.allocate(key, (data.node_num,
+                                                         num_points),
+                                                   save_file)
+            # Pre-allocate arrays for timeseries data
+            self.preallocate_ts(data, ts_names, num_points, nodes, window,
+                                stride, save_file)
 
-        # Update and save
-        self.update_mdict(mdict)
-        self.save(mdict, save_file)
+            # Update and save
+            self.update_mdict(mdict)
+            self.save(mdict, save_file)
+        ts_data = self.ts_data
+        nts_data = self.nts_data
+        time_obs = self.time_obs
 
+        #bv_array = tmm.get_basis_vec_array(self.basis_dir)
+        bv_dict = tmm.get_basis_vectors(self.basis_dir)
         default = data.read_default(path=self.save_dir)
+        mann_template = f13.fort13_template(os.path.join(self.save_dir,
+                                                         'fort.13'))
+
+        def write_inputs(batch, slots):
+            # generate the Manning's n fields
+            r_fields = tmm.combine_basis_vectors_batch(\
+                    mann_points[..., batch], bv_dict, default,
+                    data.node_num)
+            for i, slot in enumerate(slots):
+                # create the fort.13 for r_field
+                mann_template.write(r_fields[:, i], self.rf_dirs[slot])
+
+        def ingest(batch, slots):
+            # get data
+            self.get_batch_data(data, batch, ts_names, nts_names, slots,
+                                nodes=nodes, window=window, stride=stride)
+            # Update and save
+            self.update_mdict(mdict)
+            self.save(mdict, save_file, slice(batch[0], batch[-1]+1))
 
+        pending = run_catalog.pending()
         for w in xrange(num_walls):
+            wall_samples = [i for i in pending if sum(s_p_wall[:w]) <= i < \
+                            sum(s_p_wall[:w+1])]
+            if not wall_samples:
+                continue
             # set walls
             wall_dim = wall_points[..., w]
             data.read_spatial_grid()
             data.add_wall(wall_dim[:4], wall_dim[-1])
             # update wall and prep all
-            for rf_dir in self.rf_dirs:
-                os.remove(os.path.join(rf_dir, 'fort.14'))
-                shutil.copy(os.path.join(self.grid_dir, 'fort.14'), rf_dir)
-                f14.update(data, path=rf_dir)
-            #PARALLEL: update file containing the list of rf_dirs
-            self.update_dir_file(self.num_of_parallel_runs)
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./prep_2.sh'], stdout=devnull,
-                                 cwd=self.save_dir) 
-            p.communicate()
-            devnull.close()
-            for k in xrange(sum(s_p_wall[:w]), sum(s_p_wall[:w+1]),
-                            self.num_of_parallel_runs): 
-                if k+self.num_of_parallel_runs >= num_points:
-                    stop = num_points
-                    step = stop-k
-                else:
-                    stop = k+self.num_of_parallel_runs
-                    step = self.num_of_parallel_runs
-                run_script = self.write_run_script(num_procs, step,
-                                                   procs_pnode, TpN, screenout,
-                                                   num_writers)
-                self.write_prep_script(5)
-                for i in xrange(0, step):
-                    # generate the Manning's n field
-                    r_field = tmm.combine_basis_vectors(mann_points[..., i+k],
-                                                        bv_dict, default,
-                                                        data.node_num)
-                    # create the fort.13 for r_field
-                    f13.update_mann(r_field, self.rf_dirs[i])
-                # do a batch run of python
-                #PARALLEL: update file containing the list of rf_dirs
-                self.update_dir_file(self.num_of_parallel_runs)
-                devnull = open(os.devnull, 'w')
-                p = subprocess.Popen(['./prep_5.sh'], stdout=devnull,
-                                     cwd=self.save_dir) 
-                p.communicate()
-                devnull.close()
-                devnull = open(os.devnull, 'w')
-                p = subprocess.Popen(['./'+run_script], stdout=subprocess.PIPE,
-                                     cwd=self.base_dir) 
-                p.communicate()
-                devnull.close()
-                # get data
-                for i, kk in enumerate(range(k, stop)):
-                    output.get_data_ts(kk, self.rf_dirs[i], self.ts_data,
-                                       time_obs, ts_names)
-                    output.get_data_nts(kk, self.rf_dirs[i], data,
-                                        self.nts_data, nts_names)
-                # Update and save
-                self.update_mdict(mdict)
-                self.save(mdict, save_file)
+            f14.update_many(data, self.rf_dirs,
+                            template=os.path.join(self.grid_dir, 'fort.14'))
+            self.prep_slots(range(len(self.rf_dirs)), 2)
+            # runs with this wall
+            self.run_samples(wall_samples, write_inputs, ingest, run_catalog,
+                             num_procs, procs_pnode, TpN, screenout,
+                             num_writers)
 
         # save data
         self.update_mdict(mdict)
         self.save(mdict, save_file)
+        self.close_catalog(run_catalog, save_file)
 
         return time_obs, ts_data, nts_data
 
     def run_nobatch(self, data, wall_points, mann_points, save_file, 
                     num_procs=12, procs_pnode=12, ts_names=["fort.61"],
                     nts_names=["maxele.63"], screenout=True,
-                    num_writers=None, TpN=None):
+                    num_writers=None, TpN=None, nodes=None, window=None,
+                    stride=None):
         """
         Runs :program:`ADCIRC` for all of the configurations specified by
         ``wall_points`` and ``mann_points`` and returns a dictonary of arrays
@@ -292,12 +291,21 @@ class runSet(rmn.runSet):
         :param list ts_names: names of ADCIRC timeseries
             output files to be recorded from each run
         :param list nts_names: names of ADCIRC non timeseries
-            output files to be recorded from each run
+            output files or online reductions (see
+            :data:`~polyadcirc.pyADCIRC.output.reductions`) to be recorded
+            from each run
         :param bool screenout: flag (True --  write ``ADCIRC`` output to
             screen, False -- write ``ADCIRC`` output to temp file
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files. This MUST be less than num_procs
         :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param nodes: positions (zero based) of the nodes to record from
+            global timeseries output files or a boolean mask, see
+            :meth:`~polyadcirc.run_framework.domain.domain.nodes_in_polygon`
+        :param tuple window: (t0, t1) times of the records to record from
+            timeseries output files
+        :param int stride: record every ``stride`` record of timeseries
+            output files
         
         :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`)
         :returns: (``time_obs``, ``ts_data``, ``nts_data``)
@@ -307,8 +315,7 @@ class runSet(rmn.runSet):
             TpN = procs_pnode
         # setup and save to shelf
         # set up saving
-        if glob.glob(os.path.join(self.save_dir, save_file)):
-            os.remove(os.path.join(self.save_dir, save_file))
+        self.clear_save_file(save_file, backup=False)
 
         # Save matricies to *.mat file for use by MATLAB or Python
         mdict = dict()
@@ -335,27 +342,21 @@ class runSet(rmn.runSet):
         self.nts_data = nts_data
         for fid in nts_names:
             key = fid.replace('.', '')
-            nts_data[key] = np.zeros((data.node_num, num_points))        
+            nts_data[key] = self.allocate(key, (data.node_num, num_points),
+                                          save_file)
         # Pre-allocate arrays for timeseries data
-        ts_data = {}
-        time_obs = {}
-        self.ts_data = ts_data
-        self.time_obs = time_obs
-        for fid in ts_names:
-            key = fid.replace('.', '')
-            meas_locs, total_obs, irtype = data.recording[key]
-            if irtype == 1:
-                ts_data[key] = np.zeros((meas_locs, total_obs, num_points))
-            else:
-                ts_data[key] = np.zeros((meas_locs, total_obs,
-                                         irtype, num_points))
-            time_obs[key] = np.zeros((total_obs,))
+        self.preallocate_ts(data, ts_names, num_points, nodes, window, stride,
+                            save_file)
+        ts_data = self.ts_data
+        time_obs = self.time_obs
 
         # Update and save
         self.update_mdict(mdict)
         self.save(mdict, save_file)
 
         default = data.read_default(path=self.save_dir)
+        mann_template = f13.fort13_template(os.path.join(self.save_dir,
+                                                         'fort.13'))
 
         for k in xrange(0, num_points, self.num_of_parallel_runs):
             if k+self.num_of_parallel_runs >= num_points:
@@ -373,10 +374,8 @@ class runSet(rmn.runSet):
             data.read_spatial_grid()
             data.add_wall(wall_dim[:4], wall_dim[-1])
             # update wall and prep all
-            for rf_dir in self.rf_dirs:
-                os.remove(os.path.join(rf_dir, 'fort.14'))
-                shutil.copy(os.path.join(self.grid_dir, 'fort.14'), rf_dir)
-                f14.update(data, path=rf_dir)
+            f14.update_many(data, self.rf_dirs,
+                            template=os.path.join(self.grid_dir, 'fort.14'))
             #PARALLEL: update file containing the list of rf_dirs
             self.update_dir_file(self.num_of_parallel_runs)
             devnull = open(os.devnull, 'w')
@@ -384,13 +383,13 @@ class runSet(rmn.runSet):
                                  cwd=self.save_dir) 
             p.communicate()
             devnull.close()
+            # generate the Manning's n fields
+            r_fields = tmm.combine_basis_vectors_batch(\
+                    mann_points[..., k:k+step], bv_dict, default,
+                    data.node_num)
             for i in xrange(0, step):
-                # generate the Manning's n field
-                r_field = tmm.combine_basis_vectors(mann_points[..., i+k], 
-                                                    bv_dict,
-                                                    default, data.node_num)
                 # create the fort.13 for r_field
-                f13.update_mann(r_field, self.rf_dirs[i])
+                mann_template.write(r_fields[:, i], self.rf_dirs[i])
             # do a batch run of python
             #PARALLEL: update file containing the list of rf_dirs
             self.update_dir_file(self.num_of_parallel_runs)
@@ -405,14 +404,11 @@ class runSet(rmn.runSet):
             p.communicate()
             devnull.close()
             # get data
-            for i, kk in enumerate(range(k, stop)):
-                output.get_data_ts(kk, self.rf_dirs[i], self.ts_data, time_obs,
-                                   ts_names)
-                output.get_data_nts(kk, self.rf_dirs[i], data, self.nts_data,
-                                    nts_names)
+            self.get_batch_data(data, range(k, stop), ts_names, nts_names,
+                                nodes=nodes, window=window, stride=stride)
             # Update and save
             self.update_mdict(mdict)
-            self.save(mdict, save_file)
+            self.save(mdict, save_file, slice(k, stop))
 
         # save data
         self.update_mdict(mdict)
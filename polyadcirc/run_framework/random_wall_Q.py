@@ -5,17 +5,19 @@ This module contains functions to pull data from ADCIRC output files and the
 :class:`runSet` which controls the running of ADCIRC simulations within a set
 of processors allocated by the submission script
 """
-import glob, os, subprocess, shutil 
-import scipy.io as sio
+import os
 from scipy.interpolate import griddata
 import numpy as np
+import polyadcirc.pyADCIRC.fort13_management as f13
 import polyadcirc.pyADCIRC.fort14_management as f14
+import polyadcirc.pyADCIRC.output as output
 import polyadcirc.run_framework.random_wall as rmw
 import polyadcirc.pyGriddata.table_to_mesh_map as tmm
-import polyadcirc.pyADCIRC.output as output
 import polyadcirc.run_framework.random_manningsn as rmn
+import polyadcirc.run_framework.store_management as store
 
-def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
+def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir, lazy=False,
+            samples=None, nodes=None):
     """
     Loads data from ``save_file`` into a
     :class:`~polyadcirc.run_framework.random_manningsn.runSet` object.
@@ -30,6 +32,13 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
     :param string basis_dir: directory where ``landuse_*`` folders are located
     :param string base_dir: directory that contains ADCIRC executables, and
         machine specific ``in.prep#`` files 
+    :param bool lazy: flag whether to read (and fix) the data of each file
+        when it is first accessed, see
+        :meth:`~polyadcirc.run_framework.random_manningsn.loadmat`
+    :param samples: slice, positions, or boolean mask of the runs to load,
+        only used if ``lazy``
+    :param nodes: slice, positions, or boolean mask of the nodes to load
+        from global (not station) files, only used if ``lazy``
     
     :rtype: tuple of :class:`~polyadcirc.run_framework.random_wall.runSet`,
         :class:`~polyadcirc.run_framework.random_manningsn.domain` objects, and
@@ -38,16 +47,21 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
 
     """
     main_run, domain, mann_pts = rmn.loadmat(save_file, base_dir, grid_dir,
-                                             save_dir, basis_dir)
+                                             save_dir, basis_dir, lazy,
+                                             samples, nodes)
     
-       # load the data from at *.mat file
-    mdat = sio.loadmat(os.path.join(save_dir, save_file))
+    # load the data from a result store or *.mat file
+    mdat = store.loadmat(os.path.join(save_dir, save_file),
+                         ['wall_pts', 'Q', 'points'])
     if mdat.has_key('wall_pts'):
         wall_pts = mdat['wall_pts']
     else:
         wall_pts = None
     Q = mdat['Q']
     points = mdat['points']
+    if lazy:
+        Q = store.select(Q, [(0, samples)])
+        points = store.select(points, [(-1, samples)])
     
     return (main_run, domain, mann_pts, wall_pts, points, Q)
 
@@ -85,6 +99,8 @@ class runSet(rmw.runSet):
         super(runSet, self).__init__(grid_dir, save_dir, basis_dir, 
                                      num_of_parallel_runs, base_dir,
                                      script_name)
+        # Q has one row per run
+        self.sample_axes['Q'] = 0
 
     def update_mdict(self, mdict):
         """
@@ -99,13 +115,15 @@ class runSet(rmw.runSet):
             
     def run_nobatch_q(self, data, wall_points, mann_points, save_file, 
                       num_procs=12, procs_pnode=12, stations=None,
-                      screenout=True, num_writers=None, TpN=None):
+                      screenout=True, num_writers=None, TpN=None,
+                      resume=False):
         """
         Runs :program:`ADCIRC` for all of the configurations specified by
         ``wall_points`` and ``mann_points`` and returns a dictonary of arrays
         containing data from output files. Runs batches of :program:`PADCIRC`
-        as a single for loop and preps both the ``fort.13`` and ``fort.14`` in
-        the same step.
+        as a single for loop and preps both the ``fort.13`` and ``fort.14`` of
+        each run in the same step. The runs are scheduled by
+        :attr:`~polyadcirc.run_framework.random_manningsn.runSet.schedule`.
         
         Stores only the QoI at the stations defined in `stations``. In this
         case the QoI is the ``maxele63`` at the designated station. 
@@ -139,6 +157,10 @@ class runSet(rmw.runSet):
         :param int num_writers: number of MPI processes to dedicate soley to
             the task of writing ascii files. This MUST be less than num_procs
         :param int TpN: number of tasks (cores to use) per node (wayness)
+        :param bool resume: flag whether to resume a previous call with the
+            same ``wall_points``, ``mann_points``, and ``save_file`` that was
+            interrupted and only run the samples that were not completed, see
+            :meth:`~polyadcirc.run_framework.random_manningsn.runSet.open_catalog`
         
         :rtype: (:class:`numpy.ndarray`, :class:`numpy.ndarray`, :class:`numpy.ndarray`)
         :returns: (``time_obs``, ``ts_data``, ``nts_data``)
@@ -147,42 +169,41 @@ class runSet(rmw.runSet):
         if TpN is None:
             TpN = procs_pnode
         # setup and save to shelf
-        # set up saving
-        if glob.glob(os.path.join(self.save_dir, save_file)):
-            os.remove(os.path.join(self.save_dir, save_file))
-
-        # Save matricies to *.mat file for use by MATLAB or Python
-        mdict = dict()
-        mdict['mann_pts'] = mann_points 
-        mdict['wall_pts'] = wall_points 
- 
-        self.save(mdict, save_file)
-
-        #bv_array = tmm.get_basis_vec_array(self.basis_dir)
-        bv_dict = tmm.get_basis_vectors(self.basis_dir)
-
-        # Pre-allocate arrays for various data files
         num_points = mann_points.shape[1]
         num_walls = wall_points.shape[1]
         if num_walls != num_points:
             print "Error: num_walls != num_points"
             quit()
-
         # store the wall points with the mann_points as points
-        mdict['points'] = np.vstack((wall_points, mann_points))
+        run_points = np.vstack((wall_points, mann_points))
+
+        # set up saving and the run catalog
+        run_catalog, resumed = self.open_catalog(save_file, run_points,
+                                                 resume, backup=False)
 
         # Pre-allocate arrays for non-timeseries data
         nts_data = {}
-        self.nts_data = nts_data
         nts_data['maxele63'] = np.empty((data.node_num,
-                                         self.num_of_parallel_runs))        
+                                         self.num_of_rf_dirs()))        
         
         # Pre-allocate arrays for QoI data
         if stations == None:
             stations = data.stations['fort61']
         xi = np.array([[s.x, s.y] for s in stations])
         points = np.column_stack((data.array_x(), data.array_y()))
-        Q = np.empty((num_points, xi.shape[0]))
+
+        if resumed:
+            mdict = self.resume_save_file(save_file, [], [])
+            Q = mdict['Q']
+        else:
+            # Save matricies to *.mat file for use by MATLAB or Python
+            mdict = dict()
+            mdict['mann_pts'] = mann_points 
+            mdict['wall_pts'] = wall_points 
+            self.save(mdict, save_file)
+            Q = np.empty((num_points, xi.shape[0]))
+        mdict['points'] = run_points
+        self.nts_data = nts_data
         self.Q = Q
         mdict['Q'] = Q
 
@@ -190,76 +211,53 @@ class runSet(rmw.runSet):
         self.update_mdict(mdict)
         self.save(mdict, save_file)
 
+        #bv_array = tmm.get_basis_vec_array(self.basis_dir)
+        bv_dict = tmm.get_basis_vectors(self.basis_dir)
         default = data.read_default(path=self.save_dir)
+        mann_template = f13.fort13_template(os.path.join(self.save_dir,
+                                                         'fort.13'))
+        # bathymetry with the wall of the run in each slot
+        slot_bathymetry = {}
 
-        for k in xrange(0, num_points, self.num_of_parallel_runs):
-            if k+self.num_of_parallel_runs >= num_points:
-                stop = num_points
-                step = stop-k
-            else:
-                stop = k+self.num_of_parallel_runs
-                step = self.num_of_parallel_runs
-            run_script = self.write_run_script(num_procs, step,
-                                               procs_pnode, TpN, screenout,
-                                               num_writers)
-            self.write_prep_script(5)
-            # set walls
-            wall_dim = wall_points[..., k]
-            data.read_spatial_grid()
-            data.add_wall(wall_dim[:4], wall_dim[-1])
-            # update wall and prep all
-            for rf_dir in self.rf_dirs:
-                os.remove(os.path.join(rf_dir, 'fort.14'))
-                shutil.copy(os.path.join(self.grid_dir, 'fort.14'), rf_dir)
-                f14.update(data, path=rf_dir)
-            #PARALLEL: update file containing the list of rf_dirs
-            self.update_dir_file(self.num_of_parallel_runs)
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./prep_2.sh'], stdout=devnull,
-                                 cwd=self.save_dir) 
-            p.communicate()
-            devnull.close()
-            for i in xrange(0, step):
-                # generate the Manning's n field
-                r_field = tmm.combine_basis_vectors(mann_points[..., i+k],
-                                                    bv_dict, default,
-                                                    data.node_num)
+        def write_inputs(batch, slots):
+            # set the wall of each run and prep the fort.14
+            for slot, kk in zip(slots, batch):
+                wall_dim = wall_points[..., kk]
+                data.read_spatial_grid()
+                data.add_wall(wall_dim[:4], wall_dim[-1])
+                slot_bathymetry[slot] = np.array(data.array_bathymetry())
+                f14.update_many(data, [self.rf_dirs[slot]],
+                                template=os.path.join(self.grid_dir,
+                                                      'fort.14'))
+            self.prep_slots(slots, 2)
+            # generate the Manning's n fields
+            r_fields = tmm.combine_basis_vectors_batch(\
+                    mann_points[..., batch], bv_dict, default,
+                    data.node_num)
+            for i, slot in enumerate(slots):
                 # create the fort.13 for r_field
-                data.update_mann(r_field, self.rf_dirs[i])
-            # do a batch run of python
-            #PARALLEL: update file containing the list of rf_dirs
-            self.update_dir_file(self.num_of_parallel_runs)
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./prep_5.sh'], stdout=devnull,
-                                 cwd=self.save_dir) 
-            p.communicate()
-            devnull.close()
-            devnull = open(os.devnull, 'w')
-            p = subprocess.Popen(['./'+run_script], stdout=devnull,
-                                 cwd=self.base_dir) 
-            p.communicate()
-            devnull.close()
-            # get data
-            for i, kk in enumerate(range(k, stop)):
-                output.get_data_nts(i, self.rf_dirs[i], data, self.nts_data,
-                                    ["maxele.63"])
+                mann_template.write(r_fields[:, i], self.rf_dirs[slot])
+
+        def ingest(batch, slots):
+            # get data, the columns of maxele63 are the slots
+            self.get_batch_data(data, slots, [], ["maxele.63"], slots)
             # fix dry nodes and interpolate to obtain QoI
-            self.fix_dry_nodes_nts(data)
-            for i, kk in enumerate(range(k, stop)):
-                values = self.nts_data["maxele63"][:, i]
+            for slot, kk in zip(slots, batch):
+                values = output.fix_dry(self.nts_data["maxele63"][:, slot],
+                                        slot_bathymetry[slot])
                 Q[kk, :] = griddata(points, values, xi)
             # Update and save
             self.update_mdict(mdict)
-            self.save(mdict, save_file)
-            if num_points <= self.num_of_parallel_runs:
-                pass
-            elif (k+1)%(num_points/self.num_of_parallel_runs) == 0:
-                msg = str(k+1)+" of "+str(num_points)
-                print msg+" runs have been completed."
+            self.save(mdict, save_file, slice(batch[0], batch[-1]+1))
+
+        self.run_samples(run_catalog.pending(), write_inputs, ingest,
+                         run_catalog, num_procs, procs_pnode, TpN, screenout,
+                         num_writers)
 
         # save data
         self.update_mdict(mdict)
         self.save(mdict, save_file)
+        self.close_catalog(run_catalog, save_file)
 
         return Q 
 
@@ -0,0 +1,83 @@
+# Copyright (C) 2013 Lindley Graham
+
+"""
+This module, :mod:`~polyadcirc.run_framework.scheduler_management`, schedules
+the runs (samples) of a set of runs onto a fixed number of slots (the
+``RF_directory_*`` and the processors of one :program:`PADCIRC` run). Unlike a
+batch of runs, where every run in the batch waits for the slowest run, each
+slot is refilled with the next sample as soon as the run in the slot exits.
+"""
+
+import time
+from collections import deque
+
+#: time in (s) between checks of the running slots
+poll_interval = 1.0
+
+class slot_scheduler(object):
+    """
+    Runs samples in ``num_slots`` slots. For each sample ``prepare(sample,
+    slot)`` writes the inputs of the sample to the slot, ``launch(slot)``
+    starts the run in the slot and returns its :class:`subprocess.Popen`,
+    and ``ingest(sample, slot, returncode)`` reads the outputs of the slot
+    once the run has exited. A slot is only refilled after its outputs have
+    been ingested.
+    """
+    def __init__(self, num_slots, prepare, launch, ingest):
+        """
+        Initialization
+        """
+        #: int, number of slots
+        self.num_slots = num_slots
+        #: callable, ``prepare(sample, slot)``
+        self.prepare = prepare
+        #: callable, ``launch(slot)`` returns a :class:`subprocess.Popen`
+        self.launch = launch
+        #: callable, ``ingest(sample, slot, returncode)``
+        self.ingest = ingest
+        #: dict, (sample, :class:`subprocess.Popen`) of each running slot
+        self.running = {}
+
+    def fill(self, slot, queue):
+        """
+        Prepare and launch the next sample in ``queue`` in ``slot``.
+
+        :param int slot: free slot
+        :param queue: :class:`collections.deque` of samples
+        :rtype: bool
+        :returns: True if a sample was launched
+
+        """
+        if not queue:
+            return False
+        sample = queue.popleft()
+        self.prepare(sample, slot)
+        self.running[slot] = (sample, self.launch(slot))
+        return True
+
+    def run(self, samples):
+        """
+        Run all of ``samples`` and return once every run has been ingested.
+
+        :param list samples: samples (run numbers) in the order to run them
+        :rtype: list
+        :returns: (sample, returncode) of each run in the order they exited
+
+        """
+        queue = deque(samples)
+        for slot in xrange(self.num_slots):
+            if not self.fill(slot, queue):
+                break
+        exited = []
+        while self.running:
+            done = sorted([slot for slot, (sample, p) in \
+                           self.running.iteritems() if p.poll() is not None])
+            if not done:
+                time.sleep(poll_interval)
+                continue
+            for slot in done:
+                sample, p = self.running.pop(slot)
+                self.ingest(sample, slot, p.returncode)
+                exited.append((sample, p.returncode))
+                self.fill(slot, queue)
+        return exited
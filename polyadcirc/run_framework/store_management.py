@@ -0,0 +1,543 @@
+# Copyright (C) 2013 Lindley Graham
+
+"""
+This module, :mod:`~polyadcirc.run_framework.store_management`, handles the
+reading/writing of result stores. A result store is a directory
+(``save_file.store``) with one ``.npy`` file per key of the run data and a
+JSON manifest (``manifest.json``) of the shape, dtype, and sample axis of
+each key. Unlike a ``*.mat`` file, which must be rewritten (and
+recompressed) in full after every batch of runs, each batch only writes the
+columns (runs) it computed to a store. Stores can be exported to ``*.mat``
+files for use by ``MATLAB BET`` code with :meth:`export_mat`.
+"""
+
+import os, json, shutil, collections
+import numpy as np
+import scipy.io as sio
+import polyadcirc.pyADCIRC.output as output
+
+#: file extension of result stores
+store_ext = '.store'
+#: name of the manifest file in a result store
+manifest_name = 'manifest.json'
+#: sample axis of the keys of ``*.mat`` files whose runs are not along the
+#: last axis (``Q`` has one row per run)
+mat_sample_axes = {'Q': 0}
+
+def store_name(file_name):
+    """
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :rtype: string
+    :returns: path to the result store of ``file_name``
+
+    """
+    if file_name.endswith(store_ext):
+        return file_name
+    if file_name.endswith('.mat'):
+        file_name = file_name[:-len('.mat')]
+    return file_name+store_ext
+
+def is_store(file_name):
+    """
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :rtype: bool
+    :returns: True if the result store of ``file_name`` exists
+
+    """
+    return os.path.exists(os.path.join(store_name(file_name), manifest_name))
+
+def read_manifest(path):
+    """
+    :param string path: path to a result store
+    :rtype: dict
+    :returns: ``{key: {'file': string, 'shape': list, 'dtype': string,
+        'axis': int or None, 'samples': int}}``, ``samples`` is the number of
+        samples (along ``axis``) written to the key, empty if the store does
+        not exist
+
+    """
+    manifest_file = os.path.join(path, manifest_name)
+    if not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, 'r') as fid:
+        return json.load(fid)
+
+def _write_manifest(path, manifest):
+    """
+    Write ``manifest`` to a temporary file and then rename it so that
+    concurrent readers never see a partial manifest.
+
+    :param string path: path to a result store
+    :param dict manifest: manifest of the store, see :meth:`read_manifest`
+
+    """
+    manifest_file = os.path.join(path, manifest_name)
+    tmp_file = manifest_file+'.'+str(os.getpid())+'.tmp'
+    with open(tmp_file, 'w') as fid:
+        json.dump(manifest, fid, indent=1, sort_keys=True)
+    os.rename(tmp_file, manifest_file)
+
+def _entry(key, value, axis):
+    """
+    :param string key: key
+    :param value: :class:`numpy.ndarray`
+    :type axis: int or None
+    :param axis: sample axis of ``value``
+    :rtype: dict
+    :returns: manifest entry of ``key``
+
+    """
+    return {'file':key+'.npy', 'shape':list(value.shape),
+            'dtype':value.dtype.str, 'axis':axis,
+            'samples':value.shape[axis] if axis is not None else 0}
+
+def write_key(path, key, value, axis=-1):
+    """
+    Write all of ``value`` to the ``.npy`` file of ``key`` in the result
+    store. Arrays with less than two dimensions are not given a sample axis.
+
+    :param string path: path to a result store
+    :param string key: key
+    :param value: :class:`numpy.ndarray`
+    :type axis: int or None
+    :param axis: sample axis of ``value``
+    :rtype: dict
+    :returns: manifest entry of ``key``
+
+    """
+    value = np.asanyarray(value)
+    if value.ndim < 2:
+        axis = None
+    elif axis is not None:
+        axis = axis % value.ndim
+    npy_file = os.path.join(path, key+'.npy')
+    tmp_file = npy_file+'.'+str(os.getpid())+'.tmp'
+    with open(tmp_file, 'wb') as fid:
+        np.save(fid, value)
+    os.rename(tmp_file, npy_file)
+    return _entry(key, value, axis)
+
+def write_samples(path, key, value, samples, entry):
+    """
+    Write the samples ``samples`` (along the sample axis) of ``value`` to the
+    ``.npy`` file of ``key`` in the result store in place. Only the pages of
+    the file that contain these samples are written.
+
+    :param string path: path to a result store
+    :param string key: key
+    :param value: :class:`numpy.ndarray` with the shape and dtype in
+        ``entry``
+    :param slice samples: samples to write
+    :param dict entry: manifest entry of ``key``
+    :rtype: dict
+    :returns: updated manifest entry of ``key``
+
+    """
+    index = [slice(None)]*value.ndim
+    index[entry['axis']] = samples
+    index = tuple(index)
+    npy = np.lib.format.open_memmap(os.path.join(path, entry['file']),
+                                    mode='r+')
+    npy[index] = value[index]
+    npy.flush()
+    del npy
+    entry['samples'] = max(entry['samples'], samples.stop)
+    return entry
+
+def allocate(file_name, key, shape, dtype=float, axis=-1):
+    """
+    Create a zero filled ``.npy`` file for ``key`` in the result store of
+    ``file_name`` and memory-map it. Saving the returned array to the same
+    store with :meth:`save` only flushes it to disk.
+
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :param string key: key
+    :param tuple shape: shape of the array
+    :param dtype: data type of the array
+    :type axis: int or None
+    :param axis: sample axis of the array
+    :rtype: :class:`numpy.memmap`
+    :returns: memory-mapped array
+
+    """
+    path = store_name(file_name)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    value = np.lib.format.open_memmap(os.path.join(path, key+'.npy'),
+                                      mode='w+', dtype=dtype, shape=shape)
+    if value.ndim < 2:
+        axis = None
+    elif axis is not None:
+        axis = axis % value.ndim
+    manifest = read_manifest(path)
+    manifest[key] = _entry(key, value, axis)
+    manifest[key]['samples'] = 0
+    _write_manifest(path, manifest)
+    return value
+
+def _is_mapped(path, entry, value):
+    """
+    :param string path: path to a result store
+    :type entry: dict or None
+    :param entry: manifest entry
+    :param value: :class:`numpy.ndarray`
+    :rtype: bool
+    :returns: True if ``value`` is the memory-mapped ``.npy`` file of
+        ``entry``, see :meth:`allocate`
+
+    """
+    if entry is None or getattr(value, 'filename', None) is None:
+        return False
+    return list(value.shape) == entry['shape'] and \
+            os.path.abspath(value.filename) == \
+            os.path.abspath(os.path.join(path, entry['file']))
+
+def _matches(entry, value):
+    """
+    :param dict entry: manifest entry
+    :param value: :class:`numpy.ndarray`
+    :rtype: bool
+    :returns: True if ``value`` has the shape and dtype in ``entry``
+
+    """
+    return entry['axis'] is not None and \
+            list(value.shape) == entry['shape'] and \
+            value.dtype.str == entry['dtype']
+
+def save(file_name, mdict, samples=None, axes=None):
+    """
+    Save ``mdict`` to the result store of ``file_name``. If ``samples`` is
+    given only those samples of the keys that are already in the store (with
+    the same shape and dtype) are written, all other keys are written in
+    full. Arrays memory-mapped to the store (see :meth:`allocate`) are
+    flushed instead of written.
+
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :param dict mdict: dictonary of run data
+    :type samples: slice or None
+    :param samples: samples (runs) that have changed since the last save, if
+        None all samples are written
+    :type axes: dict or None
+    :param axes: sample axis of each key, defaults to the last axis
+
+    """
+    path = store_name(file_name)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    if axes is None:
+        axes = {}
+    manifest = read_manifest(path)
+    for key, value in mdict.iteritems():
+        value = np.asanyarray(value)
+        entry = manifest.get(key)
+        if _is_mapped(path, entry, value):
+            value.flush()
+            if entry['axis'] is not None:
+                if samples is None:
+                    entry['samples'] = entry['shape'][entry['axis']]
+                else:
+                    entry['samples'] = max(entry['samples'], samples.stop)
+        elif samples is not None and entry is not None and \
+                _matches(entry, value) and \
+                value.shape[entry['axis']] >= samples.stop:
+            manifest[key] = write_samples(path, key, value, samples, entry)
+        else:
+            manifest[key] = write_key(path, key, value, axes.get(key, -1))
+    _write_manifest(path, manifest)
+
+def load(file_name, keys=None, mmap_mode=None):
+    """
+    Load the arrays in the result store of ``file_name``.
+
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :type keys: list or None
+    :param keys: keys to load (keys that are not in the store are skipped),
+        if None all keys are loaded
+    :type mmap_mode: string or None
+    :param mmap_mode: see :meth:`numpy.load`, if not None the arrays are
+        memory-mapped instead of read into memory
+    :rtype: dict
+    :returns: dict of :class:`numpy.ndarray`
+
+    """
+    path = store_name(file_name)
+    manifest = read_manifest(path)
+    if keys is None:
+        keys = manifest.keys()
+    mdat = {}
+    for key in keys:
+        if manifest.has_key(key):
+            mdat[key] = np.load(os.path.join(path, manifest[key]['file']),
+                                mmap_mode=mmap_mode)
+    return mdat
+
+def loadmat(file_name, keys=None, mmap_mode=None):
+    """
+    Load run data from the result store of ``file_name`` if it exists
+    otherwise from the ``*.mat`` file ``file_name``.
+
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :type keys: list or None
+    :param keys: keys to load, if None all keys are loaded
+    :type mmap_mode: string or None
+    :param mmap_mode: see :meth:`load`
+    :rtype: dict
+    :returns: dict of :class:`numpy.ndarray`
+
+    """
+    if is_store(file_name):
+        return load(file_name, keys, mmap_mode)
+    return sio.loadmat(file_name, variable_names=keys)
+
+def shapes(file_name):
+    """
+    Read the shapes of the arrays in the result store of ``file_name`` if it
+    exists otherwise in the ``*.mat`` file ``file_name`` without loading the
+    arrays.
+
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :rtype: dict
+    :returns: shape (tuple) of each key
+
+    """
+    if is_store(file_name):
+        manifest = read_manifest(store_name(file_name))
+        return dict([(k, tuple(v['shape'])) for k, v in \
+                manifest.iteritems()])
+    return dict([(k, shape) for k, shape, _ in sio.whosmat(file_name)])
+
+def select(value, selection):
+    """
+    Select entries of ``value`` along one or more axes.
+
+    :param value: :class:`numpy.ndarray`
+    :param list selection: list of (axis, index) where index is a slice,
+        array of positions, or boolean mask of the entries to select along
+        axis, None indices are ignored
+    :rtype: :class:`numpy.ndarray`
+    :returns: selected entries of ``value``
+
+    """
+    for axis, index in selection:
+        if index is None:
+            continue
+        full = [slice(None)]*value.ndim
+        full[axis] = index
+        value = value[tuple(full)]
+    return value
+
+def sample_axis(file_name, key, shape):
+    """
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :param string key: key
+    :param tuple shape: shape of ``key``
+    :rtype: int or None
+    :returns: sample axis of ``key`` as recorded in the result store of
+        ``file_name``, for ``*.mat`` files the axis in
+        :data:`mat_sample_axes` or the last axis for the arrays that are not
+        observation times (``*_time``)
+
+    """
+    if is_store(file_name):
+        return read_manifest(store_name(file_name))[key]['axis']
+    if mat_sample_axes.has_key(key):
+        return mat_sample_axes[key]
+    if len(shape) < 2 or key.endswith('_time'):
+        return None
+    return len(shape)-1
+
+def merge(file_names, out_file=None, axes=None):
+    """
+    Merge the run data saved to several result stores or ``*.mat`` files
+    (e.g. of the same study run as separate jobs) by concatenating each key
+    along its sample axis. The shapes of the merged arrays are computed from
+    the shapes in the saved files, each merged array is allocated once, and
+    the runs of each file are copied into it one key at a time so that only
+    one key of one file is read into memory at a time. Keys without a sample
+    axis (e.g. observation times) are taken from the first file.
+
+    To merge the runs, ``points``, ``mann_pts``, and ``wall_pts`` of several
+    jobs use::
+
+        merge(['job1/py_save_file', 'job2/py_save_file'], 'py_save_file')
+
+    :param list file_names: paths to ``*.mat`` files (with or without the
+        extension) or result stores
+    :type out_file: string or None
+    :param out_file: path to a ``*.mat`` file or result store, if given the
+        merged arrays are memory-mapped to the result store of ``out_file``
+        (see :meth:`allocate`) otherwise they are kept in memory
+    :type axes: dict or None
+    :param axes: sample axis of each key, defaults to :meth:`sample_axis`
+        of the first file, give the axes of the keys of ``*.mat`` files that
+        are not in :data:`mat_sample_axes` and whose runs are not along the
+        last axis
+    :rtype: dict
+    :returns: dict of merged :class:`numpy.ndarray`
+
+    """
+    if axes is None:
+        axes = {}
+    axes = dict(axes)
+    if out_file is not None:
+        if store_name(out_file) in [store_name(f) for f in file_names]:
+            raise ValueError('out_file must not be one of file_names')
+        remove(out_file)
+    all_shapes = [shapes(f) for f in file_names]
+    merged = {}
+    for key, shape in all_shapes[0].iteritems():
+        first = loadmat(file_names[0], [key], 'r')[key]
+        if axes.has_key(key):
+            axis = axes[key]
+        else:
+            axis = sample_axis(file_names[0], key, shape)
+        if axis is None:
+            axes[key] = None
+            merged[key] = np.array(first)
+            continue
+        axis = axis % len(shape)
+        other = shape[:axis]+shape[axis+1:]
+        sizes = []
+        for file_name, file_shapes in zip(file_names, all_shapes):
+            if not file_shapes.has_key(key) or \
+                    file_shapes[key][:axis]+file_shapes[key][axis+1:] != \
+                    other:
+                raise ValueError('{} of {} does not match {}'.format(key,
+                    file_name, file_names[0]))
+            sizes.append(file_shapes[key][axis])
+        merged_shape = list(shape)
+        merged_shape[axis] = sum(sizes)
+        if out_file is None:
+            value = np.empty(merged_shape, dtype=first.dtype)
+        else:
+            value = allocate(out_file, key, tuple(merged_shape), first.dtype,
+                             axis)
+        index = [slice(None)]*len(shape)
+        start = 0
+        for i, (file_name, size) in enumerate(zip(file_names, sizes)):
+            if i > 0:
+                first = loadmat(file_name, [key], 'r')[key]
+            index[axis] = slice(start, start+size)
+            value[tuple(index)] = first
+            start += size
+        del first
+        merged[key] = value
+    if out_file is not None:
+        save(out_file, merged, axes=axes)
+    return merged
+
+class lazy_data(collections.MutableMapping):
+    """
+    Dictionary of run data arrays that are read from a result store or a
+    ``*.mat`` file when a key is first accessed. Only the selected entries
+    (e.g. runs and nodes) of each key are kept and the dry values of keys
+    with a bathymetry are fixed (see
+    :meth:`~polyadcirc.pyADCIRC.output.fix_dry`) when they are read.
+    Arrays in result stores are memory-mapped so that only the selected
+    entries are read from disk.
+    """
+    def __init__(self, file_name, names, selections=None, bathymetry=None):
+        """
+        Initialization
+        """
+        super(lazy_data, self).__init__()
+        #: string, path to a ``*.mat`` file or a result store
+        self.file_name = file_name
+        #: dict, name in the saved run data of each key
+        self.names = dict(names)
+        if selections is None:
+            selections = {}
+        #: dict, selection of each key, see :meth:`select`
+        self.selections = selections
+        if bathymetry is None:
+            bathymetry = {}
+        #: dict, bathymetry of the nodes (or stations) of the keys whose dry
+        #: values are fixed
+        self.bathymetry = bathymetry
+        #: dict of :class:`numpy.ndarray`, keys that have been read
+        self.loaded = {}
+
+    def _read(self, key):
+        """
+        :param string key: key
+        :rtype: :class:`numpy.ndarray`
+        :returns: selected entries of ``key`` with the dry values fixed
+
+        """
+        name = self.names[key]
+        value = loadmat(self.file_name, [name], 'r')[name]
+        selection = self.selections.get(key, [])
+        value = np.array(select(value, selection))
+        if self.bathymetry.has_key(key):
+            bathymetry = self.bathymetry[key]
+            for axis, index in selection:
+                if axis == 0:
+                    bathymetry = select(bathymetry, [(0, index)])
+            value = output.fix_dry(value, bathymetry)
+        return value
+
+    def __getitem__(self, key):
+        if not self.loaded.has_key(key):
+            if not self.names.has_key(key):
+                raise KeyError(key)
+            self.loaded[key] = self._read(key)
+        return self.loaded[key]
+
+    def __setitem__(self, key, value):
+        self.names.setdefault(key, key)
+        self.loaded[key] = value
+
+    def __delitem__(self, key):
+        del self.names[key]
+        self.loaded.pop(key, None)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def has_key(self, key):
+        """
+        :param string key: key
+        :rtype: bool
+        :returns: True if ``key`` is in the run data
+
+        """
+        return self.names.has_key(key)
+
+def export_mat(file_name, mat_file=None):
+    """
+    Export the result store of ``file_name`` to a ``*.mat`` file for use by
+    ``MATLAB BET`` code.
+
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+    :type mat_file: string or None
+    :param mat_file: path to the ``*.mat`` file, if None then ``file_name``
+        with the ``.store`` extension replaced by ``.mat``
+
+    """
+    if mat_file is None:
+        mat_file = store_name(file_name)[:-len(store_ext)]+'.mat'
+    sio.savemat(mat_file, load(file_name, mmap_mode='r'), do_compression=True)
+
+def remove(file_name):
+    """
+    Remove the result store of ``file_name`` if it exists.
+
+    :param string file_name: path to a ``*.mat`` file (with or without the
+        extension) or a result store
+
+    """
+    path = store_name(file_name)
+    if os.path.exists(path):
+        shutil.rmtree(path)
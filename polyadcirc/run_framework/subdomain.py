@@ -15,11 +15,13 @@ import polyadcirc.pyADCIRC.fort15_management as f15
 import polyadcirc.pyADCIRC.fort13_management as f13
 import polyadcirc.pyADCIRC.output as output
 import polyadcirc.run_framework.random_manningsn as rmn
+import polyadcirc.run_framework.store_management as store
 import polyadcirc.pyADCIRC.post_management as post
 import polyadcirc.pyGriddata.file_management as fm
 from polyadcirc.pyADCIRC.basic import comm
 
-def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
+def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir, lazy=False,
+            samples=None, nodes=None):
     """
     Loads data from ``save_file`` into a
     :class:`~polyadcirc.run_framwork.random_manningsn.runSet` object.
@@ -33,6 +35,13 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
     :param string basis_dir: directory where ``landuse_*`` folders are located
     :param string base_dir: directory that contains ADCIRC executables, and
         machine specific ``in.prep#`` files 
+    :param bool lazy: flag whether to read the data of each file when it is
+        first accessed, see
+        :class:`~polyadcirc.run_framework.store_management.lazy_data`
+    :param samples: slice, positions, or boolean mask of the runs to load,
+        only used if ``lazy``
+    :param nodes: slice, positions, or boolean mask of the nodes to load
+        from global (not station) files, only used if ``lazy``
     :rtype: tuple of :class:`~polyadcirc.run_framwork.random_manningsn.runSet`
         and :class:`~polyadcirc.run_framwork.random_manningsn.domain` objects
     :returns: (main_run, domain)
@@ -53,15 +62,45 @@ def loadmat(save_file, base_dir, grid_dir, save_dir, basis_dir):
     main_run.nts_error = {}
     main_run.time_obs = {}
 
-    # load the data from at *.mat file
-    mdat = sio.loadmat(os.path.join(save_dir, save_file))
+    file_name = os.path.join(save_dir, save_file)
+    if lazy:
+        ts_names, nts_names, time_names = {}, {}, {}
+        selections = {}
+        for k in store.shapes(file_name).iterkeys():
+            skey = k.split('_')
+            if skey[-1] == 'time':
+                # check to see if the key is "*_time"
+                time_names[skey[0]] = k
+            elif f15.filetype.has_key(skey[0]) or \
+                    output.reductions.has_key(skey[0]):
+                if f15.filetype.has_key(skey[0]) and \
+                        f15.filetype[skey[0]][0]:
+                    # station files
+                    selections[skey[0]] = [(-1, samples)]
+                else:
+                    selections[skey[0]] = [(0, nodes), (-1, samples)]
+                if not re.match('fort', skey[0]):
+                    # check to see if key is nts_data
+                    nts_names[skey[0]] = k
+                else:
+                    # check to see if key is ts_data
+                    ts_names[skey[0]] = k
+        main_run.ts_error = store.lazy_data(file_name, ts_names, selections)
+        main_run.nts_error = store.lazy_data(file_name, nts_names,
+                                             selections)
+        main_run.time_obs = store.lazy_data(file_name, time_names)
+        return (main_run, domain)
+
+    # load the data from a result store or *.mat file
+    mdat = store.loadmat(file_name)
 
     for k, v in mdat.iteritems():
         skey = k.split('_')
         if skey[-1] == 'time':
             # check to see if the key is "*_time"
             main_run.time_obs[skey[0]] = v
-        elif f15.filetype.has_key(skey[0]):
+        elif f15.filetype.has_key(skey[0]) or \
+                output.reductions.has_key(skey[0]):
             if not re.match('fort', skey[0]):
                 # check to see if key is nts_data
                 main_run.nts_error[skey[0]] = v
@@ -437,7 +476,7 @@ class subdomain(dom.domain):
         # fix dry nodes
         if 'fort63' in ts_keys:
             ts_data[0] = rmn.fix_dry_nodes(ts_data[0], self)
-            ts_data[1] = rmn.fix_dry_nodes(ts_data[1], self)
+            ts_data[1] = rmn.fix_dry_nodes(ts_data[1], self.fulldomain)
 
         # fix dry data
         if 'fort61' in ts_keys:
@@ -497,6 +536,9 @@ class subdomain(dom.domain):
             output files to be recorded from each run
         :param string save_file: name of file to save comparision matricies to
         :param int timesteps: number of timesteps to read from file
+        :param bool savefull: flag whether or not to save the fulldomain data
+            to ``full.mat``, if False the fulldomain timeseries are streamed
+            and only stored at the nodes in this subdomain
         :rtype: tuple
         :returns: (ts_error, nts_error, time_obs, ts_data, nts_data)
 
@@ -532,6 +574,8 @@ class subdomain(dom.domain):
         time_obs = {}
 
         fulldom_nodes = [v-1 for v in self.sub2full_node.values()]
+        # timeseries in fulldict that are only stored at fulldom_nodes
+        sub_only = []
 
         # Get nts_data
         for fid in nts_names:
@@ -550,10 +594,17 @@ class subdomain(dom.domain):
                                                                True,
                                                                ihot=self.ihot) 
                 subdict[key+'_time'] = time_obs[key]
-            if not readmatfull:
+            if not readmatfull and savefull:
                 fulldict[key] = output.get_ts_sr(self.fulldomain.path,
                                                  fid, timesteps=timesteps,
                                                  ihot=self.fulldomain.ihot)[0]
+            elif not readmatfull:
+                # only read the fulldomain nodes that are in this subdomain
+                fulldict[key] = output.get_ts_sr(self.fulldomain.path,
+                                                 fid, timesteps=timesteps,
+                                                 ihot=self.fulldomain.ihot,
+                                                 nodes=fulldom_nodes)[0]
+                sub_only.append(key)
        
         if not readmatsub:
             # fix dry nodes
@@ -575,11 +626,12 @@ class subdomain(dom.domain):
 
 
         if not readmatfull:
-            # fix dry nodes
+            # fix dry nodes with the bathymetry of the fulldomain nodes
             if fulldict.has_key('fort63'):
-                fulldict['fort63'] = np.expand_dims(fulldict['fort63'], axis=2)
-                fulldict = rmn.fix_dry_nodes(fulldict, self)
-                fulldict['fort63'] = np.squeeze(fulldict['fort63'])
+                bathymetry = self.fulldomain.array_bathymetry()
+                if 'fort63' in sub_only:
+                    bathymetry = bathymetry[fulldom_nodes]
+                output.fix_dry(fulldict['fort63'], bathymetry)
             # fix dry data
             if fulldict.has_key('fort61'):
                 fulldict['fort61'] = np.expand_dims(fulldict['fort61'], axis=1)
@@ -587,10 +639,8 @@ class subdomain(dom.domain):
                 fulldict['fort61'] = np.squeeze(fulldict['fort61'])
             # fix dry nodes nts
             if fulldict.has_key('maxele63'):
-                fulldict['maxele63'] = np.expand_dims(fulldict['maxele63'], 
-                                                      axis=1)
-                fulldict = rmn.fix_dry_nodes_nts(fulldict, self)
-                fulldict['maxele63'] = np.squeeze(fulldict['maxele63'])
+                output.fix_dry(fulldict['maxele63'],
+                               self.fulldomain.array_bathymetry())
     
         # Get ts_error
         for fid in ts_names:
@@ -600,7 +650,9 @@ class subdomain(dom.domain):
             if timesteps and timesteps < total_obs:
                 total_obs = timesteps
             full_data = fulldict[key]
-            if self.recording[key][2] == 1:
+            if key in sub_only:
+                full_data = full_data[:, 0:total_obs, ...]
+            elif self.recording[key][2] == 1:
                 full_data = full_data[fulldom_nodes, 0:total_obs] 
             else:
                 full_data = full_data[fulldom_nodes, 0:total_obs, :]